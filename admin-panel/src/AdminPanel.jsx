@@ -88,7 +88,9 @@ const AdminPanel = ({ user }) => {
     try {
       const session = await fetchAuthSession();
       return {
-        Authorization: `Bearer ${session.tokens.idToken.toString()}`
+        Authorization: `Bearer ${session.tokens.idToken.toString()}`,
+        // Necesario para que API Gateway entregue las respuestas comprimidas
+        Accept: 'application/json'
       };
     } catch (error) {
       console.error('Error getting auth headers:', error);
@@ -141,12 +143,16 @@ const AdminPanel = ({ user }) => {
     }
   };
 
+  // stock es lo disponible para vender; las unidades de pedidos pendientes van en reserved.
+  // El formulario edita el stock físico (disponible + reservado)
+  const physicalStock = (product) => (product.stock || 0) + (product.reserved || 0);
+
   const updateProductStats = (productList) => {
     const stats = {
       totalProducts: productList.length,
       lowStock: productList.filter(p => p.stock > 0 && p.stock <= 10).length,
       outOfStock: productList.filter(p => p.stock === 0).length,
-      totalValue: productList.reduce((sum, p) => sum + (p.price * p.stock), 0)
+      totalValue: productList.reduce((sum, p) => sum + (p.price * physicalStock(p)), 0)
     };
     setDashboardStats(prev => ({ ...prev, ...stats }));
   };
@@ -296,7 +302,11 @@ const AdminPanel = ({ user }) => {
       fetchProducts();
     } catch (error) {
       console.error('Error updating product:', error);
-      setError('Error al actualizar producto');
+      if (error.response?.status === 409) {
+        setError('El stock no puede ser menor que las unidades reservadas por pedidos pendientes');
+      } else {
+        setError('Error al actualizar producto');
+      }
     } finally {
       setLoading(false);
     }
@@ -414,15 +424,31 @@ const AdminPanel = ({ user }) => {
   const fetchOrders = async () => {
     try {
       const headers = await getAuthHeaders();
-      const response = await get({
-        apiName: 'SportShopAPI',
-        path: '/admin/orders',
-        options: { headers }
-      }).response;
       
-      const data = await response.body.json();
-      setOrders(data.orders || []);
-      updateOrderStats(data.orders || []);
+      // Solo los últimos 7 días (lo que muestra la pestaña), ya ordenados por el índice
+      const sevenDaysAgo = new Date();
+      sevenDaysAgo.setDate(sevenDaysAgo.getDate() - 7);
+      sevenDaysAgo.setHours(0, 0, 0, 0);
+      
+      const allOrders = [];
+      let cursor = null;
+      do {
+        const queryParams = { from: sevenDaysAgo.toISOString(), limit: '100' };
+        if (cursor) queryParams.cursor = cursor;
+        
+        const response = await get({
+          apiName: 'SportShopAPI',
+          path: '/admin/orders',
+          options: { headers, queryParams }
+        }).response;
+        
+        const data = await response.body.json();
+        allOrders.push(...(data.orders || []));
+        cursor = data.nextCursor;
+      } while (cursor);
+      
+      setOrders(allOrders);
+      updateOrderStats(allOrders);
     } catch (error) {
       console.error('Error fetching orders:', error);
       if (error.response?.status === 403) {
@@ -507,8 +533,10 @@ const AdminPanel = ({ user }) => {
       
       const data = await response.body.json();
       console.log('Sales data:', data); // Debug
-      setSales(data.sales || []);
-      updateSalesStats(data.sales || []);
+      // Las ventas canceladas se conservan (para estadísticas) pero no se listan
+      const activeSales = (data.sales || []).filter(sale => sale.status !== 'cancelled');
+      setSales(activeSales);
+      updateSalesStats(activeSales);
     } catch (error) {
       console.error('Error fetching sales:', error);
       if (error.response?.status === 403) {
@@ -720,7 +748,7 @@ const AdminPanel = ({ user }) => {
       price: product.price.toString(),
       category: product.category,
       gender: product.gender,
-      stock: product.stock.toString(),
+      stock: physicalStock(product).toString(),
       imageUrl: product.imageUrl || ''
     });
     setShowProductForm(true);
@@ -996,7 +1024,10 @@ const AdminPanel = ({ user }) => {
                     </div>
                     <div className="product-pricing">
                       <span className="product-price">${product.price}</span>
-                      <span className="product-stock">Stock: {product.stock}</span>
+                      <span className="product-stock">
+                        Stock: {product.stock}
+                        {product.reserved > 0 && ` (+${product.reserved} reservado)`}
+                      </span>
                     </div>
                   </div>
                   
@@ -1505,7 +1536,7 @@ const AdminPanel = ({ user }) => {
                 </div>
                 
                 <div className="form-group">
-                  <label>Stock</label>
+                  <label>Stock físico (incluye reservado)</label>
                   <input
                     type="number"
                     value={productFormData.stock}
@@ -1,9 +1,12 @@
-import { Link } from 'react-router-dom'
-import { signOut, fetchUserAttributes } from 'aws-amplify/auth'
+import { Link, useLocation } from 'react-router-dom'
+import { signOut, fetchUserAttributes, fetchAuthSession } from 'aws-amplify/auth'
+import { get } from 'aws-amplify/api'
 import { useState, useEffect } from 'react'
 
 function Navbar({ user, onSignOut }) {
   const [userEmail, setUserEmail] = useState('')
+  const [cartCount, setCartCount] = useState(0)
+  const location = useLocation()
 
   useEffect(() => {
     if (user) {
@@ -11,6 +14,34 @@ function Navbar({ user, onSignOut }) {
     }
   }, [user])
 
+  // Refrescar el badge al cambiar de página (GET /cart/summary lee solo la cabecera)
+  useEffect(() => {
+    if (user) {
+      fetchCartCount()
+    } else {
+      setCartCount(0)
+    }
+  }, [user, location.pathname])
+
+  const fetchCartCount = async () => {
+    try {
+      const session = await fetchAuthSession()
+      const token = session.tokens?.idToken?.toString()
+      const restOperation = get({
+        apiName: 'SportShopAPI',
+        path: '/cart/summary',
+        options: {
+          headers: { Authorization: `Bearer ${token}` }
+        }
+      })
+      const { body } = await restOperation.response
+      const data = await body.json()
+      setCartCount(data.summary?.totalQuantity || 0)
+    } catch (error) {
+      console.error('Error fetching cart summary:', error)
+    }
+  }
+
   const getUserEmail = async () => {
     try {
       const attributes = await fetchUserAttributes()
@@ -41,7 +72,10 @@ function Navbar({ user, onSignOut }) {
         
         {user ? (
           <>
-            <Link to="/cart" className="nav-link">Carrito</Link>
+            <Link to="/cart" className="nav-link">
+              Carrito
+              {cartCount > 0 && <span className="cart-count">{cartCount}</span>}
+            </Link>
             <span className="user-email">Hola, {userEmail}</span>
             <button onClick={handleSignOut} className="btn btn-outline">
               Cerrar Sesión
@@ -19,7 +19,9 @@ function ProductCatalog() {
       setLoading(true)
       const response = await get({
         apiName: 'SportShopAPI',
-        path: '/products'
+        path: '/products',
+        // Necesario para que API Gateway entregue la respuesta comprimida
+        options: { headers: { Accept: 'application/json' } }
       }).response
 
       const data = await response.body.json()
@@ -96,6 +96,7 @@ function ProductDetail() {
           },
           body: {
             productId: product.id,
+            productCategory: product.category, // Permite lookup directo por clave
             quantity: quantity
           }
         }
@@ -0,0 +1,197 @@
+"""
+Benchmark de compresión de respuestas JSON (gzip / brotli)
+
+Genera payloads con la misma forma que devuelven get-products, get-all-orders,
+get-all-sales y get-sales-statistics, y mide para cada codificación:
+tamaño comprimido, ratio, tiempo de compresión y tamaño final en base64
+(lo que realmente viaja entre Lambda y API Gateway).
+
+Uso:
+    python benchmarks/compression_benchmark.py [--products 500] [--orders 1000] [--repeat 20]
+
+brotli es opcional (pip install brotli); sin la librería solo se mide gzip.
+"""
+import argparse
+import base64
+import gzip
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Usar la misma configuración que la capa common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'lambda-functions' / 'layers' / 'common' / 'python'))
+import http_responses  # noqa: E402
+
+CATEGORIES = ['camisetas', 'zapatillas', 'shorts', 'buzos', 'accesorios']
+GENDERS = ['hombre', 'mujer', 'unisex']
+STATUSES = ['pending', 'completed', 'cancelled']
+
+
+def build_products(count):
+    products = []
+    for i in range(count):
+        category = random.choice(CATEGORIES)
+        products.append({
+            'id': str(uuid.uuid4()),
+            'category': category,
+            'name': f'{category.capitalize()} deportiva modelo {i}',
+            'price': round(random.uniform(50, 900), 2),
+            'stock': random.randint(0, 40),
+            'gender': random.choice(GENDERS),
+            'description': 'Prenda deportiva de alto rendimiento, tela respirable y secado rápido. ' * 2,
+            'imageUrl': f'https://sportshop-dev-product-images-v3.s3.amazonaws.com/products/{uuid.uuid4()}.jpg',
+            'imageUrls': [
+                f'https://sportshop-dev-product-images-v3.s3.amazonaws.com/products/{uuid.uuid4()}.jpg'
+                for _ in range(3)
+            ],
+            'createdAt': (datetime(2024, 1, 1) + timedelta(hours=i)).isoformat(),
+            'createdBy': 'admin@sportshop.com'
+        })
+    return products
+
+
+def build_order_items(products):
+    items = []
+    for product in random.sample(products, random.randint(1, 4)):
+        quantity = random.randint(1, 3)
+        items.append({
+            'productId': product['id'],
+            'productName': product['name'],
+            'productCategory': product['category'],
+            'productImageUrl': product['imageUrl'],
+            'unitPrice': product['price'],
+            'quantity': quantity,
+            'subtotal': round(product['price'] * quantity, 2)
+        })
+    return items
+
+
+def build_orders(count, products):
+    orders = []
+    for i in range(count):
+        created_at = (datetime(2024, 1, 1) + timedelta(minutes=37 * i)).isoformat()
+        items = build_order_items(products)
+        email = f'cliente{i % 200}@gmail.com'
+        orders.append({
+            'orderId': f'ORD-{created_at[:10].replace("-", "")}-{uuid.uuid4().hex[:6].upper()}',
+            'createdAt': created_at,
+            'userId': str(uuid.uuid4()),
+            'status': random.choice(STATUSES),
+            'customerInfo': {'name': email.split('@')[0], 'email': email, 'phone': '', 'orderDate': created_at},
+            'items': items,
+            'summary': {
+                'totalItems': len(items),
+                'totalQuantity': sum(item['quantity'] for item in items),
+                'totalAmount': round(sum(item['subtotal'] for item in items), 2)
+            },
+            'paymentMethod': 'whatsapp_coordination',
+            'deliveryMethod': 'pending',
+            'updatedAt': created_at,
+            'whatsappSent': False
+        })
+    return orders
+
+
+def build_sales(orders):
+    return [
+        {
+            'saleId': f'SALE-{order["createdAt"][:10].replace("-", "")}-{uuid.uuid4().hex[:6].upper()}',
+            'completedAt': order['createdAt'] + '-04:00',
+            'originalOrderId': order['orderId'],
+            'userId': order['userId'],
+            'customerName': order['customerInfo']['name'],
+            'customerEmail': order['customerInfo']['email'],
+            'totalAmount': order['summary']['totalAmount'],
+            'completedBy': 'admin@sportshop.com',
+            'status': 'completed',
+            'items': order['items']
+        }
+        for order in orders
+    ]
+
+
+def build_statistics(sales):
+    daily = {}
+    for sale in sales:
+        day = sale['completedAt'][:10]
+        entry = daily.setdefault(day, {'sales': 0, 'revenue': 0})
+        entry['sales'] += 1
+        entry['revenue'] += sale['totalAmount']
+    return {
+        'statistics': {
+            'totalSales': len(sales),
+            'totalRevenue': round(sum(sale['totalAmount'] for sale in sales), 2),
+            'categoryBreakdown': {c: {'quantity': random.randint(1, 500), 'revenue': random.uniform(1, 9999)} for c in CATEGORIES},
+            'genderBreakdown': {g: {'quantity': random.randint(1, 500), 'revenue': random.uniform(1, 9999)} for g in GENDERS},
+            'dailySales': daily
+        }
+    }
+
+
+def encoders():
+    yield 'gzip-1', lambda data: gzip.compress(data, compresslevel=1)
+    yield f'gzip-{http_responses.GZIP_LEVEL} (default)', lambda data: gzip.compress(data, compresslevel=http_responses.GZIP_LEVEL)
+    yield 'gzip-9', lambda data: gzip.compress(data, compresslevel=9)
+    if http_responses.brotli is not None:
+        brotli = http_responses.brotli
+        yield 'br-1', lambda data: brotli.compress(data, quality=1)
+        yield f'br-{http_responses.BROTLI_QUALITY} (default)', lambda data: brotli.compress(data, quality=http_responses.BROTLI_QUALITY)
+        yield 'br-11', lambda data: brotli.compress(data, quality=11)
+
+
+def measure(data, compress, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compressed = compress(data)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return compressed, timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compression benchmark for SportShop JSON responses')
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    products = build_products(args.products)
+    orders = build_orders(args.orders, products)
+    sales = build_sales([order for order in orders if order['status'] == 'completed'])
+
+    payloads = {
+        'get-products': {'message': 'Products retrieved successfully', 'products': products, 'count': len(products)},
+        'get-all-orders': {'message': 'Orders retrieved successfully', 'orders': orders, 'count': len(orders)},
+        'get-all-sales': {'message': 'Sales retrieved successfully', 'sales': sales, 'count': len(sales)},
+        'get-sales-statistics': build_statistics(sales)
+    }
+
+    if http_responses.brotli is None:
+        print('brotli not installed: only gzip is measured\n')
+
+    header = f"{'endpoint':<22}{'encoding':<20}{'bytes':>10}{'base64':>10}{'ratio':>8}{'p50 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for endpoint, payload in payloads.items():
+        data = json.dumps(payload).encode('utf-8')
+        print(f"{endpoint:<22}{'identity':<20}{len(data):>10}{len(data):>10}{1:>8.2f}{0:>9.2f}")
+        for name, compress in encoders():
+            compressed, median = measure(data, compress, args.repeat)
+            encoded = len(base64.b64encode(compressed))
+            print(f"{'':<22}{name:<20}{len(compressed):>10}{encoded:>10}{len(data) / len(compressed):>8.2f}{median * 1000:>9.2f}")
+        print()
+
+    print(f'Threshold: responses under {http_responses.COMPRESSION_MIN_BYTES} bytes are sent uncompressed.')
+    print('The base64 column is the Lambda -> API Gateway size (counts toward the 6 MB limit);')
+    print('clients receive the bytes column.')
+
+
+if __name__ == '__main__':
+    main()
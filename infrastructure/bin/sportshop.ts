@@ -41,8 +41,10 @@ const computeStack = new ComputeStack(app, 'SportShop-Dev-Compute-v3', {
   stage: 'dev',
   productsTable: dataStack.productsTable,
   cartTable: dataStack.cartTable,
+  cartHeadersTable: dataStack.cartHeadersTable,
   ordersTable: dataStack.ordersTable,
   salesTable: dataStack.salesTable,
+  metaTable: dataStack.metaTable,
   imagesBucket: storageStack.imagesBucket,
   env: {
     region: 'us-east-1',
@@ -78,6 +80,7 @@ const cdnStack = new CdnStack(app, 'SportShop-Dev-CDN-v3', {
   stage: 'dev',
   websiteBucket: storageStack.websiteBucket,
   adminBucket: storageStack.adminBucket,
+  imagesBucket: storageStack.imagesBucket,
   env: {
     region: 'us-east-1',
     account: '851725386264',
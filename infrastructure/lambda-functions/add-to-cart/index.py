@@ -1,8 +1,16 @@
 import json
 import boto3
 import os
+import time
 from decimal import Decimal
 from datetime import datetime
+from botocore.exceptions import ClientError
+
+# Utilidades compartidas (capa common)
+from product_repository import ProductRepository
+from http_responses import parse_json_body
+from cart_store import cart_expiry, apply_header_delta, line_value, new_cart_item
+from inventory import available_stock
 
 # Inicializar clientes DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -10,11 +18,17 @@ cart_table_name = os.environ['CART_TABLE']
 products_table_name = os.environ['PRODUCTS_TABLE']
 cart_table = dynamodb.Table(cart_table_name)
 products_table = dynamodb.Table(products_table_name)
+# Cabecera de totales del carrito (tabla propia, fuera del índice productId-index)
+cart_headers_table = dynamodb.Table(os.environ['CART_HEADERS_TABLE'])
+
+# Intentos si la fila cambia (renovada o borrada por TTL) entre las dos escrituras
+ADD_ATTEMPTS = 3
 
 # Función para convertir Decimal a float/int
+# cartItem lleva valores leídos de DynamoDB: quantity y expiresAt son enteros
 def decimal_default(obj):
     if isinstance(obj, Decimal):
-        return float(obj)
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
     raise TypeError
 
 def handler(event, context):
@@ -36,7 +50,7 @@ def handler(event, context):
             }
         
         # Parsear body de la request
-        body = json.loads(event.get('body', '{}'))
+        body = parse_json_body(event)
         product_id = body.get('productId')
         quantity = body.get('quantity', 1)
         
@@ -68,14 +82,9 @@ def handler(event, context):
                 })
             }
         
-        # Verificar que el producto existe y tiene stock
-        product_response = products_table.scan(
-            FilterExpression='id = :id',
-            ExpressionAttributeValues={':id': product_id}
-        )
-        
-        products = product_response.get('Items', [])
-        if not products:
+        # Verificar que el producto existe y tiene stock (lookup por clave, no scan)
+        product = ProductRepository(products_table).get(product_id, body.get('productCategory'))
+        if not product:
             return {
                 'statusCode': 404,
                 'headers': {
@@ -88,10 +97,9 @@ def handler(event, context):
                 })
             }
         
-        product = products[0]
-        available_stock = int(product.get('stock', 0))
+        stock = available_stock(product)
         
-        if available_stock < quantity:
+        if stock < quantity:
             return {
                 'statusCode': 400,
                 'headers': {
@@ -101,90 +109,138 @@ def handler(event, context):
                 'body': json.dumps({
                     'message': 'Insufficient stock',
                     'requestedQuantity': quantity,
-                    'availableStock': available_stock,
+                    'availableStock': stock,
                     'productName': product.get('name')
                 })
             }
         
-        # Verificar si el producto ya está en el carrito
-        try:
-            existing_item = cart_table.get_item(
-                Key={
-                    'userId': user_id,
-                    'productId': product_id
-                }
-            )
-            
-            if 'Item' in existing_item:
-                # Actualizar cantidad existente
-                new_quantity = int(existing_item['Item']['quantity']) + quantity
-                
-                # Verificar stock para nueva cantidad total
-                if available_stock < new_quantity:
-                    return {
-                        'statusCode': 400,
-                        'headers': {
-                            'Content-Type': 'application/json',
-                            'Access-Control-Allow-Origin': '*'
-                        },
-                        'body': json.dumps({
-                            'message': 'Insufficient stock for total quantity',
-                            'currentInCart': int(existing_item['Item']['quantity']),
-                            'requestedToAdd': quantity,
-                            'totalRequested': new_quantity,
-                            'availableStock': available_stock
-                        })
-                    }
-                
-                # Actualizar item existente
-                cart_table.update_item(
+        # Agregar (o sumar) en una sola escritura atómica:
+        # - ADD quantity evita perder incrementos con dos requests concurrentes
+        # - productPrice se actualiza al precio actual con cada agregado
+        # - if_not_exists conserva el resto de los datos del primer agregado
+        # - la condición impide superar el stock disponible con la cantidad total
+        #   y sumar sobre una fila vencida que el TTL todavía no borró
+        # - expiresAt (TTL) se renueva con cada agregado
+        now = datetime.utcnow().isoformat()
+        price = product.get('price')
+        previous = None
+        for attempt in range(ADD_ATTEMPTS):
+            now_epoch = int(time.time())
+            try:
+                response = cart_table.update_item(
                     Key={
                         'userId': user_id,
                         'productId': product_id
                     },
-                    UpdateExpression='SET quantity = :qty, updatedAt = :updated',
+                    UpdateExpression=(
+                        'ADD quantity :qty '
+                        'SET productName = if_not_exists(productName, :name), '
+                        'productPrice = :price, '
+                        'productCategory = if_not_exists(productCategory, :category), '
+                        'productImageUrl = if_not_exists(productImageUrl, :image_url), '
+                        'addedAt = if_not_exists(addedAt, :now), '
+                        'updatedAt = :now, '
+                        'expiresAt = :expires_at'
+                    ),
+                    ConditionExpression=(
+                        'attribute_not_exists(quantity) OR '
+                        '(quantity <= :ceiling AND (attribute_not_exists(expiresAt) OR expiresAt > :now_epoch))'
+                    ),
                     ExpressionAttributeValues={
-                        ':qty': new_quantity,
-                        ':updated': datetime.utcnow().isoformat()
-                    }
+                        ':qty': quantity,
+                        ':ceiling': stock - quantity,
+                        ':name': product.get('name'),
+                        ':price': price,
+                        ':category': product.get('category'),
+                        ':image_url': product.get('imageUrl', ''),
+                        ':now': now,
+                        ':now_epoch': now_epoch,
+                        ':expires_at': cart_expiry()
+                    },
+                    ReturnValues='ALL_OLD',
+                    ReturnValuesOnConditionCheckFailure='ALL_OLD'
                 )
-                
+                previous = response.get('Attributes') or {}
+                break
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
+                old_item = e.response.get('Item', {})
+                current_quantity = int(old_item.get('quantity', {}).get('N', 0))
+                expires_at = old_item.get('expiresAt', {}).get('N')
+            
+            if expires_at is None or int(expires_at) > now_epoch:
+                # La cantidad total superaría el stock disponible
                 return {
-                    'statusCode': 200,
+                    'statusCode': 400,
                     'headers': {
                         'Content-Type': 'application/json',
-                        'Access-Control-Allow-Origin': '*',
-                        'Access-Control-Allow-Methods': 'POST, OPTIONS',
-                        'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+                        'Access-Control-Allow-Origin': '*'
                     },
                     'body': json.dumps({
-                        'message': 'Cart updated successfully',
-                        'action': 'updated',
-                        'productId': product_id,
-                        'previousQuantity': int(existing_item['Item']['quantity']),
-                        'addedQuantity': quantity,
-                        'newQuantity': new_quantity,
-                        'productName': product.get('name')
-                    }, default=decimal_default)
+                        'message': 'Insufficient stock for total quantity',
+                        'currentInCart': current_quantity,
+                        'requestedToAdd': quantity,
+                        'totalRequested': current_quantity + quantity,
+                        'availableStock': stock
+                    })
                 }
             
-        except Exception as e:
-            print(f"Error checking existing cart item: {str(e)}")
+            # Fila vencida pendiente de borrar: se reemplaza por una línea nueva (su
+            # cantidad vieja no se suma) mientras siga vencida; si otra request la
+            # renovó o el TTL la borró entretanto, se reintenta el agregado normal
+            try:
+                cart_table.put_item(
+                    Item=new_cart_item(user_id, product, quantity, now),
+                    ConditionExpression='expiresAt <= :now_epoch',
+                    ExpressionAttributeValues={':now_epoch': now_epoch}
+                )
+                previous = {}
+                break
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
         
-        # Agregar nuevo item al carrito
-        cart_item = {
-            'userId': user_id,
-            'productId': product_id,
-            'quantity': quantity,
-            'productName': product.get('name'),
-            'productPrice': product.get('price'),
-            'productCategory': product.get('category'),
-            'productImageUrl': product.get('imageUrl', ''),  # Agregar imagen del producto
-            'addedAt': datetime.utcnow().isoformat(),
-            'updatedAt': datetime.utcnow().isoformat()
-        }
+        if previous is None:
+            raise RuntimeError('Cart row changed concurrently, add not applied')
+        
+        previous_quantity = int(previous.get('quantity', 0))
+        new_quantity = previous_quantity + quantity
+        cart_item = dict(new_cart_item(user_id, product, new_quantity, now), **{
+            field: previous[field]
+            for field in ('productName', 'productCategory', 'productImageUrl', 'addedAt')
+            if field in previous
+        })
         
-        cart_table.put_item(Item=cart_item)
+        # Totales de la cabecera del carrito (badge): línea nueva (o que reemplaza a una
+        # vencida, que ya no cuenta en el carrito) o más unidades con el precio actual
+        apply_header_delta(
+            cart_headers_table,
+            user_id,
+            lines=0 if previous_quantity > 0 else 1,
+            quantity=quantity,
+            price=line_value(cart_item) - line_value(previous)
+        )
+        
+        if previous_quantity > 0:
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                    'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+                },
+                'body': json.dumps({
+                    'message': 'Cart updated successfully',
+                    'action': 'updated',
+                    'productId': product_id,
+                    'previousQuantity': previous_quantity,
+                    'addedQuantity': quantity,
+                    'newQuantity': new_quantity,
+                    'productName': cart_item.get('productName')
+                }, default=decimal_default)
+            }
         
         return {
             'statusCode': 201,
@@ -4,10 +4,20 @@ import os
 from decimal import Decimal
 from datetime import datetime
 
+# Utilidades compartidas (capa common)
+from ids import get_order
+from inventory import aggregate_quantities, release_actions
+from transactions import delete, transact_write, TransactionCancelled
+from catalog_cache import bump_stock_version
+
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 orders_table_name = os.environ['ORDERS_TABLE']
 orders_table = dynamodb.Table(orders_table_name)
+products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE'])
+
+# Versión de stock en la tabla Meta: vacía los caches del catálogo tras mover stock
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
 
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
@@ -73,17 +83,10 @@ def handler(event, context):
                 })
             }
         
-        # Buscar el pedido (igual que update-product)
-        print("Scanning for existing order...")
-        existing_order_response = orders_table.scan(
-            FilterExpression='orderId = :orderId',
-            ExpressionAttributeValues={':orderId': order_id}
-        )
+        # Buscar el pedido por clave (GetItem con la fecha derivada del id, sin scan)
+        order = get_order(orders_table, order_id)
         
-        existing_orders = existing_order_response.get('Items', [])
-        print(f"Found orders: {len(existing_orders)}")
-        
-        if not existing_orders:
+        if not order:
             return {
                 'statusCode': 404,
                 'headers': {
@@ -96,7 +99,6 @@ def handler(event, context):
                 })
             }
         
-        order = existing_orders[0]
         print(f"Existing order status: {order.get('status')}")
         
         # Verificar que el pedido esté en estado 'pending'
@@ -114,14 +116,43 @@ def handler(event, context):
                 })
             }
         
-        # Eliminar el pedido (igual que delete-product)
+        # Eliminar el pedido; si reservó stock, devolverlo en la misma transacción
+        # (la condición status = pending evita liberar dos veces la misma reserva)
         print("Deleting order...")
-        orders_table.delete_item(
-            Key={
-                'orderId': order_id,
-                'createdAt': order.get('createdAt')
-            }
-        )
+        order_key = {
+            'orderId': order_id,
+            'createdAt': order.get('createdAt')
+        }
+        stock_released = bool(order.get('stockReserved'))
+        
+        if stock_released:
+            quantities = aggregate_quantities(order.get('items', []))
+            actions = release_actions(products_table, quantities, datetime.utcnow().isoformat())
+            actions.append(delete(
+                orders_table,
+                order_key,
+                condition='#status = :pending',
+                names={'#status': 'status'},
+                values={':pending': 'pending'}
+            ))
+            try:
+                transact_write(orders_table.meta.client, actions)
+            except TransactionCancelled as e:
+                print(f"Cancel transaction failed: {e.reasons}")
+                return {
+                    'statusCode': 409,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'message': 'Order changed while cancelling, no changes were applied',
+                        'orderId': order_id
+                    })
+                }
+            bump_stock_version(meta_table)
+        else:
+            orders_table.delete_item(Key=order_key)
         
         print("Order cancelled successfully!")
         
@@ -138,6 +169,7 @@ def handler(event, context):
                 'orderId': order_id,
                 'cancelledAt': datetime.utcnow().isoformat(),
                 'cancelledBy': admin_email,
+                'stockReleased': stock_released,
                 'adminInfo': {
                     'cancelledBy': user_id,
                     'cancelledAt': datetime.utcnow().isoformat(),
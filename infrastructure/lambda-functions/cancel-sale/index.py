@@ -4,6 +4,13 @@ import os
 from decimal import Decimal
 from datetime import datetime
 
+# Utilidades compartidas (capa common)
+from ids import get_sale
+from product_repository import ProductRepository
+from inventory import aggregate_quantities, restock_actions
+from transactions import update, transact_write, TransactionCancelled, TRANSACTION_MAX_ACTIONS
+from catalog_cache import bump_stock_version
+
 # Inicializar clientes DynamoDB
 dynamodb = boto3.resource('dynamodb')
 sales_table_name = os.environ['SALES_TABLE']
@@ -11,6 +18,9 @@ products_table_name = os.environ['PRODUCTS_TABLE']
 sales_table = dynamodb.Table(sales_table_name)
 products_table = dynamodb.Table(products_table_name)
 
+# Versión de stock en la tabla Meta: vacía los caches del catálogo tras mover stock
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
     if isinstance(obj, Decimal):
@@ -75,17 +85,10 @@ def handler(event, context):
                 })
             }
         
-        # Buscar la venta (igual que update-product)
-        print("Scanning for existing sale...")
-        existing_sale_response = sales_table.scan(
-            FilterExpression='saleId = :saleId',
-            ExpressionAttributeValues={':saleId': sale_id}
-        )
-        
-        existing_sales = existing_sale_response.get('Items', [])
-        print(f"Found sales: {len(existing_sales)}")
+        # Buscar la venta por clave (GetItem con la fecha derivada del id)
+        sale = get_sale(sales_table, sale_id)
         
-        if not existing_sales:
+        if not sale:
             return {
                 'statusCode': 404,
                 'headers': {
@@ -98,78 +101,99 @@ def handler(event, context):
                 })
             }
         
-        sale = existing_sales[0]
-        print(f"Found sale: {sale.get('saleId')}")
-        
-        # RESTAURAR STOCK: Procesar cada producto de la venta
-        restored_products = []
-        if sale.get('items'):
-            print(f"Restoring stock for {len(sale['items'])} products...")
-            
-            for item in sale['items']:
-                try:
-                    product_id = item.get('productId')
-                    quantity_to_restore = int(item.get('quantity', 0))
-                    product_name = item.get('productName', 'Unknown')
-                    
-                    if not product_id or quantity_to_restore <= 0:
-                        print(f"Skipping invalid item: {item}")
-                        continue
-                    
-                    print(f"Restoring {quantity_to_restore} units of product {product_id} ({product_name})")
-                    
-                    # Buscar el producto en la tabla principal
-                    product_response = products_table.scan(
-                        FilterExpression='id = :productId',
-                        ExpressionAttributeValues={':productId': product_id}
-                    )
-                    
-                    products = product_response.get('Items', [])
-                    if not products:
-                        print(f"Product {product_id} not found in products table")
-                        continue
-                    
-                    product = products[0]
-                    current_stock = int(product.get('stock', 0))
-                    new_stock = current_stock + quantity_to_restore
-                    
-                    print(f"Product {product_id}: {current_stock} → {new_stock} (+{quantity_to_restore})")
-                    
-                    # Actualizar el stock del producto
-                    products_table.update_item(
-                        Key={
-                            'id': product_id,
-                            'category': product.get('category')
-                        },
-                        UpdateExpression='SET stock = :new_stock',
-                        ExpressionAttributeValues={
-                            ':new_stock': new_stock
-                        }
-                    )
-                    
-                    restored_products.append({
-                        'productId': product_id,
-                        'productName': product_name,
-                        'quantityRestored': quantity_to_restore,
-                        'previousStock': current_stock,
-                        'newStock': new_stock
-                    })
-                    
-                    print(f"Successfully restored stock for product {product_id}")
-                    
-                except Exception as product_error:
-                    print(f"Error restoring stock for product {item}: {str(product_error)}")
-                    # Continuar con otros productos aunque uno falle
-                    continue
-        
-        # Eliminar la venta (igual que delete-product)
-        print("Deleting sale...")
-        sales_table.delete_item(
-            Key={
-                'saleId': sale_id,
-                'completedAt': sale.get('completedAt')
+        print(f"Found sale: {sale.get('saleId')} ({sale.get('status', 'completed')})")
+        
+        if sale.get('status', 'completed') != 'completed':
+            return {
+                'statusCode': 409,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': f'Sale cannot be cancelled. Current status: {sale.get("status")}',
+                    'saleId': sale_id,
+                    'currentStatus': sale.get('status')
+                })
+            }
+        
+        # Productos a restaurar (cantidades sumadas por producto) que todavía existen:
+        # una lectura batch; los eliminados del catálogo se informan y se omiten
+        quantities = aggregate_quantities(sale.get('items', []))
+        products = ProductRepository(products_table).get_many([
+            {'id': product_id, 'category': category} for product_id, category in quantities
+        ])
+        
+        restock = {}
+        skipped_products = []
+        for ((product_id, _), quantity), product in zip(quantities.items(), products):
+            if product:
+                key = (product_id, product.get('category'))
+                restock[key] = restock.get(key, 0) + quantity
+            else:
+                print(f"Product {product_id} not found in products table, skipping restore")
+                skipped_products.append(product_id)
+        
+        if len(restock) + 1 > TRANSACTION_MAX_ACTIONS:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Sale has too many different products to cancel atomically',
+                    'maxProducts': TRANSACTION_MAX_ACTIONS - 1
+                })
+            }
+        
+        # Transacción compensatoria: ADD stock por producto + venta marcada como cancelada
+        # (se conserva para estadísticas). La condición status = completed impide que
+        # una doble cancelación restaure el stock dos veces.
+        cancelled_at = datetime.utcnow().isoformat()
+        actions = restock_actions(products_table, restock, cancelled_at)
+        actions.append(update(
+            sales_table,
+            {'saleId': sale_id, 'completedAt': sale.get('completedAt')},
+            'SET #status = :cancelled, cancelledAt = :cancelled_at, cancelledBy = :cancelled_by',
+            condition='attribute_not_exists(#status) OR #status = :completed',
+            names={'#status': 'status'},
+            values={
+                ':cancelled': 'cancelled',
+                ':completed': 'completed',
+                ':cancelled_at': cancelled_at,
+                ':cancelled_by': admin_email
+            }
+        ))
+        
+        try:
+            transact_write(sales_table.meta.client, actions)
+        except TransactionCancelled as e:
+            print(f"Cancel sale transaction failed: {e.reasons}")
+            return {
+                'statusCode': 409,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Sale changed while cancelling (already cancelled or product removed), no changes were applied',
+                    'saleId': sale_id
+                })
+            }
+        
+        if restock:
+            bump_stock_version(meta_table)
+        
+        names = {item.get('productId'): item.get('productName', 'Unknown') for item in sale.get('items', [])}
+        restored_products = [
+            {
+                'productId': product_id,
+                'productName': names.get(product_id, 'Unknown'),
+                'quantityRestored': quantity
             }
-        )
+            for (product_id, _), quantity in restock.items()
+        ]
         
         print("Sale cancelled successfully!")
         
@@ -184,13 +208,15 @@ def handler(event, context):
             'body': json.dumps({
                 'message': 'Sale cancelled successfully and stock restored',
                 'saleId': sale_id,
-                'cancelledAt': datetime.utcnow().isoformat(),
+                'status': 'cancelled',
+                'cancelledAt': cancelled_at,
                 'cancelledBy': admin_email,
                 'stockRestored': restored_products,
                 'totalProductsRestored': len(restored_products),
+                'skippedProducts': skipped_products,
                 'adminInfo': {
                     'cancelledBy': user_id,
-                    'cancelledAt': datetime.utcnow().isoformat(),
+                    'cancelledAt': cancelled_at,
                     'action': 'CANCEL_SALE_WITH_STOCK_RESTORE'
                 }
             }, default=decimal_default)
@@ -0,0 +1,159 @@
+import json
+import boto3
+import os
+import time
+from datetime import datetime, timezone
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Attr
+
+# Utilidades compartidas (capa common)
+from pagination import fetch_page
+from cart_store import CART_TTL_ATTRIBUTE, CART_TTL_DAYS, cart_expiry, is_header, apply_header_delta, line_value
+
+# Inicializar cliente DynamoDB
+dynamodb = boto3.resource('dynamodb')
+cart_table = dynamodb.Table(os.environ['CART_TABLE'])
+# Cabecera de totales del carrito (tabla propia, fuera del índice productId-index)
+cart_headers_table = dynamodb.Table(os.environ['CART_HEADERS_TABLE'])
+
+# Filas leídas por página del scan y margen de tiempo para cortar antes del timeout
+PAGE_SIZE = int(os.environ.get('COMPACTION_PAGE_SIZE', '500'))
+TIME_MARGIN_MS = 15000
+
+def last_activity(item):
+    """Epoch de la última actividad de una fila sin expiresAt (filas anteriores al TTL)"""
+    for attribute in ('updatedAt', 'addedAt'):
+        value = item.get(attribute)
+        if value:
+            try:
+                return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+            except ValueError:
+                continue
+    return None
+
+def handler(event, context):
+    """
+    Barrido programado (EventBridge) de carritos abandonados
+    - Filas vencidas que DynamoDB todavía no borró por TTL: se eliminan con un borrado
+      condicional por fila (solo se descuentan de la cabecera las que se borraron)
+    - Filas sin expiresAt (anteriores al TTL): se eliminan si su última actividad
+      supera CART_TTL_DAYS, si no se les asigna expiresAt
+    Evento opcional: {'dryRun': true} solo reporta, {'startKey': {...}} continúa un barrido
+    """
+    event = event or {}
+    dry_run = bool(event.get('dryRun'))
+    start_key = event.get('startKey')
+    now = time.time()
+    started = time.time()
+    
+    report = {
+        'dryRun': dry_run,
+        'ttlDays': CART_TTL_DAYS,
+        'scannedPages': 0,
+        'staleRows': 0,
+        'deletedRows': 0,
+        'skippedRows': 0,
+        'backfilledRows': 0,
+        'abandonedCarts': 0,
+        'complete': False,
+        'resumeKey': None
+    }
+    abandoned_users = set()
+    
+    try:
+        # Solo interesan filas vencidas o sin TTL (el filtro reduce lo transferido, no las RCU)
+        stale_filter = Attr(CART_TTL_ATTRIBUTE).not_exists() | Attr(CART_TTL_ATTRIBUTE).lte(int(now))
+        
+        while True:
+            rows, start_key = fetch_page(
+                cart_table.scan,
+                PAGE_SIZE,
+                start_key,
+                FilterExpression=stale_filter
+            )
+            report['scannedPages'] += 1
+            
+            to_delete = []
+            for row in rows:
+                expires_at = row.get(CART_TTL_ATTRIBUTE)
+                if expires_at is None:
+                    activity = last_activity(row)
+                    expires_at = cart_expiry(activity) if activity is not None else None
+                
+                if expires_at is not None and int(expires_at) <= now:
+                    to_delete.append(row)
+                    continue
+                
+                # Fila sin TTL todavía activa (o sin fechas): asignarle vencimiento
+                report['backfilledRows'] += 1
+                if not dry_run:
+                    try:
+                        cart_table.update_item(
+                            Key={'userId': row['userId'], 'productId': row['productId']},
+                            UpdateExpression='SET #ttl = :expires_at',
+                            ConditionExpression='attribute_exists(userId) AND attribute_not_exists(#ttl)',
+                            ExpressionAttributeNames={'#ttl': CART_TTL_ATTRIBUTE},
+                            ExpressionAttributeValues={':expires_at': expires_at or cart_expiry(now)}
+                        )
+                    except ClientError as e:
+                        # La fila cambió (o se borró) desde el scan
+                        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                            raise
+            
+            report['staleRows'] += len(to_delete)
+            abandoned_users.update(row['userId'] for row in to_delete)
+            
+            # Eliminar fila por fila, condicionado a que siga vencida (o sin TTL): una fila
+            # renovada entre el scan y el borrado se conserva y no se descuenta
+            if to_delete and not dry_run:
+                deltas = {}
+                for row in to_delete:
+                    try:
+                        response = cart_table.delete_item(
+                            Key={'userId': row['userId'], 'productId': row['productId']},
+                            ConditionExpression='#ttl <= :now OR attribute_not_exists(#ttl)',
+                            ExpressionAttributeNames={'#ttl': CART_TTL_ATTRIBUTE},
+                            ExpressionAttributeValues={':now': int(now)},
+                            ReturnValues='ALL_OLD'
+                        )
+                    except ClientError as e:
+                        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                            raise
+                        report['skippedRows'] += 1
+                        continue
+                    
+                    deleted = response.get('Attributes')
+                    if not deleted:
+                        # DynamoDB (TTL) ya la había borrado: nada que descontar
+                        continue
+                    report['deletedRows'] += 1
+                    
+                    # Descontar de la cabecera con los valores realmente eliminados
+                    if not is_header(deleted):
+                        delta = deltas.setdefault(deleted['userId'], {'lines': 0, 'quantity': 0, 'price': 0})
+                        delta['lines'] -= 1
+                        delta['quantity'] -= int(deleted.get('quantity', 0))
+                        delta['price'] -= line_value(deleted)
+                
+                # Si la cabecera ya no existe (venció), apply_header_delta no hace nada
+                for user_id, delta in deltas.items():
+                    apply_header_delta(cart_headers_table, user_id, **delta)
+            
+            if not start_key:
+                report['complete'] = True
+                break
+            
+            # Cortar antes del timeout: el próximo barrido (o una invocación con startKey) continúa
+            if context and context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+                report['resumeKey'] = start_key
+                break
+        
+        report['abandonedCarts'] = len(abandoned_users)
+        report['durationMs'] = int((time.time() - started) * 1000)
+        print(f"Cart compaction report: {json.dumps(report, default=str)}")
+        
+        return report
+    
+    except Exception as e:
+        print(f"Error compacting carts: {str(e)}")
+        raise
@@ -1,17 +1,19 @@
 import json
 import boto3
 import os
-import uuid
 from decimal import Decimal
 from datetime import datetime, timezone, timedelta
 
+# Utilidades compartidas (capa common)
+from ids import get_order, new_sale_id, ORDER_STATUS_PENDING, ORDER_STATUS_COMPLETED
+from inventory import aggregate_quantities, consume_actions, sell_actions
+from product_repository import ProductRepository
+from catalog_cache import bump_stock_version
+from transactions import put, update, transact_write, TransactionCancelled, TRANSACTION_MAX_ACTIONS
+
 # Zona horaria de Bolivia (UTC-4)
 BOLIVIA_TZ = timezone(timedelta(hours=-4))
 
-def get_bolivia_now_iso():
-    """Obtiene la fecha y hora actual en Bolivia como string ISO"""
-    return datetime.now(BOLIVIA_TZ).isoformat()
-
 def get_bolivia_datetime_string():
     """Obtiene fecha y hora en formato legible para Bolivia"""
     return datetime.now(BOLIVIA_TZ).strftime('%d/%m/%Y %H:%M:%S BOT')
@@ -25,6 +27,9 @@ orders_table = dynamodb.Table(orders_table_name)
 sales_table = dynamodb.Table(sales_table_name)
 products_table = dynamodb.Table(products_table_name)
 
+# Versión de stock en la tabla Meta: vacía los caches del catálogo tras mover stock
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
     if isinstance(obj, Decimal):
@@ -82,15 +87,10 @@ def handler(event, context):
                 })
             }
         
-        # Buscar el pedido usando query (igual que create-order busca productos)
-        existing_order_response = orders_table.query(
-            KeyConditionExpression='orderId = :orderId',
-            ExpressionAttributeValues={':orderId': order_id}
-        )
+        # Buscar el pedido por clave (GetItem con la fecha derivada del id)
+        order = get_order(orders_table, order_id)
         
-        existing_orders = existing_order_response.get('Items', [])
-        
-        if not existing_orders:
+        if not order:
             return {
                 'statusCode': 404,
                 'headers': {
@@ -103,8 +103,6 @@ def handler(event, context):
                 })
             }
         
-        order = existing_orders[0]
-        
         # Verificar que el pedido esté en estado 'pending'
         if order.get('status') != 'pending':
             return {
@@ -119,11 +117,11 @@ def handler(event, context):
             }
         
         # Generar datos para la venta con zona horaria Bolivia
-        sale_id = f"SALE-{datetime.utcnow().strftime('%Y%m%d')}-{uuid.uuid4().hex[:6].upper()}"
-        completed_at = get_bolivia_now_iso()  # ← Usar hora Bolivia
+        # Id ordenable por tiempo: completedAt (sort key, hora Bolivia) se deriva del id
+        sale_id, completed_at = new_sale_id()
         completed_at_readable = get_bolivia_datetime_string()  # ← Para logs/display
         
-        # 1. Crear registro de venta (estructura simple como create-order)
+        # Registro de venta (estructura simple como create-order, se guarda en la transacción)
         sale_record = {
             'saleId': sale_id,
             'completedAt': completed_at,
@@ -137,65 +135,100 @@ def handler(event, context):
             'items': order.get('items', [])  # Copiar productos del pedido original
         }
         
-        sales_table.put_item(Item=sale_record)
+        # Cantidades por producto (una transacción no puede tocar dos veces el mismo item)
+        quantities = aggregate_quantities(order.get('items', []))
         
-        # 2. Reducir stock de productos
-        print("Reducing product stock...")
-        for item in order.get('items', []):
-            product_id = item.get('productId')
-            quantity_sold = int(item.get('quantity', 0))
-            
-            if product_id and quantity_sold > 0:
-                try:
-                    # Buscar el producto
-                    product_response = products_table.query(
-                        KeyConditionExpression='id = :id',
-                        ExpressionAttributeValues={':id': product_id}
-                    )
-                    
-                    products = product_response.get('Items', [])
-                    if products:
-                        product = products[0]
-                        current_stock = int(product.get('stock', 0))
-                        new_stock = max(0, current_stock - quantity_sold)  # No permitir stock negativo
-                        
-                        # Actualizar stock del producto
-                        products_table.update_item(
-                            Key={
-                                'id': product_id,
-                                'category': product.get('category')
-                            },
-                            UpdateExpression='SET stock = :new_stock, updatedAt = :updated_at',
-                            ExpressionAttributeValues={
-                                ':new_stock': new_stock,
-                                ':updated_at': completed_at  # ← Usar hora Bolivia
-                            }
-                        )
-                        print(f"Product {product_id}: stock reduced from {current_stock} to {new_stock} at {completed_at_readable}")
-                    else:
-                        print(f"Warning: Product {product_id} not found")
-                        
-                except Exception as e:
-                    print(f"Error updating stock for product {product_id}: {str(e)}")
-                    # Continuar con otros productos aunque uno falle
-        
-        # 3. Actualizar estado del pedido (estructura simple como create-order)
-        orders_table.update_item(
-            Key={
-                'orderId': order_id,
-                'createdAt': order.get('createdAt')
-            },
-            UpdateExpression='SET #status = :status, completedAt = :completed_at, saleId = :sale_id, updatedAt = :updated_at',
-            ExpressionAttributeNames={
-                '#status': 'status'
-            },
-            ExpressionAttributeValues={
-                ':status': 'completed',
+        # Pedidos antiguos sin categoría en las líneas: resolverla por id
+        if any(category is None for _, category in quantities):
+            repository = ProductRepository(products_table)
+            resolved = {}
+            for (product_id, category), quantity in quantities.items():
+                if category is None:
+                    category = (repository.get(product_id) or {}).get('category')
+                resolved[(product_id, category)] = resolved.get((product_id, category), 0) + quantity
+            quantities = resolved
+        
+        missing_products = [product_id for product_id, category in quantities if category is None]
+        if missing_products:
+            return {
+                'statusCode': 409,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Order cannot be completed, some products no longer exist',
+                    'missingProducts': missing_products
+                })
+            }
+        
+        if len(quantities) + 2 > TRANSACTION_MAX_ACTIONS:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Order has too many different products to complete atomically',
+                    'maxProducts': TRANSACTION_MAX_ACTIONS - 2
+                })
+            }
+        
+        # Venta + movimiento de stock + estado del pedido en una sola transacción:
+        # - con reserva (modo reserva) las unidades ya salieron de stock: se consume la reserva
+        # - sin reserva: stock = stock - cantidad con la condición stock >= cantidad
+        # - status = pending impide completar dos veces el mismo pedido
+        stock_reserved = bool(order.get('stockReserved'))
+        stock_builder = consume_actions if stock_reserved else sell_actions
+        
+        actions = [put(sales_table, sale_record, condition='attribute_not_exists(saleId)')]
+        actions.extend(stock_builder(products_table, quantities, completed_at))
+        actions.append(update(
+            orders_table,
+            {'orderId': order_id, 'createdAt': order.get('createdAt')},
+            'SET #status = :status, completedAt = :completed_at, saleId = :sale_id, updatedAt = :updated_at',
+            condition='#status = :pending',
+            names={'#status': 'status'},
+            values={
+                ':status': ORDER_STATUS_COMPLETED,
+                ':pending': ORDER_STATUS_PENDING,
                 ':completed_at': completed_at,
                 ':sale_id': sale_id,
                 ':updated_at': completed_at
             }
-        )
+        ))
+        
+        try:
+            transact_write(orders_table.meta.client, actions, token=sale_id)
+        except TransactionCancelled as e:
+            print(f"Complete transaction failed: {e.reasons}")
+            failed = e.failed()
+            product_ids = [product_id for product_id, _ in quantities]
+            
+            if len(actions) - 1 in failed:
+                message = 'Order is no longer pending, no changes were applied'
+            else:
+                message = 'Insufficient stock to complete order, no changes were applied'
+            
+            return {
+                'statusCode': 409,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': message,
+                    'orderId': order_id,
+                    'insufficientStock': [
+                        product_ids[index - 1]
+                        for index in failed if 0 < index <= len(product_ids)
+                    ]
+                })
+            }
+        
+        bump_stock_version(meta_table)
+        print(f"Order {order_id} completed as {sale_id} ({len(quantities)} products) at {completed_at_readable}")
         
         return {
             'statusCode': 200,
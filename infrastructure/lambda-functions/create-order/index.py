@@ -1,9 +1,17 @@
 import json
 import boto3
 import os
-import uuid
 from decimal import Decimal
-from datetime import datetime
+
+# Utilidades compartidas (capa common)
+from cart_store import load_cart
+from ids import new_order_id, ORDER_STATUS_PENDING
+from product_repository import ProductRepository
+from catalog_cache import bump_stock_version
+from transactions import put, delete, chunk_actions, transact_write, TransactionCancelled, TRANSACTION_MAX_ACTIONS
+from inventory import (
+    RESERVATION_ENABLED, available_stock, aggregate_quantities, reserve_actions, reservation_expiry
+)
 
 # Inicializar clientes DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -13,6 +21,11 @@ products_table_name = os.environ['PRODUCTS_TABLE']
 cart_table = dynamodb.Table(cart_table_name)
 orders_table = dynamodb.Table(orders_table_name)
 products_table = dynamodb.Table(products_table_name)
+# Cabecera de totales del carrito (tabla propia, fuera del índice productId-index)
+cart_headers_table = dynamodb.Table(os.environ['CART_HEADERS_TABLE'])
+
+# Versión de stock en la tabla Meta: vacía los caches del catálogo tras mover stock
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
 
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
@@ -39,13 +52,8 @@ def handler(event, context):
                 })
             }
         
-        # Obtener carrito del usuario
-        cart_response = cart_table.query(
-            KeyConditionExpression='userId = :userId',
-            ExpressionAttributeValues={':userId': user_id}
-        )
-        
-        cart_items = cart_response.get('Items', [])
+        # Obtener carrito del usuario (solo líneas, sin la cabecera de totales)
+        cart_items = load_cart(cart_table, user_id)
         
         if not cart_items:
             return {
@@ -60,49 +68,34 @@ def handler(event, context):
                 })
             }
         
-        # Validar stock disponible para todos los productos (SIN REDUCIR STOCK)
+        # Validar stock disponible para todos los productos
+        # Una sola lectura batch (BatchGetItem) en lugar de un query por línea
+        products = ProductRepository(products_table).get_many([
+            {'id': item['productId'], 'category': item.get('productCategory')}
+            for item in cart_items
+        ])
+        
         stock_issues = []
-        for item in cart_items:
-            product_id = item['productId']
+        for item, product in zip(cart_items, products):
             requested_quantity = int(item['quantity'])
             
-            # Buscar producto por ID - Arreglado para usar query correctamente
-            try:
-                # Primero intentamos obtener todas las categorías para este producto
-                product_response = products_table.query(
-                    KeyConditionExpression='id = :id',
-                    ExpressionAttributeValues={':id': product_id}
-                )
-                
-                products = product_response.get('Items', [])
-                if not products:
-                    stock_issues.append({
-                        'productId': product_id,
-                        'issue': 'Product no longer exists',
-                        'productName': item.get('productName', 'Unknown')
-                    })
-                    continue
-                
-                # Tomar el primer producto (debería ser único por ID)
-                product = products[0]
-                available_stock = int(product.get('stock', 0))
-                
-                if available_stock < requested_quantity:
-                    stock_issues.append({
-                        'productId': product_id,
-                        'issue': 'Insufficient stock',
-                        'productName': item.get('productName', 'Unknown'),
-                        'requestedQuantity': requested_quantity,
-                        'availableStock': available_stock
-                    })
-                    
-            except Exception as e:
-                print(f"Error checking stock for product {product_id}: {str(e)}")
+            if not product:
                 stock_issues.append({
-                    'productId': product_id,
-                    'issue': 'Error checking product availability',
+                    'productId': item['productId'],
+                    'issue': 'Product no longer exists',
                     'productName': item.get('productName', 'Unknown')
                 })
+                continue
+            
+            stock = available_stock(product)
+            if stock < requested_quantity:
+                stock_issues.append({
+                    'productId': item['productId'],
+                    'issue': 'Insufficient stock',
+                    'productName': item.get('productName', 'Unknown'),
+                    'requestedQuantity': requested_quantity,
+                    'availableStock': stock
+                })
         
         if stock_issues:
             return {
@@ -123,15 +116,17 @@ def handler(event, context):
         total_amount = Decimal('0')
         total_quantity = 0
         
-        for item in cart_items:
+        # La categoría sale del producto resuelto (parte de su clave): la fila del carrito
+        # puede no tenerla y las reservas, el completado y la cancelación la usan
+        for item, product in zip(cart_items, products):
             item_total = Decimal(str(item.get('productPrice', 0))) * Decimal(str(item.get('quantity', 0)))
             total_amount += item_total
             total_quantity += int(item.get('quantity', 0))
             
             order_items.append({
-                'productId': item['productId'],
+                'productId': product['id'],
                 'productName': item.get('productName', ''),
-                'productCategory': item.get('productCategory', ''),
+                'productCategory': product['category'],
                 'productImageUrl': item.get('productImageUrl', ''),
                 'unitPrice': Decimal(str(item.get('productPrice', 0))),
                 'quantity': int(item.get('quantity', 0)),
@@ -139,8 +134,8 @@ def handler(event, context):
             })
         
         # Generar ID único para el pedido
-        order_id = f"ORD-{datetime.utcnow().strftime('%Y%m%d')}-{uuid.uuid4().hex[:6].upper()}"
-        created_at = datetime.utcnow().isoformat()
+        # Id ordenable por tiempo: createdAt (sort key) se deriva del id
+        order_id, created_at = new_order_id()
         
         # Información del cliente (desde JWT y datos adicionales)
         customer_info = {
@@ -156,7 +151,7 @@ def handler(event, context):
             'orderId': order_id,
             'createdAt': created_at,
             'userId': user_id,
-            'status': 'pending',  # pending -> completed (cuando admin entregue)
+            'status': ORDER_STATUS_PENDING,  # pending -> completed (cuando admin entregue)
             'customerInfo': customer_info,
             'items': order_items,
             'summary': {
@@ -170,20 +165,98 @@ def handler(event, context):
             'whatsappSent': False  # Se marca como true cuando se envíe WhatsApp
         }
         
-        # Guardar pedido en DynamoDB
-        orders_table.put_item(Item=order)
+        # Modo reserva: las unidades pasan de stock a reserved junto con el pedido
+        # (condición stock >= cantidad), si no el stock se descuenta al completarlo
+        quantities = aggregate_quantities(order_items) if RESERVATION_ENABLED else {}
+        if RESERVATION_ENABLED:
+            if len(quantities) + 1 > TRANSACTION_MAX_ACTIONS:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'message': 'Too many different products for a single order',
+                        'maxProducts': TRANSACTION_MAX_ACTIONS - 1
+                    })
+                }
+            order['stockReserved'] = True
+            order['reservationExpiresAt'] = reservation_expiry()
         
-        # Limpiar carrito del usuario (pedido creado exitosamente)
+        # Guardar el pedido (y reservar stock) y vaciar el carrito en una transacción:
+        # - cada línea se borra solo si su cantidad no cambió desde la lectura
+        # - el pedido y las reservas viajan en el primer bloque junto con las primeras líneas
+        # - carritos de más de 100 acciones se limpian en bloques adicionales
+        actions = [put(orders_table, order, condition='attribute_not_exists(orderId)')]
+        actions.extend(reserve_actions(products_table, quantities, created_at))
+        reserved_products = [product_id for product_id, _ in quantities]
         for item in cart_items:
-            cart_table.delete_item(
-                Key={
-                    'userId': user_id,
-                    'productId': item['productId']
+            actions.append(delete(
+                cart_table,
+                {'userId': user_id, 'productId': item['productId']},
+                condition='quantity = :quantity',
+                values={':quantity': item['quantity']}
+            ))
+        actions.append(delete(cart_headers_table, {'userId': user_id}))
+        
+        client = orders_table.meta.client
+        chunks = chunk_actions(actions)
+        
+        try:
+            transact_write(client, chunks[0], token=f"{order_id}-0")
+        except TransactionCancelled as e:
+            print(f"Checkout cancelled for {user_id}: {e.reasons}")
+            failed = e.failed()
+            
+            # Otro pedido reservó las últimas unidades entre la validación y la transacción
+            out_of_stock = [
+                reserved_products[index - 1]
+                for index in failed if 0 < index <= len(reserved_products)
+            ]
+            if out_of_stock:
+                return {
+                    'statusCode': 409,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'message': 'Cannot create order, stock was reserved by another order',
+                        'outOfStockProducts': out_of_stock,
+                        'suggestion': 'Update cart quantities or remove unavailable products'
+                    })
                 }
-            )
+            
+            first_line = len(reserved_products) + 1
+            return {
+                'statusCode': 409,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Cart changed during checkout, no order was created',
+                    'changedProducts': [
+                        cart_items[index - first_line]['productId']
+                        for index in failed if first_line <= index < first_line + len(cart_items)
+                    ],
+                    'suggestion': 'Review your cart and try again'
+                })
+            }
+        
+        # Bloques restantes (solo carritos muy grandes): el pedido ya existe,
+        # si una línea cambió entretanto queda en el carrito
+        for number, chunk in enumerate(chunks[1:], start=1):
+            try:
+                transact_write(client, chunk, token=f"{order_id}-{number}")
+            except TransactionCancelled as e:
+                print(f"Could not clear cart chunk {number} for order {order_id}: {e.reasons}")
         
-        # IMPORTANTE: NO reducimos stock aquí
-        # El stock se reducirá cuando el admin marque el pedido como "completed"
+        # Sin modo reserva NO reducimos stock aquí:
+        # el stock se reducirá cuando el admin marque el pedido como "completed"
+        if quantities:
+            bump_stock_version(meta_table)
         
         return {
             'statusCode': 201,
@@ -198,6 +271,8 @@ def handler(event, context):
                 'order': {
                     'orderId': order_id,
                     'status': 'pending',
+                    'stockReserved': bool(order.get('stockReserved')),
+                    'reservationExpiresAt': order.get('reservationExpiresAt'),
                     'totalAmount': float(total_amount),
                     'totalItems': len(order_items),
                     'totalQuantity': total_quantity,
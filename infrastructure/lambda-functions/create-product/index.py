@@ -5,10 +5,22 @@ import uuid
 from decimal import Decimal
 from datetime import datetime
 
+# Utilidades compartidas (capa common)
+from product_repository import ProductRepository
+from catalog_cache import bump_catalog_version
+from product_facets import apply_facet_delta
+from catalog_snapshot import request_snapshot
+from http_responses import parse_json_body
+
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 products_table_name = os.environ['PRODUCTS_TABLE']
 products_table = dynamodb.Table(products_table_name)
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+
+# Lambda que regenera el snapshot del catálogo en S3
+lambda_client = boto3.client('lambda')
+snapshot_function_name = os.environ.get('SNAPSHOT_FUNCTION_NAME')
 
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
@@ -135,7 +147,7 @@ def handler(event, context):
             }
         
         # Parsear body de la request
-        body = json.loads(event.get('body', '{}'))
+        body = parse_json_body(event)
         
         # Generar ID automáticamente si no se proporciona
         import uuid
@@ -240,13 +252,8 @@ def handler(event, context):
                 })
             }
         
-        # Verificar si el producto ya existe
-        existing_product = products_table.scan(
-            FilterExpression='id = :id',
-            ExpressionAttributeValues={':id': product_id}
-        )
-        
-        if existing_product.get('Items'):
+        # Verificar si el producto ya existe (query por partition key)
+        if ProductRepository(products_table).get(product_id):
             return {
                 'statusCode': 409,
                 'headers': {
@@ -285,6 +292,12 @@ def handler(event, context):
         # Guardar producto en DynamoDB
         products_table.put_item(Item=new_product)
         
+        # Actualizar contadores de facetas y luego invalidar caches del catálogo
+        # y regenerar el snapshot público
+        apply_facet_delta(meta_table, None, new_product)
+        catalog_version = bump_catalog_version(meta_table)
+        request_snapshot(lambda_client, snapshot_function_name, catalog_version)
+        
         return {
             'statusCode': 201,
             'headers': {
@@ -2,6 +2,14 @@ import json
 import boto3
 import os
 from decimal import Decimal
+from botocore.exceptions import ClientError
+
+# Utilidades compartidas (capa common)
+from product_repository import ProductRepository
+from catalog_cache import bump_catalog_version
+from product_facets import apply_facet_delta
+from catalog_snapshot import request_snapshot
+from cart_store import iter_product_cart_rows, apply_header_delta, line_value
 
 # Inicializar clientes DynamoDB
 dynamodb = boto3.resource('dynamodb')
@@ -9,6 +17,14 @@ products_table_name = os.environ['PRODUCTS_TABLE']
 cart_table_name = os.environ['CART_TABLE']
 products_table = dynamodb.Table(products_table_name)
 cart_table = dynamodb.Table(cart_table_name)
+# Cabecera de totales del carrito (tabla propia, fuera del índice productId-index)
+cart_headers_table = dynamodb.Table(os.environ['CART_HEADERS_TABLE'])
+cart_product_index = os.environ.get('CART_PRODUCT_INDEX', 'productId-index')
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+
+# Lambda que regenera el snapshot del catálogo en S3
+lambda_client = boto3.client('lambda')
+snapshot_function_name = os.environ.get('SNAPSHOT_FUNCTION_NAME')
 
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
@@ -16,6 +32,26 @@ def decimal_default(obj):
         return float(obj)
     raise TypeError
 
+def reserved_conflict(product, reserved):
+    """Respuesta 409: el producto tiene unidades reservadas por pedidos pendientes"""
+    return {
+        'statusCode': 409,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps({
+            'message': 'Cannot delete product - pending orders hold reserved units',
+            'productId': product.get('id'),
+            'productName': product.get('name'),
+            'reservedStock': reserved,
+            'options': [
+                'Complete or cancel the pending orders first',
+                'Wait for the reservations to expire (release-reservations)'
+            ]
+        })
+    }
+
 def handler(event, context):
     try:
         # Obtener información del usuario desde Cognito (JWT token)
@@ -74,14 +110,9 @@ def handler(event, context):
         query_params = event.get('queryStringParameters') or {}
         force_delete = query_params.get('force', '').lower() == 'true'
         
-        # Verificar que el producto existe
-        existing_product_response = products_table.scan(
-            FilterExpression='id = :id',
-            ExpressionAttributeValues={':id': product_id}
-        )
-        
-        existing_products = existing_product_response.get('Items', [])
-        if not existing_products:
+        # Verificar que el producto existe (query por partition key)
+        existing_product = ProductRepository(products_table).get(product_id)
+        if not existing_product:
             return {
                 'statusCode': 404,
                 'headers': {
@@ -94,15 +125,14 @@ def handler(event, context):
                 })
             }
         
-        existing_product = existing_products[0]
-        
-        # Verificar si el producto está en carritos de usuarios
-        cart_items_response = cart_table.scan(
-            FilterExpression='productId = :productId',
-            ExpressionAttributeValues={':productId': product_id}
-        )
+        # Pedidos pendientes con unidades reservadas: ni siquiera con force, porque
+        # al cancelarlos o vencer la reserva no habría producto al cual devolverlas
+        reserved = int(existing_product.get('reserved', 0))
+        if reserved > 0:
+            return reserved_conflict(existing_product, reserved)
         
-        cart_items = cart_items_response.get('Items', [])
+        # Verificar si el producto está en carritos de usuarios (query al índice inverso)
+        cart_items = list(iter_product_cart_rows(cart_table, product_id, cart_product_index))
         
         if cart_items and not force_delete:
             return {
@@ -132,13 +162,25 @@ def handler(event, context):
             }
         
         # Si force_delete=true, eliminar de todos los carritos primero
+        # (batch_writer agrupa de a 25 y reintenta los items no procesados)
         if cart_items and force_delete:
+            with cart_table.batch_writer() as batch:
+                for cart_item in cart_items:
+                    batch.delete_item(
+                        Key={
+                            'userId': cart_item.get('userId'),
+                            'productId': product_id
+                        }
+                    )
+            
+            # Descontar la línea de la cabecera de totales de cada carrito afectado
             for cart_item in cart_items:
-                cart_table.delete_item(
-                    Key={
-                        'userId': cart_item.get('userId'),
-                        'productId': product_id
-                    }
+                apply_header_delta(
+                    cart_headers_table,
+                    cart_item.get('userId'),
+                    lines=-1,
+                    quantity=-int(cart_item.get('quantity', 0)),
+                    price=-line_value(cart_item)
                 )
         
         # Guardar información del producto antes de eliminarlo
@@ -152,13 +194,28 @@ def handler(event, context):
             'averageRating': float(existing_product.get('averageRating', 0))
         }
         
-        # Eliminar producto
-        products_table.delete_item(
-            Key={
-                'id': product_id,
-                'category': existing_product.get('category')
-            }
-        )
+        # Eliminar producto (solo si ningún pedido reservó unidades desde la lectura)
+        try:
+            products_table.delete_item(
+                Key={
+                    'id': product_id,
+                    'category': existing_product.get('category')
+                },
+                ConditionExpression='attribute_not_exists(reserved) OR reserved <= :zero',
+                ExpressionAttributeValues={':zero': 0},
+                ReturnValuesOnConditionCheckFailure='ALL_OLD'
+            )
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            reserved = int(e.response.get('Item', {}).get('reserved', {}).get('N', 0))
+            return reserved_conflict(existing_product, reserved)
+        
+        # Descontar de los contadores de facetas y luego invalidar caches del catálogo
+        # y regenerar el snapshot público
+        apply_facet_delta(meta_table, existing_product, None)
+        catalog_version = bump_catalog_version(meta_table)
+        request_snapshot(lambda_client, snapshot_function_name, catalog_version)
         
         return {
             'statusCode': 200,
@@ -0,0 +1,41 @@
+import json
+import boto3
+import os
+
+# Utilidades compartidas (capa common)
+from catalog_cache import read_catalog_version
+from catalog_snapshot import publish_snapshot
+
+# Inicializar clientes DynamoDB y S3
+dynamodb = boto3.resource('dynamodb')
+products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE'])
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+s3_client = boto3.client('s3')
+bucket_name = os.environ['IMAGES_BUCKET']
+
+def handler(event, context):
+    """
+    Genera el snapshot comprimido del catálogo público
+    Invocado de forma asíncrona por create/update/delete-product con {'catalogVersion': N}
+    """
+    try:
+        version = (event or {}).get('catalogVersion')
+        if version is None:
+            version = read_catalog_version(meta_table)
+        version = int(version)
+        
+        print(f"Generating catalog snapshot v{version}...")
+        manifest = publish_snapshot(products_table, s3_client, bucket_name, version)
+        print(f"Snapshot published: v{manifest.get('version')}, {manifest.get('count')} products, {manifest.get('compressedBytes')} bytes")
+        
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'message': 'Catalog snapshot generated successfully',
+                'manifest': manifest
+            })
+        }
+        
+    except Exception as e:
+        print(f"Error generating catalog snapshot: {str(e)}")
+        raise
@@ -4,6 +4,9 @@ import os
 from datetime import datetime
 import uuid
 
+# Utilidades compartidas (capa common)
+from http_responses import parse_json_body
+
 # Inicializar cliente S3
 s3_client = boto3.client('s3')
 bucket_name = os.environ.get('IMAGES_BUCKET') or os.environ.get('PRODUCT_IMAGES_BUCKET')
@@ -49,7 +52,7 @@ def handler(event, context):
             }
         
         # Parsear body de la request
-        body = json.loads(event.get('body', '{}'))
+        body = parse_json_body(event)
         
         # Detectar si es una imagen única o múltiples imágenes
         if 'fileNames' in body:
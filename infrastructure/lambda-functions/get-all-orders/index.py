@@ -1,19 +1,115 @@
 import json
 import boto3
+import heapq
 import os
 from decimal import Decimal
+from datetime import datetime, timezone
+from itertools import islice
+from boto3.dynamodb.conditions import Key
+
+# Utilidades compartidas (capa common)
+from http_responses import compress_response
+from pagination import fetch_page, parse_limit, encode_cursor, decode_cursor
+from projection import ORDER_FIELDS, ORDER_KEY_FIELDS, parse_fields, projection_params
+from ids import ORDER_STATUSES
 
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 orders_table_name = os.environ['ORDERS_TABLE']
 orders_table = dynamodb.Table(orders_table_name)
 
+# Índice status (PK) + createdAt (SK): cada estado es una partición ya ordenada por fecha
+# (los estados posibles vienen de ids.ORDER_STATUSES, compartidos con quienes los escriben)
+STATUS_INDEX = os.environ.get('STATUS_INDEX', 'status-createdAt-index')
+
+# Página con la que se completa el grupo de pedidos del mismo instante donde se corta
+TIE_PAGE_SIZE = 10
+
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
     if isinstance(obj, Decimal):
         return float(obj)
     raise TypeError
 
+def parse_date(value, end_of_day=False):
+    """
+    Normaliza from/to al formato de createdAt (ISO UTC sin zona, como datetime.utcnow())
+    Una fecha sin hora en `to` incluye el día completo.
+    Raises: ValueError si no es una fecha ISO
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end_of_day and len(value) == 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return parsed.isoformat()
+
+def order_position(order):
+    """Orden total de los pedidos en el listado: createdAt y, a igual fecha, orderId"""
+    return (order['createdAt'], order['orderId'])
+
+def query_status(status, date_from, date_to, cursor, limit, projection):
+    """
+    Pedidos de un estado en el rango de fechas, del más reciente al más antiguo
+    El cursor (createdAt + orderId del último pedido devuelto) acota el rango por
+    arriba, así el mismo cursor sirve para uno o varios estados mezclados.
+    El índice solo ordena por createdAt: los pedidos de un mismo instante salen en
+    cualquier orden. Por eso se lee completo el grupo de la fecha donde se corta y la
+    lista se ordena por (createdAt, orderId), el mismo orden que usan el merge y el cursor.
+    Returns: al menos limit pedidos (o todos los del rango) ordenados por order_position
+    """
+    upper = date_to
+    if cursor and (upper is None or cursor['createdAt'] < upper):
+        upper = cursor['createdAt']
+    
+    key_condition = Key('status').eq(status)
+    if date_from and upper:
+        key_condition = key_condition & Key('createdAt').between(date_from, upper)
+    elif date_from:
+        key_condition = key_condition & Key('createdAt').gte(date_from)
+    elif upper:
+        key_condition = key_condition & Key('createdAt').lte(upper)
+    
+    # El rango incluye la fecha del cursor (puede haber otros pedidos en el mismo
+    # instante), así que los pedidos ya devueltos de esa fecha vuelven a salir y se
+    # descartan: se sigue leyendo hasta juntar `limit` pedidos posteriores al cursor
+    # (más los de la fecha del último) o agotar el rango
+    position = order_position(cursor) if cursor else None
+    orders = []
+    start_key = None
+    while True:
+        page, start_key = fetch_page(
+            orders_table.query,
+            limit - len(orders) if len(orders) < limit else TIE_PAGE_SIZE,
+            start_key,
+            IndexName=STATUS_INDEX,
+            KeyConditionExpression=key_condition,
+            ScanIndexForward=False,
+            **projection
+        )
+        if position:
+            page = [o for o in page if order_position(o) < position]
+        
+        if len(orders) >= limit:
+            # Solo falta completar el grupo de la fecha donde se cortó
+            boundary = orders[limit - 1]['createdAt']
+            tied = [o for o in page if o['createdAt'] == boundary]
+            orders.extend(tied)
+            if len(tied) < len(page):
+                break
+        else:
+            orders.extend(page)
+        
+        if not start_key:
+            break
+        if len(orders) >= limit and orders[-1]['createdAt'] != orders[limit - 1]['createdAt']:
+            break
+    
+    orders.sort(key=order_position, reverse=True)
+    return orders
+
 def handler(event, context):
     try:
         # Obtener información del usuario desde Cognito (JWT token)
@@ -48,14 +144,68 @@ def handler(event, context):
                 })
             }
         
-        # Obtener todos los pedidos (igual que get-products)
-        response = orders_table.scan()
-        orders = response.get('Items', [])
+        # Campos a devolver: ?fields=... (ProjectionExpression)
+        query_params = event.get('queryStringParameters') or {}
+        try:
+            fields = parse_fields(query_params, ORDER_FIELDS, ORDER_KEY_FIELDS)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid fields parameter',
+                    'error': str(e),
+                    'availableFields': list(ORDER_FIELDS)
+                })
+            }
         
-        # Ordenar por fecha de creación (más recientes primero)
-        orders.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
+        # Filtros y paginación: ?status=pending&from=2024-01-01&to=2024-01-31&limit=50&cursor=...
+        status = query_params.get('status') or None
+        try:
+            if status and status not in ORDER_STATUSES:
+                raise ValueError(f"status must be one of: {', '.join(ORDER_STATUSES)}")
+            date_from = parse_date(query_params.get('from'))
+            date_to = parse_date(query_params.get('to'), end_of_day=True)
+            limit = parse_limit(query_params)
+            cursor = decode_cursor(query_params.get('cursor'))
+            if cursor and not {'createdAt', 'orderId'} <= set(cursor):
+                raise ValueError('Invalid cursor')
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid query parameters',
+                    'error': str(e),
+                    'availableStatuses': list(ORDER_STATUSES)
+                })
+            }
         
-        return {
+        # Una query por estado (limit + 1 para saber si hay otra página); sin estado se
+        # mezclan las particiones ya ordenadas, sin ordenar en memoria. El costo depende
+        # de limit, no de cuántos pedidos históricos tenga la tabla.
+        projection = projection_params(fields)
+        streams = [
+            query_status(s, date_from, date_to, cursor, limit + 1, projection)
+            for s in ([status] if status else ORDER_STATUSES)
+        ]
+        orders = list(islice(
+            heapq.merge(*streams, key=order_position, reverse=True),
+            limit + 1
+        ))
+        
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            next_cursor = encode_cursor({'createdAt': orders[-1]['createdAt'], 'orderId': orders[-1]['orderId']})
+        
+        return compress_response(event, {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
@@ -66,9 +216,12 @@ def handler(event, context):
             'body': json.dumps({
                 'message': 'Orders retrieved successfully',
                 'orders': orders,
-                'count': len(orders)
+                'count': len(orders),
+                'status': status,
+                'limit': limit,
+                'nextCursor': next_cursor
             }, default=decimal_default)
-        }
+        })
         
     except Exception as e:
         print(f"Error getting orders: {str(e)}")
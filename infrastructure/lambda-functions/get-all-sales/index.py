@@ -3,6 +3,11 @@ import boto3
 import os
 from decimal import Decimal
 
+# Utilidades compartidas (capa common)
+from http_responses import compress_response
+from pagination import iter_items
+from projection import SALE_FIELDS, SALE_KEY_FIELDS, parse_fields, projection_params
+
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 sales_table_name = os.environ['SALES_TABLE']
@@ -48,14 +53,31 @@ def handler(event, context):
                 })
             }
         
-        # Obtener todas las ventas (igual que get-products)
-        response = sales_table.scan()
-        sales = response.get('Items', [])
+        # Campos a devolver: ?fields=... (ProjectionExpression)
+        query_params = event.get('queryStringParameters') or {}
+        try:
+            fields = parse_fields(query_params, SALE_FIELDS, SALE_KEY_FIELDS)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid fields parameter',
+                    'error': str(e),
+                    'availableFields': list(SALE_FIELDS)
+                })
+            }
+        
+        # Obtener todas las ventas (recorriendo todas las páginas, igual que get-products)
+        sales = list(iter_items(sales_table.scan, **projection_params(fields)))
         
         # Ordenar por fecha de completado (más recientes primero)
         sales.sort(key=lambda x: x.get('completedAt', ''), reverse=True)
         
-        return {
+        return compress_response(event, {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
@@ -68,7 +90,7 @@ def handler(event, context):
                 'sales': sales,
                 'count': len(sales)
             }, default=decimal_default)
-        }
+        })
         
     except Exception as e:
         print(f"Error getting sales: {str(e)}")
@@ -0,0 +1,96 @@
+import json
+import boto3
+import os
+from decimal import Decimal
+from botocore.exceptions import ClientError
+
+# Utilidades compartidas (capa common)
+from cart_store import load_cart, read_header, write_header, header_summary, header_may_be_stale
+
+# Inicializar cliente DynamoDB
+dynamodb = boto3.resource('dynamodb')
+cart_table_name = os.environ['CART_TABLE']
+cart_table = dynamodb.Table(cart_table_name)
+# Cabecera de totales del carrito (tabla propia, fuera del índice productId-index)
+cart_headers_table = dynamodb.Table(os.environ['CART_HEADERS_TABLE'])
+
+# Función para convertir Decimal a float/int
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+def read_or_rebuild_header(user_id):
+    """
+    Lee la cabecera de totales (un GetItem); la recalcula desde las líneas si no existe
+    o si alguna línea contada pudo vencer por TTL (esos borrados no la descuentan)
+    Un carrito vacío sin cabecera se responde calculado, sin escribir nada.
+    Returns: (cabecera o None, reconstruida)
+    """
+    header = read_header(cart_headers_table, user_id)
+    if header and not header_may_be_stale(header):
+        return header, False
+    
+    lines = load_cart(cart_table, user_id)
+    if not lines and header is None:
+        return None, False
+    
+    try:
+        return write_header(cart_headers_table, user_id, lines, read_header=header), True
+    except ClientError as e:
+        # Otra invocación (o un delta) la cambió primero: usar la guardada
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+        return read_header(cart_headers_table, user_id, consistent=True), False
+
+def handler(event, context):
+    try:
+        # Obtener userId desde Cognito (JWT token)
+        user_id = event.get('requestContext', {}).get('authorizer', {}).get('claims', {}).get('sub')
+        
+        if not user_id:
+            return {
+                'statusCode': 401,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Unauthorized - User authentication required',
+                    'error': 'Missing or invalid JWT token'
+                })
+            }
+        
+        # Totales mantenidos por los handlers del carrito: no se leen las líneas
+        header, rebuilt = read_or_rebuild_header(user_id)
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+            },
+            'body': json.dumps({
+                'message': 'Cart summary retrieved successfully',
+                'userId': user_id,
+                'summary': header_summary(header),
+                'updatedAt': (header or {}).get('updatedAt'),
+                'rebuilt': rebuilt
+            }, default=decimal_default)
+        }
+        
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'message': 'Internal server error',
+                'error': str(e)
+            })
+        }
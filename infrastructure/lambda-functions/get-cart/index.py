@@ -2,11 +2,19 @@ import json
 import boto3
 import os
 from decimal import Decimal
+from botocore.exceptions import ClientError
+
+# Utilidades compartidas (capa common)
+from cart_store import load_cart_with_header, touch_cart, summarize_cart, enrich_cart, header_matches, write_header
+from product_repository import ProductRepository
 
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 cart_table_name = os.environ['CART_TABLE']
 cart_table = dynamodb.Table(cart_table_name)
+# Cabecera de totales del carrito (tabla propia, fuera del índice productId-index)
+cart_headers_table = dynamodb.Table(os.environ['CART_HEADERS_TABLE'])
+products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE'])
 
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
@@ -32,35 +40,40 @@ def handler(event, context):
                 })
             }
         
-        # Obtener todos los items del carrito del usuario
-        response = cart_table.query(
-            KeyConditionExpression='userId = :userId',
-            ExpressionAttributeValues={':userId': user_id}
-        )
+        # Obtener todos los items del carrito del usuario (y la cabecera de totales)
+        cart_items, header = load_cart_with_header(cart_table, cart_headers_table, user_id)
+        lines = cart_items
         
-        cart_items = response.get('Items', [])
+        # Carrito activo: posponer su vencimiento (TTL)
+        touch_cart(cart_table, cart_items)
+        if header:
+            touch_cart(cart_headers_table, [header])
         
-        # Calcular totales
-        total_items = len(cart_items)
-        total_quantity = sum(int(item.get('quantity', 0)) for item in cart_items)
-        total_price = sum(
-            float(item.get('productPrice', 0)) * int(item.get('quantity', 0)) 
-            for item in cart_items
-        )
+        # ?enrich=true: precio y stock actuales de todos los productos en una lectura batch
+        query_params = event.get('queryStringParameters') or {}
+        enrich = (query_params.get('enrich') or '').lower() == 'true'
         
-        # Agrupar por categorías para estadísticas
-        categories = {}
-        for item in cart_items:
-            category = item.get('productCategory', 'unknown')
-            if category not in categories:
-                categories[category] = {
-                    'count': 0,
-                    'totalQuantity': 0,
-                    'totalPrice': 0
-                }
-            categories[category]['count'] += 1
-            categories[category]['totalQuantity'] += int(item.get('quantity', 0))
-            categories[category]['totalPrice'] += float(item.get('productPrice', 0)) * int(item.get('quantity', 0))
+        if enrich:
+            products = ProductRepository(products_table).get_many([
+                {'id': item['productId'], 'category': item.get('productCategory')}
+                for item in cart_items
+            ])
+            stored_summary, _ = summarize_cart(cart_items)
+            cart_items, summary, categories = enrich_cart(cart_items, products)
+        else:
+            # Calcular totales y agrupar por categorías (una sola pasada)
+            summary, categories = summarize_cart(cart_items)
+            stored_summary = summary
+        
+        # Corregir la cabecera (badge) si se desvió de las líneas
+        # (condicionada a la cabecera leída: si un delta llegó entretanto se deja para la próxima)
+        if not header_matches(header, stored_summary):
+            print(f"Cart header out of sync for {user_id}, rewriting")
+            try:
+                write_header(cart_headers_table, user_id, lines, read_header=header)
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                    raise
         
         return {
             'statusCode': 200,
@@ -73,14 +86,10 @@ def handler(event, context):
             'body': json.dumps({
                 'message': 'Cart retrieved successfully',
                 'userId': user_id,
+                'enriched': enrich,
                 'cart': {
                     'items': cart_items,
-                    'summary': {
-                        'totalItems': total_items,
-                        'totalQuantity': total_quantity,
-                        'totalPrice': round(total_price, 2),
-                        'isEmpty': total_items == 0
-                    },
+                    'summary': summary,
                     'categoriesBreakdown': categories
                 }
             }, default=decimal_default)
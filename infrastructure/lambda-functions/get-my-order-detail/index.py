@@ -0,0 +1,127 @@
+import json
+import boto3
+import os
+from decimal import Decimal
+
+# Utilidades compartidas (capa common)
+from ids import get_order
+
+# Inicializar cliente DynamoDB
+dynamodb = boto3.resource('dynamodb')
+orders_table_name = os.environ['ORDERS_TABLE']
+orders_table = dynamodb.Table(orders_table_name)
+
+# Función para convertir Decimal a float/int
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+def handler(event, context):
+    """
+    Detalle de un pedido del usuario autenticado (GET /orders/{orderId})
+    Lectura por clave de la tabla Orders; un pedido de otro usuario responde 404
+    igual que uno inexistente, para no revelar qué ids existen.
+    """
+    try:
+        # Obtener userId desde Cognito (JWT token)
+        user_id = event.get('requestContext', {}).get('authorizer', {}).get('claims', {}).get('sub')
+        
+        if not user_id:
+            return {
+                'statusCode': 401,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Unauthorized - User authentication required',
+                    'error': 'Missing or invalid JWT token'
+                })
+            }
+        
+        order_id = (event.get('pathParameters') or {}).get('orderId')
+        if not order_id:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Order ID is required',
+                    'error': 'Missing orderId in path parameters'
+                })
+            }
+        
+        # Lectura por clave (GetItem con la fecha derivada del id)
+        order = get_order(orders_table, order_id)
+        
+        if not order or order.get('userId') != user_id:
+            return {
+                'statusCode': 404,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Order not found',
+                    'orderId': order_id
+                })
+            }
+        
+        # Solo datos visibles para el cliente (sin notas ni acciones de admin)
+        summary = order.get('summary', {})
+        detailed_order = {
+            'orderId': order.get('orderId'),
+            'status': order.get('status', 'pending'),
+            'createdAt': order.get('createdAt'),
+            'updatedAt': order.get('updatedAt'),
+            'completedAt': order.get('completedAt'),
+            'deliveryMethod': order.get('deliveryMethod'),
+            'paymentMethod': order.get('paymentMethod'),
+            'items': [
+                {
+                    'productId': item.get('productId'),
+                    'productName': item.get('productName', 'Unknown Product'),
+                    'productImageUrl': item.get('productImageUrl', ''),
+                    'category': item.get('productCategory') or item.get('category', ''),
+                    'quantity': int(item.get('quantity', 0)),
+                    'unitPrice': item.get('unitPrice', 0),
+                    'subtotal': item.get('subtotal', 0)
+                }
+                for item in order.get('items', [])
+            ],
+            'summary': {
+                'totalItems': int(summary.get('totalItems', 0)),
+                'totalQuantity': int(summary.get('totalQuantity', 0)),
+                'totalAmount': summary.get('totalAmount', 0)
+            }
+        }
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+            },
+            'body': json.dumps({
+                'order': detailed_order
+            }, default=decimal_default)
+        }
+        
+    except Exception as e:
+        print(f"Error getting user order detail: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'message': 'Internal server error getting order detail',
+                'error': str(e)
+            })
+        }
@@ -0,0 +1,118 @@
+import json
+import boto3
+import os
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+
+# Utilidades compartidas (capa common)
+from http_responses import compress_response
+from pagination import fetch_page, parse_limit, encode_cursor, decode_cursor
+
+# Inicializar cliente DynamoDB
+dynamodb = boto3.resource('dynamodb')
+orders_table_name = os.environ['ORDERS_TABLE']
+orders_table = dynamodb.Table(orders_table_name)
+
+# Índice userId (PK) + createdAt (SK) que proyecta solo status y summary
+USER_INDEX = os.environ.get('USER_INDEX', 'userId-createdAt-index')
+
+# Función para convertir Decimal a float/int
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+def order_summary(order):
+    """Resumen compacto de un pedido para el historial (el detalle va por GET /orders/{orderId})"""
+    summary = order.get('summary', {})
+    return {
+        'orderId': order.get('orderId'),
+        'status': order.get('status', 'pending'),
+        'createdAt': order.get('createdAt'),
+        'totalAmount': summary.get('totalAmount', 0),
+        'totalItems': int(summary.get('totalItems', 0))
+    }
+
+def handler(event, context):
+    """
+    Historial de pedidos del usuario autenticado (más recientes primero)
+    Query sobre el índice por usuario: el costo depende de la página pedida,
+    no del total de pedidos de la tienda.
+    Query string: ?limit=N&cursor=... (cursor opaco devuelto como nextCursor)
+    """
+    try:
+        # Obtener userId desde Cognito (JWT token)
+        user_id = event.get('requestContext', {}).get('authorizer', {}).get('claims', {}).get('sub')
+        
+        if not user_id:
+            return {
+                'statusCode': 401,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Unauthorized - User authentication required',
+                    'error': 'Missing or invalid JWT token'
+                })
+            }
+        
+        query_params = event.get('queryStringParameters') or {}
+        try:
+            limit = parse_limit(query_params)
+            start_key = decode_cursor(query_params.get('cursor'))
+            # El cursor tiene que ser de este mismo usuario
+            if start_key and start_key.get('userId') != user_id:
+                raise ValueError('Invalid cursor')
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid pagination parameters',
+                    'error': str(e)
+                })
+            }
+        
+        orders, last_key = fetch_page(
+            orders_table.query,
+            limit,
+            start_key,
+            IndexName=USER_INDEX,
+            KeyConditionExpression=Key('userId').eq(user_id),
+            ScanIndexForward=False
+        )
+        
+        return compress_response(event, {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+            },
+            'body': json.dumps({
+                'message': 'Orders retrieved successfully',
+                'orders': [order_summary(order) for order in orders],
+                'count': len(orders),
+                'limit': limit,
+                'nextCursor': encode_cursor(last_key)
+            }, default=decimal_default)
+        })
+        
+    except Exception as e:
+        print(f"Error getting user orders: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'message': 'Internal server error getting orders',
+                'error': str(e)
+            })
+        }
@@ -4,6 +4,9 @@ import os
 from decimal import Decimal
 from botocore.exceptions import ClientError
 
+# Utilidades compartidas (capa common)
+from ids import get_order
+
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 orders_table_name = os.environ['ORDERS_TABLE']
@@ -68,14 +71,9 @@ def handler(event, context):
             }
         
         try:
-            # Buscar el pedido específico
-            order_response = orders_table.query(
-                KeyConditionExpression='orderId = :orderId',
-                ExpressionAttributeValues={':orderId': order_id}
-            )
-            
-            orders = order_response.get('Items', [])
-            if not orders:
+            # Buscar el pedido por clave (GetItem con la fecha derivada del id)
+            order = get_order(orders_table, order_id)
+            if not order:
                 return {
                     'statusCode': 404,
                     'headers': {
@@ -88,8 +86,6 @@ def handler(event, context):
                     })
                 }
             
-            order = orders[0]
-            
             # Formatear información detallada del pedido
             detailed_order = {
                 'orderId': order.get('orderId'),
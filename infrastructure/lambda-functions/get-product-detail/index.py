@@ -3,11 +3,20 @@ import boto3
 import os
 from decimal import Decimal
 
+# Utilidades compartidas (capa common)
+from product_repository import ProductRepository
+from catalog_cache import CatalogCache
+from http_responses import conditional_response
+
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 table_name = os.environ['PRODUCTS_TABLE']
 table = dynamodb.Table(table_name)
 
+# Cache del catálogo a nivel de módulo (sobrevive entre invocaciones warm)
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+catalog_cache = CatalogCache(meta_table)
+
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
     if isinstance(obj, Decimal):
@@ -32,16 +41,15 @@ def handler(event, context):
                 })
             }
         
-        # Buscar producto por ID (necesitamos category también para composite key)
-        # Por ahora usamos scan con filter, después optimizaremos
-        response = table.scan(
-            FilterExpression='id = :id',
-            ExpressionAttributeValues={':id': product_id}
+        # Buscar producto por ID (GetItem si viene ?category=, si no query por partition key)
+        query_params = event.get('queryStringParameters') or {}
+        category = query_params.get('category')
+        product = catalog_cache.get_or_load(
+            ('product', product_id, category),
+            lambda: ProductRepository(table).get(product_id, category)
         )
         
-        products = response.get('Items', [])
-        
-        if not products:
+        if not product:
             return {
                 'statusCode': 404,
                 'headers': {
@@ -54,16 +62,13 @@ def handler(event, context):
                 })
             }
         
-        # Retornar el primer producto encontrado
-        product = products[0]
-        
-        return {
+        return conditional_response(event, {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type'
+                'Access-Control-Allow-Headers': 'Content-Type, If-None-Match'
             },
             'body': json.dumps({
                 'message': 'Product retrieved successfully',
@@ -73,7 +78,7 @@ def handler(event, context):
                     'required': ['id', 'category', 'name', 'price', 'stock', 'gender']
                 }
             }, default=decimal_default)
-        }
+        })
         
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -0,0 +1,81 @@
+import json
+import boto3
+import os
+
+# Utilidades compartidas (capa common)
+from catalog_cache import CatalogCache
+from http_responses import conditional_response
+from product_facets import load_facet_counts, summarize_facets, price_ranges
+
+# Inicializar cliente DynamoDB
+dynamodb = boto3.resource('dynamodb')
+table_name = os.environ['PRODUCTS_TABLE']
+table = dynamodb.Table(table_name)
+
+# Cache del catálogo a nivel de módulo (sobrevive entre invocaciones warm)
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+catalog_cache = CatalogCache(meta_table)
+
+def handler(event, context):
+    try:
+        # Filtros opcionales: los conteos de cada faceta respetan los filtros de las otras
+        query_params = event.get('queryStringParameters') or {}
+        category = query_params.get('category')
+        gender = query_params.get('gender')
+        price = query_params.get('priceRange')
+        
+        if price and price not in price_ranges():
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid priceRange',
+                    'providedPriceRange': price,
+                    'validOptions': price_ranges()
+                })
+            }
+        
+        # Contadores mantenidos por create/update/delete-product (un GetItem, cacheado)
+        counts = catalog_cache.get_or_load(
+            ('facets',),
+            lambda: load_facet_counts(meta_table, table)
+        )
+        summary = summarize_facets(counts, category, gender, price)
+        
+        return conditional_response(event, {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, If-None-Match'
+            },
+            'body': json.dumps({
+                'message': 'Product facets retrieved successfully',
+                'filters': {
+                    'category': category,
+                    'gender': gender,
+                    'priceRange': price
+                },
+                'total': summary['total'],
+                'facets': summary['facets'],
+                'priceRanges': price_ranges()
+            })
+        })
+    
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'message': 'Internal server error',
+                'error': str(e)
+            })
+        }
@@ -0,0 +1,102 @@
+import json
+import boto3
+import os
+from decimal import Decimal
+
+# Utilidades compartidas (capa common)
+from product_repository import ProductRepository
+from http_responses import parse_json_body
+
+# Inicializar cliente DynamoDB
+dynamodb = boto3.resource('dynamodb')
+table_name = os.environ['PRODUCTS_TABLE']
+table = dynamodb.Table(table_name)
+
+# Cantidad máxima de productos por request
+MAX_BATCH_PRODUCTS = int(os.environ.get('MAX_BATCH_PRODUCTS', '100'))
+
+# Función para convertir Decimal a float/int
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+def parse_references(body):
+    """
+    Valida la lista de productos pedidos
+    Acepta ids sueltos o {"id": ..., "category": ...} (con categoría es más rápido)
+    Raises: ValueError si la lista no es válida
+    """
+    references = body.get('ids')
+    if not isinstance(references, list) or not references:
+        raise ValueError('ids must be a non-empty list')
+    if len(references) > MAX_BATCH_PRODUCTS:
+        raise ValueError(f'At most {MAX_BATCH_PRODUCTS} products per request')
+    
+    for reference in references:
+        if isinstance(reference, dict):
+            valid = isinstance(reference.get('id'), str) and reference.get('id') \
+                and isinstance(reference.get('category', ''), str)
+        else:
+            valid = isinstance(reference, str) and reference
+        if not valid:
+            raise ValueError(f'Invalid product reference: {reference}')
+    return references
+
+def handler(event, context):
+    try:
+        # Parsear y validar body de la request
+        try:
+            references = parse_references(parse_json_body(event))
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid request body',
+                    'error': str(e),
+                    'example': {'ids': ['PROD1234', {'id': 'PROD5678', 'category': 'camisetas'}]}
+                })
+            }
+        
+        # Resolver todos los productos con BatchGetItem (en bloques de 100)
+        products = ProductRepository(table).get_many(references)
+        
+        missing = [
+            reference['id'] if isinstance(reference, dict) else reference
+            for reference, product in zip(references, products)
+            if product is None
+        ]
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type'
+            },
+            'body': json.dumps({
+                'message': 'Products retrieved successfully',
+                'products': products,
+                'count': len(products) - len(missing),
+                'missing': missing
+            }, default=decimal_default)
+        }
+        
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'message': 'Internal server error',
+                'error': str(e)
+            })
+        }
@@ -1,29 +1,333 @@
 import json
 import boto3
 import os
+import heapq
 from boto3.dynamodb.conditions import Key, Attr
-from decimal import Decimal
+from botocore.exceptions import ClientError
+from decimal import Decimal, InvalidOperation
+
+# Utilidades compartidas (capa common)
+from pagination import iter_items, fetch_page, parse_limit, encode_cursor, decode_cursor
+from catalog_cache import CatalogCache
+from http_responses import conditional_response
+from catalog_snapshot import current_manifest, manifest_shard_key, snapshot_url
+from projection import PRODUCT_FIELDS, PRODUCT_KEY_FIELDS, parse_fields, projection_params
 
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 table_name = os.environ['PRODUCTS_TABLE']
 table = dynamodb.Table(table_name)
 
+# Cache del catálogo a nivel de módulo (sobrevive entre invocaciones warm)
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+catalog_cache = CatalogCache(meta_table)
+
+# Snapshot precalculado del catálogo (bucket de imágenes)
+s3_client = boto3.client('s3')
+bucket_name = os.environ['IMAGES_BUCKET']
+
+# Índices secundarios (definidos en data-stack.ts)
+CATEGORY_INDEX = os.environ.get('CATEGORY_INDEX', 'category-index')
+GENDER_INDEX = os.environ.get('GENDER_INDEX', 'gender-index')
+
+# Errores de DynamoDB que indican que el índice no existe o todavía se está llenando
+# (backfill); cualquier otra ValidationException es un error real y no cae al scan
+INDEX_ERROR_CODES = ('ValidationException', 'ResourceNotFoundException')
+INDEX_UNAVAILABLE_MESSAGES = ('specified index', 'invalid index', 'backfilling global secondary index')
+START_KEY_MESSAGES = ('starting key', 'exclusive start key')
+
+# El orden top-k relee todos los productos del filtro en cada página: la
+# paginación ordenada llega hasta este número de resultados
+MAX_SORTED_RESULTS = int(os.environ.get('MAX_SORTED_RESULTS', '1000'))
+
+# Campos del payload firmado que atan el cursor a su forma de paginar
+# ('index' / 'scan' = LastEvaluatedKey, 'offset' = top-k) y al orden pedido
+CURSOR_KIND = '_kind'
+CURSOR_SORT = '_sort'
+
+# Orden: price/-price usan el orden del índice (sort key price); el resto, top-k con heap
+SORT_OPTIONS = ('price', '-price', 'newest', 'name')
+INDEX_SORTS = (None, 'price', '-price')
+SORT_FIELDS = {'price': 'price', '-price': 'price', 'newest': 'createdAt', 'name': 'name'}
+HEAP_SORT_KEYS = {
+    'price': (lambda product: product.get('price', 0), False),
+    '-price': (lambda product: product.get('price', 0), True),
+    'newest': (lambda product: product.get('createdAt', ''), True),
+    'name': (lambda product: str(product.get('name', '')).lower(), False)
+}
+
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
     if isinstance(obj, Decimal):
         return float(obj)
     raise TypeError
 
+def parse_filter_options(query_params):
+    """
+    Lee y valida los filtros y el orden del query string
+    Returns: dict con category, gender, min_price, max_price, in_stock y sort
+    Raises: ValueError si algún valor no es válido
+    """
+    options = {
+        'category': query_params.get('category'),
+        'gender': query_params.get('gender'),
+        'min_price': None,
+        'max_price': None,
+        'in_stock': False,
+        'sort': query_params.get('sort')
+    }
+    
+    for param, option in (('minPrice', 'min_price'), ('maxPrice', 'max_price')):
+        raw_value = query_params.get(param)
+        if raw_value in (None, ''):
+            continue
+        try:
+            value = Decimal(raw_value)
+        except InvalidOperation:
+            raise ValueError(f"{param} must be a number, got '{raw_value}'")
+        if not value.is_finite() or value < 0:
+            raise ValueError(f'{param} must be a non-negative number')
+        options[option] = value
+    
+    if options['min_price'] is not None and options['max_price'] is not None \
+            and options['min_price'] > options['max_price']:
+        raise ValueError('minPrice cannot be greater than maxPrice')
+    
+    in_stock = (query_params.get('inStock') or 'false').lower()
+    if in_stock not in ('true', 'false'):
+        raise ValueError(f"inStock must be true or false, got '{query_params.get('inStock')}'")
+    options['in_stock'] = in_stock == 'true'
+    
+    if options['sort'] is not None and options['sort'] not in SORT_OPTIONS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_OPTIONS)}")
+    
+    return options
+
+def index_unavailable(error):
+    """True solo si el query falló porque el índice no existe o se está creando"""
+    details = error.response.get('Error', {})
+    if details.get('Code') not in INDEX_ERROR_CODES:
+        return False
+    message = details.get('Message', '').lower()
+    return any(text in message for text in INDEX_UNAVAILABLE_MESSAGES)
+
+def rejected_start_key(error):
+    """True si DynamoDB rechazó el ExclusiveStartKey que venía en el cursor"""
+    details = error.response.get('Error', {})
+    if details.get('Code') != 'ValidationException':
+        return False
+    message = details.get('Message', '').lower()
+    return any(text in message for text in START_KEY_MESSAGES)
+
+def build_price_condition(options):
+    """Condición sobre price (sort key de los índices), o None si no hay rango"""
+    min_price, max_price = options['min_price'], options['max_price']
+    if min_price is not None and max_price is not None:
+        return Key('price').between(min_price, max_price)
+    if min_price is not None:
+        return Key('price').gte(min_price)
+    if max_price is not None:
+        return Key('price').lte(max_price)
+    return None
+
+def combine_filters(conditions):
+    """Une condiciones con AND (None si no hay ninguna)"""
+    combined = None
+    for condition in conditions:
+        if condition is not None:
+            combined = condition if combined is None else combined & condition
+    return combined
+
+def build_index_query(options):
+    """
+    Arma un query sobre el índice que corresponde a los filtros
+    El rango de precio va en la KeyCondition (price es la sort key de ambos índices)
+    y el resultado sale ordenado por precio.
+    Returns: dict de parámetros para table.query, o None si ningún índice aplica
+    """
+    category, gender = options['category'], options['gender']
+    if category:
+        index_name, key_condition = CATEGORY_INDEX, Key('category').eq(category)
+        # Solo se filtran los items de la categoría, no toda la tabla
+        gender_filter = Attr('gender').eq(gender) if gender else None
+    elif gender:
+        index_name, key_condition = GENDER_INDEX, Key('gender').eq(gender)
+        gender_filter = None
+    else:
+        return None
+    
+    price_condition = build_price_condition(options)
+    if price_condition is not None:
+        key_condition = key_condition & price_condition
+    
+    params = {
+        'IndexName': index_name,
+        'KeyConditionExpression': key_condition,
+        'ScanIndexForward': options['sort'] != '-price'
+    }
+    filter_expression = combine_filters([
+        gender_filter,
+        Attr('stock').gt(0) if options['in_stock'] else None
+    ])
+    if filter_expression is not None:
+        params['FilterExpression'] = filter_expression
+    return params
+
+def build_scan_filter(options):
+    """Filtro equivalente para el scan de respaldo"""
+    min_price, max_price = options['min_price'], options['max_price']
+    return combine_filters([
+        Attr('category').eq(options['category']) if options['category'] else None,
+        Attr('gender').eq(options['gender']) if options['gender'] else None,
+        Attr('price').gte(min_price) if min_price is not None else None,
+        Attr('price').lte(max_price) if max_price is not None else None,
+        Attr('stock').gt(0) if options['in_stock'] else None
+    ])
+
+def take_start_key(cursor_data, kind, sort):
+    """
+    Valida que el cursor sea de esta forma de paginar y de este orden
+    Un cursor de offset (top-k) y un LastEvaluatedKey pueden tener la misma forma,
+    por eso el tipo y el orden van dentro del payload firmado.
+    Returns: posición para continuar (ExclusiveStartKey u offset), o None
+    Raises: ValueError si el cursor se generó para otra lectura u otro orden
+    """
+    if not cursor_data:
+        return None
+    position = dict(cursor_data)
+    if position.pop(CURSOR_KIND, None) != kind or position.pop(CURSOR_SORT, None) != (sort or ''):
+        raise ValueError('Cursor does not match this query')
+    return position
+
+def tag_cursor(position, kind, sort):
+    """Agrega el tipo de cursor y el orden a la posición (None si no hay más páginas)"""
+    if not position:
+        return None
+    return {**position, CURSOR_KIND: kind, CURSOR_SORT: sort or ''}
+
+def read_products(operation, params, limit, start_key):
+    """Lee una página (si hay limit) o todos los productos que cumplen el filtro"""
+    if limit:
+        return fetch_page(operation, limit, start_key, **params)
+    return list(iter_items(operation, **params)), None
+
+def read_top_products(operation, params, sort, limit, start_key):
+    """
+    Selección top-k: recorre los resultados con un heap acotado a offset + limit
+    en lugar de ordenar todo el conjunto. El cursor es un offset firmado.
+    Cada página vuelve a leer todos los productos del filtro, así que la
+    profundidad se corta en MAX_SORTED_RESULTS.
+    Returns: (products, next_cursor_data o None)
+    Raises: ValueError si el offset del cursor supera MAX_SORTED_RESULTS
+    """
+    sort_key, descending = HEAP_SORT_KEYS[sort]
+    offset = int(start_key['offset']) if start_key else 0
+    if offset < 0 or offset >= MAX_SORTED_RESULTS:
+        raise ValueError('Invalid cursor')
+    
+    matched = 0
+    def counted(items):
+        nonlocal matched
+        for item in items:
+            matched += 1
+            yield item
+    
+    items = counted(iter_items(operation, **params))
+    if not limit:
+        return sorted(items, key=sort_key, reverse=descending), None
+    
+    end = min(offset + limit, MAX_SORTED_RESULTS)
+    select = heapq.nlargest if descending else heapq.nsmallest
+    top = select(end, items, key=sort_key)
+    page = top[offset:end]
+    
+    next_cursor = {'offset': end} if matched > end and end < MAX_SORTED_RESULTS else None
+    return page, next_cursor
+
+def load_filtered_products(options, limit, cursor_data, fields=None):
+    """
+    Lee de DynamoDB los productos filtrados y ordenados
+    Args:
+        options - filtros y orden (ver parse_filter_options)
+        cursor_data - cursor decodificado (con tipo y orden), o None
+        fields - atributos a proyectar (None = todos)
+    Returns: (products, cursor_data, query_mode)
+    Raises: ValueError si el cursor no corresponde a esta consulta
+    """
+    sort = options['sort']
+    if fields and sort:
+        # El atributo de orden se necesita aunque no se haya pedido
+        fields = tuple(sorted(set(fields) | {SORT_FIELDS[sort]}))
+    projection = projection_params(fields)
+    
+    # Usar query sobre el índice; scan solo si ningún índice aplica o no está disponible
+    index_params = build_index_query(options)
+    
+    if index_params:
+        index_params.update(projection)
+        try:
+            if sort in INDEX_SORTS:
+                # El índice ya devuelve los items ordenados por precio
+                start_key = take_start_key(cursor_data, 'index', sort)
+                products, last_key = read_products(table.query, index_params, limit, start_key)
+                return products, tag_cursor(last_key, 'index', sort), 'index'
+            start_key = take_start_key(cursor_data, 'offset', sort)
+            products, next_cursor = read_top_products(table.query, index_params, sort, limit, start_key)
+            return products, tag_cursor(next_cursor, 'offset', sort), 'index+top-k'
+        except ClientError as e:
+            if cursor_data and rejected_start_key(e):
+                raise ValueError('Invalid cursor')
+            # Solo si el índice aún no existe (o se está creando) se usa el scan de respaldo
+            if not index_unavailable(e):
+                raise
+            print(f"Index query not available, falling back to scan: {str(e)}")
+    
+    scan_params = {**projection}
+    scan_filter = build_scan_filter(options)
+    if scan_filter is not None:
+        scan_params['FilterExpression'] = scan_filter
+    
+    try:
+        if sort:
+            start_key = take_start_key(cursor_data, 'offset', sort)
+            products, next_cursor = read_top_products(table.scan, scan_params, sort, limit, start_key)
+            return products, tag_cursor(next_cursor, 'offset', sort), 'scan+top-k'
+        start_key = take_start_key(cursor_data, 'scan', sort)
+        products, last_key = read_products(table.scan, scan_params, limit, start_key)
+        return products, tag_cursor(last_key, 'scan', sort), 'scan'
+    except ClientError as e:
+        if cursor_data and rejected_start_key(e):
+            raise ValueError('Invalid cursor')
+        raise
+
 def handler(event, context):
     try:
         # Obtener parámetros de query string
         query_params = event.get('queryStringParameters') or {}
-        category = query_params.get('category')
-        gender = query_params.get('gender')
+        
+        try:
+            options = parse_filter_options(query_params)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid filter parameters',
+                    'error': str(e),
+                    'sortOptions': list(SORT_OPTIONS)
+                })
+            }
+        category = options['category']
+        gender = options['gender']
+        has_extra_filters = (
+            options['min_price'] is not None or options['max_price'] is not None or options['in_stock']
+        )
         
         # Si no hay filtros, devolver error
-        if not category and not gender:
+        if not category and not gender and not has_extra_filters:
             return {
                 'statusCode': 400,
                 'headers': {
@@ -32,53 +336,135 @@ def handler(event, context):
                 },
                 'body': json.dumps({
                     'message': 'At least one filter is required',
-                    'availableFilters': ['category', 'gender'],
+                    'availableFilters': ['category', 'gender', 'minPrice', 'maxPrice', 'inStock'],
                     'examples': [
                         '?category=camisetas',
                         '?gender=hombre', 
-                        '?category=camisetas&gender=mujer'
+                        '?category=camisetas&gender=mujer',
+                        '?category=zapatillas&sort=price&limit=20',
+                        '?gender=mujer&minPrice=100&maxPrice=300&inStock=true&sort=newest'
                     ]
                 })
             }
         
-        # Construir filtros dinámicamente
-        filter_expression = None
+        # Campos a devolver: ?fields=id,name,price (ProjectionExpression)
+        try:
+            fields = parse_fields(query_params, PRODUCT_FIELDS, PRODUCT_KEY_FIELDS)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid fields parameter',
+                    'error': str(e),
+                    'availableFields': list(PRODUCT_FIELDS)
+                })
+            }
         
-        if category and gender:
-            # Filtro por categoría Y género
-            filter_expression = Attr('category').eq(category) & Attr('gender').eq(gender)
-        elif category:
-            # Solo filtro por categoría
-            filter_expression = Attr('category').eq(category)
-        elif gender:
-            # Solo filtro por género
-            filter_expression = Attr('gender').eq(gender)
+        # Modo snapshot: ?mode=snapshot redirige al shard precalculado en S3
+        # (el snapshot tiene todos los campos sin ordenar: no aplica con ?fields=, sort o
+        # filtros de precio/stock)
+        if query_params.get('mode') == 'snapshot' and not fields and not options['sort'] \
+                and not has_extra_filters:
+            manifest = current_manifest(s3_client, bucket_name, catalog_cache)
+            if manifest:
+                shard = manifest_shard_key(manifest, category, gender)
+                if shard:
+                    return {
+                        'statusCode': 302,
+                        'headers': {
+                            'Location': snapshot_url(bucket_name, shard),
+                            'Access-Control-Allow-Origin': '*',
+                            'Cache-Control': 'public, max-age=30'
+                        },
+                        'body': ''
+                    }
+                
+                # El snapshot vigente no tiene productos para esta combinación
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'message': 'Products filtered successfully',
+                        'filters': {
+                            'category': category,
+                            'gender': gender
+                        },
+                        'products': [],
+                        'count': 0,
+                        'snapshotVersion': manifest.get('version')
+                    })
+                }
+            # Sin snapshot vigente: responder desde DynamoDB
         
-        # Usar scan con filtros
-        response = table.scan(
-            FilterExpression=filter_expression
-        )
+        # Paginación opcional: ?limit=N&cursor=...
+        paginated = 'limit' in query_params or 'cursor' in query_params
+        try:
+            limit = parse_limit(query_params) if paginated else None
+            cursor_data = decode_cursor(query_params.get('cursor'))
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid pagination parameters',
+                    'error': str(e)
+                })
+            }
         
-        products = response.get('Items', [])
+        try:
+            products, last_key, query_mode = catalog_cache.get_or_load(
+                ('filtered', tuple(sorted(options.items())), limit, query_params.get('cursor'), fields),
+                lambda: load_filtered_products(options, limit, cursor_data, fields)
+            )
+        except ValueError as e:
+            # Cursor con firma válida pero que no corresponde a esta consulta
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid pagination parameters',
+                    'error': str(e)
+                })
+            }
         
-        return {
+        return conditional_response(event, {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type'
+                'Access-Control-Allow-Headers': 'Content-Type, If-None-Match'
             },
             'body': json.dumps({
                 'message': 'Products filtered successfully',
                 'filters': {
                     'category': category,
-                    'gender': gender
+                    'gender': gender,
+                    'minPrice': options['min_price'],
+                    'maxPrice': options['max_price'],
+                    'inStock': options['in_stock']
                 },
+                'sort': options['sort'],
                 'products': products,
-                'count': len(products)
+                'count': len(products),
+                'queryMode': query_mode,
+                'limit': limit,
+                'nextCursor': encode_cursor(last_key)
             }, default=decimal_default)
-        }
+        })
         
     except Exception as e:
         print(f"Error: {str(e)}")
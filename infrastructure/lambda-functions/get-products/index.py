@@ -4,11 +4,26 @@ import os
 from boto3.dynamodb.conditions import Key
 from decimal import Decimal
 
+# Utilidades compartidas (capa common)
+from pagination import iter_items, fetch_page, parse_limit, encode_cursor, decode_cursor
+from catalog_cache import CatalogCache
+from http_responses import conditional_response, compress_response
+from catalog_snapshot import current_manifest, manifest_shard_key, snapshot_url
+from projection import PRODUCT_FIELDS, PRODUCT_KEY_FIELDS, parse_fields, projection_params
+
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 table_name = os.environ['PRODUCTS_TABLE']
 table = dynamodb.Table(table_name)
 
+# Cache del catálogo a nivel de módulo (sobrevive entre invocaciones warm)
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+catalog_cache = CatalogCache(meta_table)
+
+# Snapshot precalculado del catálogo (bucket de imágenes)
+s3_client = boto3.client('s3')
+bucket_name = os.environ['IMAGES_BUCKET']
+
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
     if isinstance(obj, Decimal):
@@ -17,17 +32,96 @@ def decimal_default(obj):
 
 def handler(event, context):
     try:
-        # Obtener todos los productos
-        response = table.scan()
-        products = response.get('Items', [])
+        query_params = event.get('queryStringParameters') or {}
         
-        return {
+        # Campos a devolver: ?fields=id,name,price (ProjectionExpression)
+        try:
+            fields = parse_fields(query_params, PRODUCT_FIELDS, PRODUCT_KEY_FIELDS)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid fields parameter',
+                    'error': str(e),
+                    'availableFields': list(PRODUCT_FIELDS)
+                })
+            }
+        projection = projection_params(fields)
+        
+        # Modo snapshot: ?mode=snapshot redirige al JSON comprimido precalculado en S3
+        # (el snapshot tiene todos los campos públicos menos stock, así que no aplica si
+        # se pidió ?fields=; el stock se consulta en vivo)
+        if query_params.get('mode') == 'snapshot' and not fields:
+            manifest = current_manifest(s3_client, bucket_name, catalog_cache)
+            if manifest:
+                return {
+                    'statusCode': 302,
+                    'headers': {
+                        'Location': snapshot_url(bucket_name, manifest_shard_key(manifest)),
+                        'Access-Control-Allow-Origin': '*',
+                        'Cache-Control': 'public, max-age=30'
+                    },
+                    'body': ''
+                }
+            # Sin snapshot vigente: responder desde DynamoDB
+        
+        # Modo paginado: ?limit=N&cursor=... (cursor opaco devuelto como nextCursor)
+        if 'limit' in query_params or 'cursor' in query_params:
+            try:
+                limit = parse_limit(query_params)
+                start_key = decode_cursor(query_params.get('cursor'))
+            except ValueError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'message': 'Invalid pagination parameters',
+                        'error': str(e)
+                    })
+                }
+            
+            products, last_key = catalog_cache.get_or_load(
+                ('page', limit, query_params.get('cursor'), fields),
+                lambda: fetch_page(table.scan, limit, start_key, **projection)
+            )
+            
+            return compress_response(event, conditional_response(event, {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                    'Access-Control-Allow-Headers': 'Content-Type, If-None-Match'
+                },
+                'body': json.dumps({
+                    'message': 'Products retrieved successfully',
+                    'products': products,
+                    'count': len(products),
+                    'limit': limit,
+                    'nextCursor': encode_cursor(last_key)
+                }, default=decimal_default)
+            }))
+        
+        # Obtener todos los productos (recorriendo todas las páginas de DynamoDB)
+        products = catalog_cache.get_or_load(
+            ('all', fields),
+            lambda: list(iter_items(table.scan, **projection))
+        )
+        
+        return compress_response(event, conditional_response(event, {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type'
+                'Access-Control-Allow-Headers': 'Content-Type, If-None-Match'
             },
             'body': json.dumps({
                 'message': 'Products retrieved successfully',
@@ -38,7 +132,7 @@ def handler(event, context):
                     'required': ['id', 'category', 'name', 'price', 'stock', 'gender']
                 }
             }, default=decimal_default)
-        }
+        }))
         
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -4,6 +4,9 @@ import os
 from decimal import Decimal
 from botocore.exceptions import ClientError
 
+# Utilidades compartidas (capa common)
+from ids import get_sale
+
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 sales_table_name = os.environ['SALES_TABLE']
@@ -68,14 +71,9 @@ def handler(event, context):
             }
         
         try:
-            # Buscar la venta específica
-            sale_response = sales_table.scan(
-                FilterExpression='saleId = :saleId',
-                ExpressionAttributeValues={':saleId': sale_id}
-            )
-            
-            sales = sale_response.get('Items', [])
-            if not sales:
+            # Buscar la venta por clave (GetItem con la fecha derivada del id)
+            sale = get_sale(sales_table, sale_id)
+            if not sale:
                 return {
                     'statusCode': 404,
                     'headers': {
@@ -88,8 +86,6 @@ def handler(event, context):
                     })
                 }
             
-            sale = sales[0]
-            
             # Formatear información detallada de la venta
             detailed_sale = {
                 'saleId': sale.get('saleId'),
@@ -6,6 +6,9 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 from botocore.exceptions import ClientError
 
+# Utilidades compartidas (capa common)
+from http_responses import compress_response
+
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 sales_table_name = os.environ['SALES_TABLE']
@@ -230,7 +233,7 @@ def handler(event, context):
                 'dailySales': dict(daily_sales)
             }
             
-            return {
+            return compress_response(event, {
                 'statusCode': 200,
                 'headers': {
                     'Content-Type': 'application/json',
@@ -241,7 +244,7 @@ def handler(event, context):
                 'body': json.dumps({
                     'statistics': statistics
                 }, default=decimal_default)
-            }
+            })
             
         except Exception as e:
             print(f"Error generating sales statistics: {str(e)}")
@@ -0,0 +1,370 @@
+"""
+Lectura y resumen del carrito compartidos entre Lambdas (capa common)
+
+Las filas del carrito llevan expiresAt (epoch en segundos, atributo TTL de DynamoDB):
+add-to-cart, update-cart-quantity, sync-cart y get-cart lo renuevan, así un carrito
+sin actividad durante CART_TTL_DAYS se elimina solo. DynamoDB borra con retraso
+(hasta ~48 h), por eso las lecturas ignoran filas ya vencidas y compact-carts limpia
+las que quedan pendientes.
+
+Cada carrito tiene además una cabecera con los totales (líneas, unidades, precio) en
+su propia tabla (CART_HEADERS_TABLE, clave userId), fuera del índice productId-index
+de la tabla Cart. Los handlers que modifican el carrito la actualizan con ADD; el
+badge del carrito lee solo esa fila. get-cart la corrige si se desvió.
+
+Los borrados por TTL de DynamoDB no descuentan de la cabecera. Por eso guarda
+linesExpireAt: una cota inferior del vencimiento de las líneas que cuenta (se fija al
+recalcular desde las líneas; las líneas agregadas después vencen más tarde). Pasada
+esa fecha alguna línea pudo borrarse sola y la cabecera se recalcula al leerla.
+"""
+import os
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from pagination import iter_items
+from inventory import available_stock
+
+CART_TTL_ATTRIBUTE = 'expiresAt'
+CART_TTL_DAYS = int(os.environ.get('CART_TTL_DAYS', '30'))
+
+# Cabecera antigua guardada como fila de la tabla Cart: se ignora y vence por TTL
+LEGACY_HEADER_ID = '#HEADER'
+
+# get-cart reescribe el TTL como mucho una vez por día y fila (no una escritura por lectura)
+CART_TTL_REFRESH_SECONDS = 24 * 3600
+
+
+def cart_expiry(now=None):
+    """Epoch (segundos) en que vence una fila tocada ahora"""
+    return int((now if now is not None else time.time()) + CART_TTL_DAYS * 24 * 3600)
+
+
+def is_expired(item, now=None):
+    """True si la fila ya venció aunque DynamoDB todavía no la haya borrado"""
+    expires_at = item.get(CART_TTL_ATTRIBUTE)
+    if expires_at is None:
+        return False
+    return int(expires_at) <= (now if now is not None else time.time())
+
+
+def is_header(item):
+    """True si la fila de la tabla Cart es una cabecera antigua y no una línea del carrito"""
+    return item.get('productId') == LEGACY_HEADER_ID
+
+
+def load_cart(cart_table, user_id):
+    """
+    Obtiene las líneas del carrito de un usuario (todas las páginas)
+    Returns: lista de items sin las vencidas pendientes de borrar por TTL
+    """
+    now = time.time()
+    return [
+        item for item in iter_items(cart_table.query, KeyConditionExpression=Key('userId').eq(user_id))
+        if not is_header(item) and not is_expired(item, now)
+    ]
+
+
+def read_header(header_table, user_id, consistent=False):
+    """Cabecera de totales del carrito (None si no existe)"""
+    return header_table.get_item(Key={'userId': user_id}, ConsistentRead=consistent).get('Item')
+
+
+def load_cart_with_header(cart_table, header_table, user_id):
+    """
+    Obtiene las líneas del carrito y su cabecera de totales
+    Returns: (líneas sin las vencidas, cabecera o None)
+    """
+    return load_cart(cart_table, user_id), read_header(header_table, user_id)
+
+
+def lines_expire_at(cart_items):
+    """Vencimiento más próximo de las líneas (None si ninguna tiene TTL)"""
+    expiries = [int(item[CART_TTL_ATTRIBUTE]) for item in cart_items if item.get(CART_TTL_ATTRIBUTE) is not None]
+    return min(expiries) if expiries else None
+
+
+def header_may_be_stale(header, now=None):
+    """True si alguna línea contada en la cabecera pudo vencer (y borrarse por TTL) desde que se calculó"""
+    expires_at = (header or {}).get('linesExpireAt')
+    return expires_at is not None and int(expires_at) <= (now if now is not None else time.time())
+
+
+def line_value(item, quantity=None):
+    """Precio de una línea como Decimal (precio guardado × cantidad)"""
+    quantity = int(item.get('quantity', 0)) if quantity is None else quantity
+    return Decimal(str(item.get('productPrice') or 0)) * quantity
+
+
+def apply_header_delta(header_table, user_id, lines=0, quantity=0, price=0):
+    """
+    Suma (o resta) a los totales de la cabecera con un único UpdateItem atómico
+    Solo se aplica si la cabecera existe: si no, se reconstruye desde las líneas en
+    la próxima lectura (get-cart o GET /cart/summary). Los errores se registran pero
+    no hacen fallar la mutación: get-cart la recalcula si quedó desviada.
+    """
+    if not (lines or quantity or price):
+        return
+    try:
+        header_table.update_item(Key={'userId': user_id}, **header_delta_update(lines, quantity, price))
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            return
+        print(f"Error updating cart header: {str(e)}")
+
+
+def header_delta_update(lines, quantity, price):
+    """
+    Parámetros del UpdateItem que suma un delta a la cabecera existente
+    (apply_header_delta y la transacción de sync-cart). Las líneas que se agregan
+    vencen después que cualquier cota ya guardada: linesExpireAt solo se fija si falta.
+    """
+    expires_at = cart_expiry()
+    return {
+        'UpdateExpression': (
+            'ADD totalItems :lines, totalQuantity :quantity, totalPrice :price '
+            'SET updatedAt = :now, #ttl = :expires_at, '
+            'linesExpireAt = if_not_exists(linesExpireAt, :expires_at)'
+        ),
+        'ConditionExpression': 'attribute_exists(userId)',
+        'ExpressionAttributeNames': {'#ttl': CART_TTL_ATTRIBUTE},
+        'ExpressionAttributeValues': {
+            ':lines': lines,
+            ':quantity': quantity,
+            ':price': Decimal(str(price)),
+            ':now': datetime.utcnow().isoformat(),
+            ':expires_at': expires_at
+        }
+    }
+
+
+def header_item(user_id, cart_items):
+    """Item cabecera con los totales recalculados desde las líneas"""
+    summary, _ = summarize_cart(cart_items)
+    header = {
+        'userId': user_id,
+        'totalItems': summary['totalItems'],
+        'totalQuantity': summary['totalQuantity'],
+        'totalPrice': Decimal(str(summary['totalPrice'])),
+        'updatedAt': datetime.utcnow().isoformat(),
+        CART_TTL_ATTRIBUTE: cart_expiry()
+    }
+    expires_at = lines_expire_at(cart_items)
+    if expires_at is not None:
+        header['linesExpireAt'] = expires_at
+    return header
+
+
+def write_header(header_table, user_id, cart_items, read_header=None):
+    """
+    Reemplaza la cabecera con totales recalculados (reparación en get-cart y get-cart-summary)
+    Condicionada a la cabecera leída (o a que no exista): un delta concurrente no se pisa.
+    Returns: item guardado
+    Raises: ClientError ConditionalCheckFailedException si la cabecera cambió
+    """
+    header = header_item(user_id, cart_items)
+    if read_header is None:
+        header_table.put_item(Item=header, ConditionExpression='attribute_not_exists(userId)')
+    else:
+        header_table.put_item(
+            Item=header,
+            ConditionExpression='updatedAt = :read_updated_at',
+            ExpressionAttributeValues={':read_updated_at': read_header.get('updatedAt')}
+        )
+    return header
+
+
+def header_matches(header, summary):
+    """True si la cabecera guardada coincide con los totales calculados de las líneas"""
+    if not header:
+        return summary['isEmpty']
+    return (
+        int(header.get('totalItems', 0)) == summary['totalItems']
+        and int(header.get('totalQuantity', 0)) == summary['totalQuantity']
+        and round(float(header.get('totalPrice', 0)), 2) == summary['totalPrice']
+    )
+
+
+def header_summary(header):
+    """Resumen del carrito (mismo formato que summarize_cart) a partir de la cabecera"""
+    header = header or {}
+    total_items = max(int(header.get('totalItems', 0)), 0)
+    return {
+        'totalItems': total_items,
+        'totalQuantity': max(int(header.get('totalQuantity', 0)), 0),
+        'totalPrice': round(max(float(header.get('totalPrice', 0)), 0.0), 2),
+        'isEmpty': total_items == 0
+    }
+
+
+def touch_cart(cart_table, cart_items, now=None):
+    """
+    Renueva expiresAt de las filas leídas (carrito activo)
+    Solo escribe las filas cuyo vencimiento quedó más de CART_TTL_REFRESH_SECONDS atrás.
+    Los errores se registran pero no hacen fallar la lectura.
+    Returns: cantidad de filas renovadas
+    """
+    expires_at = cart_expiry(now)
+    refreshed = 0
+
+    for item in cart_items:
+        current = item.get(CART_TTL_ATTRIBUTE)
+        if current is not None and expires_at - int(current) < CART_TTL_REFRESH_SECONDS:
+            continue
+        # Líneas (userId, productId) o cabecera (userId)
+        key = {'userId': item['userId']}
+        if 'productId' in item:
+            key['productId'] = item['productId']
+        try:
+            cart_table.update_item(
+                Key=key,
+                UpdateExpression='SET #ttl = :expires_at',
+                ConditionExpression='attribute_exists(userId)',
+                ExpressionAttributeNames={'#ttl': CART_TTL_ATTRIBUTE},
+                ExpressionAttributeValues={':expires_at': expires_at}
+            )
+            item[CART_TTL_ATTRIBUTE] = expires_at
+            refreshed += 1
+        except ClientError as e:
+            # La fila se eliminó entre la lectura y la renovación
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                print(f"Error refreshing cart TTL: {str(e)}")
+
+    return refreshed
+
+
+def iter_product_cart_rows(cart_table, product_id, index_name):
+    """
+    Filas de carrito (de todos los usuarios) que contienen un producto
+    Usa el índice inverso productId → userId: el costo depende de cuántos carritos
+    tienen el producto, no del total de filas de la tabla.
+    Returns: generador de items (userId, productId, quantity, productPrice)
+    """
+    return iter_items(
+        cart_table.query,
+        IndexName=index_name,
+        KeyConditionExpression=Key('productId').eq(product_id)
+    )
+
+
+def _new_totals():
+    return {'items': 0, 'quantity': 0, 'price': 0.0, 'categories': {}}
+
+
+def _add_line(totals, category, quantity, unit_price):
+    """Acumula una línea en los totales y en el desglose por categoría"""
+    line_total = float(unit_price or 0) * quantity
+    totals['items'] += 1
+    totals['quantity'] += quantity
+    totals['price'] += line_total
+
+    breakdown = totals['categories'].setdefault(category, {
+        'count': 0,
+        'totalQuantity': 0,
+        'totalPrice': 0
+    })
+    breakdown['count'] += 1
+    breakdown['totalQuantity'] += quantity
+    breakdown['totalPrice'] += line_total
+
+
+def _finish_totals(totals):
+    summary = {
+        'totalItems': totals['items'],
+        'totalQuantity': totals['quantity'],
+        'totalPrice': round(totals['price'], 2),
+        'isEmpty': totals['items'] == 0
+    }
+    return summary, totals['categories']
+
+
+def summarize_cart(cart_items, price_field='productPrice'):
+    """
+    Totales y desglose por categoría en una sola pasada
+    Args:
+        price_field - atributo con el precio unitario a usar para los totales
+    Returns: (summary, categories_breakdown)
+    """
+    totals = _new_totals()
+    for item in cart_items:
+        _add_line(totals, item.get('productCategory', 'unknown'), int(item.get('quantity', 0)), item.get(price_field))
+    return _finish_totals(totals)
+
+
+def enrich_cart(cart_items, products):
+    """
+    Combina cada línea con el producto actual y calcula totales en la misma pasada
+    Args:
+        cart_items - filas del carrito
+        products - productos actuales en el mismo orden (None si ya no existe)
+    Returns: (items, summary, categories_breakdown)
+        Cada item agrega currentPrice, currentStock, available, priceChanged,
+        priceDifference y stockShortfall. Los totales usan el precio actual.
+    """
+    totals = _new_totals()
+    price_at_add = 0.0
+    price_changes = 0
+    unavailable = 0
+    enriched = []
+
+    for item, product in zip(cart_items, products):
+        quantity = int(item.get('quantity', 0))
+        stored_price = item.get('productPrice') or 0
+        price_at_add += float(stored_price) * quantity
+
+        if product is None:
+            line = dict(item, currentPrice=None, currentStock=0, available=False,
+                        productRemoved=True, priceChanged=False, priceDifference=0,
+                        stockShortfall=quantity)
+        else:
+            current_price = product.get('price') or 0
+            current_stock = available_stock(product)
+            active = product.get('isActive', True) is not False
+            line = dict(
+                item,
+                productName=product.get('name', item.get('productName')),
+                productImageUrl=product.get('imageUrl', item.get('productImageUrl', '')),
+                currentPrice=current_price,
+                currentStock=current_stock,
+                available=active and current_stock >= quantity,
+                productRemoved=False,
+                priceChanged=current_price != stored_price,
+                priceDifference=float(current_price) - float(stored_price),
+                stockShortfall=max(0, quantity - current_stock)
+            )
+            _add_line(totals, item.get('productCategory', 'unknown'), quantity, current_price)
+
+        price_changes += 1 if line['priceChanged'] else 0
+        unavailable += 0 if line['available'] else 1
+        enriched.append(line)
+
+    summary, categories = _finish_totals(totals)
+    summary.update({
+        'totalItems': len(cart_items),
+        'isEmpty': len(cart_items) == 0,
+        'totalPriceAtAdd': round(price_at_add, 2),
+        'priceDifference': round(summary['totalPrice'] - price_at_add, 2),
+        'linesWithPriceChange': price_changes,
+        'unavailableLines': unavailable,
+        'readyForCheckout': bool(cart_items) and unavailable == 0
+    })
+    return enriched, summary, categories
+
+
+def new_cart_item(user_id, product, quantity, now):
+    """Fila del carrito con los datos del producto copiados (igual que add-to-cart)"""
+    return {
+        'userId': user_id,
+        'productId': product['id'],
+        'quantity': quantity,
+        'productName': product.get('name'),
+        'productPrice': product.get('price'),
+        'productCategory': product.get('category'),
+        'productImageUrl': product.get('imageUrl', ''),
+        'addedAt': now,
+        'updatedAt': now,
+        CART_TTL_ATTRIBUTE: cart_expiry()
+    }
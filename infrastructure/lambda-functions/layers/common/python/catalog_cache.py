@@ -0,0 +1,175 @@
+"""
+Cache del catálogo en memoria del contenedor Lambda (capa common)
+
+- Read-through con TTL configurable y tamaño máximo (desalojo LRU)
+- Invalidación por versión: create/update/delete-product incrementan un contador
+  atómico en la tabla Meta; cuando la versión cambia se descarta todo el cache
+- Los movimientos de stock (pedidos, ventas, reservas) incrementan stockVersion en
+  el mismo item: vacía los caches que devuelven stock pero no marca el snapshot
+  del catálogo como atrasado (el snapshot no incluye stock)
+"""
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+# Clave del item contador de versión en la tabla Meta
+CATALOG_VERSION_KEY = 'CATALOG_VERSION'
+
+DEFAULT_TTL_SECONDS = int(os.environ.get('CATALOG_CACHE_TTL_SECONDS', '300'))
+DEFAULT_MAX_ENTRIES = int(os.environ.get('CATALOG_CACHE_MAX_ENTRIES', '256'))
+DEFAULT_VERSION_CHECK_SECONDS = float(os.environ.get('CATALOG_VERSION_CHECK_SECONDS', '5'))
+
+
+def read_catalog_versions(meta_table):
+    """
+    Lee la versión del catálogo y la de stock en una sola lectura
+    Returns: (version, stock_version), 0 si nunca cambiaron
+    """
+    response = meta_table.get_item(
+        Key={'pk': CATALOG_VERSION_KEY},
+        ConsistentRead=True
+    )
+    item = response.get('Item', {})
+    return int(item.get('version', 0)), int(item.get('stockVersion', 0))
+
+
+def read_catalog_version(meta_table):
+    """
+    Lee la versión actual del catálogo
+    Returns: int (0 si nunca se modificó el catálogo)
+    """
+    return read_catalog_versions(meta_table)[0]
+
+
+def bump_catalog_version(meta_table):
+    """
+    Incrementa atómicamente la versión del catálogo (llamar después de cada mutación)
+    Returns: int con la nueva versión
+    """
+    response = meta_table.update_item(
+        Key={'pk': CATALOG_VERSION_KEY},
+        UpdateExpression='ADD #version :one SET updatedAt = :updated_at',
+        ExpressionAttributeNames={'#version': 'version'},
+        ExpressionAttributeValues={
+            ':one': 1,
+            ':updated_at': datetime.utcnow().isoformat()
+        },
+        ReturnValues='UPDATED_NEW'
+    )
+    return int(response['Attributes']['version'])
+
+
+def bump_stock_version(meta_table):
+    """
+    Incrementa la versión de stock (llamar después de cada transacción que mueve stock)
+    Los errores se registran: el movimiento ya se guardó y el cache vence por TTL
+    Returns: int con la nueva versión de stock, o None si falló
+    """
+    try:
+        response = meta_table.update_item(
+            Key={'pk': CATALOG_VERSION_KEY},
+            UpdateExpression='ADD stockVersion :one SET stockUpdatedAt = :updated_at',
+            ExpressionAttributeValues={
+                ':one': 1,
+                ':updated_at': datetime.utcnow().isoformat()
+            },
+            ReturnValues='UPDATED_NEW'
+        )
+        return int(response['Attributes']['stockVersion'])
+    except Exception as e:
+        print(f"Error bumping stock version: {str(e)}")
+        return None
+
+
+class CatalogCache:
+    """
+    Cache LRU con TTL que se vacía cuando cambia la versión del catálogo
+    Se crea a nivel de módulo para sobrevivir entre invocaciones "warm".
+    Los valores cacheados se comparten: los handlers no deben modificarlos.
+    track_stock=False para caches sin stock (p. ej. el índice de búsqueda), que
+    así no se vacían con cada pedido.
+    """
+
+    def __init__(self, meta_table, ttl_seconds=None, max_entries=None, version_check_seconds=None,
+                 track_stock=True):
+        self.meta_table = meta_table
+        self.track_stock = track_stock
+        self.ttl_seconds = DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = DEFAULT_MAX_ENTRIES if max_entries is None else max_entries
+        self.version_check_seconds = (
+            DEFAULT_VERSION_CHECK_SECONDS if version_check_seconds is None else version_check_seconds
+        )
+        self._entries = OrderedDict()
+        self._version = None
+        self._stock_version = None
+        self._version_checked_at = 0.0
+        self._version_read_ok = False
+
+    def current_version(self, force=False):
+        """
+        Versión del catálogo, consultada a DynamoDB como máximo una vez por intervalo
+        (force=True la consulta siempre)
+        Si la versión (o la de stock, con track_stock) cambió se vacía el cache antes de responder
+        """
+        now = time.monotonic()
+        if force or self._version is None or now - self._version_checked_at >= self.version_check_seconds:
+            try:
+                version, stock_version = read_catalog_versions(self.meta_table)
+                self._version_read_ok = True
+            except Exception as e:
+                # Sin versión disponible se sigue sirviendo hasta que venza el TTL
+                print(f"Error reading catalog version: {str(e)}")
+                version, stock_version = self._version, self._stock_version
+                self._version_read_ok = False
+            if version != self._version or (self.track_stock and stock_version != self._stock_version):
+                self._entries.clear()
+            self._version = version
+            self._stock_version = stock_version
+            self._version_checked_at = now
+        return self._version
+
+    def get_or_load(self, key, loader, revalidate=False):
+        """
+        Devuelve el valor cacheado para key o lo carga con loader()
+        Args:
+            key - clave hashable (p. ej. tupla con los parámetros de la consulta)
+            loader - función sin argumentos que lee de DynamoDB
+            revalidate - al vencer el TTL, consultar la versión y conservar el valor
+                         si no cambió desde que se cargó (para valores caros de reconstruir)
+        """
+        version = self.current_version()
+        now = time.monotonic()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        if entry is not None and revalidate:
+            # Un cambio de versión vacía el cache, así que si la entrada sigue aquí la versión es la misma
+            version = self.current_version(force=True)
+            entry = self._entries.get(key)
+            if entry is not None and self._version_read_ok and entry[2] == version:
+                self._entries[key] = (now + self.ttl_seconds, entry[1], version)
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        value = loader()
+        self._entries[key] = (now + self.ttl_seconds, value, version)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return value
+
+    def invalidate(self, key):
+        """Descarta una sola entrada del cache"""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Vacía el cache (la versión se vuelve a consultar en la próxima lectura)"""
+        self._entries.clear()
+        self._version = None
+        self._stock_version = None
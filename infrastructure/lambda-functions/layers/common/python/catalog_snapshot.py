@@ -0,0 +1,250 @@
+"""
+Snapshot precalculado del catálogo público en S3 (capa common)
+
+Cada versión del catálogo se publica como JSON comprimido con gzip en el bucket
+de imágenes:
+    catalog/v{version}/products.json.gz                         catálogo completo
+    catalog/v{version}/category/{category}.json.gz              por categoría
+    catalog/v{version}/gender/{gender}.json.gz                  por género
+    catalog/v{version}/category/{category}/gender/{gender}.json.gz
+    catalog/latest.json                                         manifiesto (versión actual)
+Los objetos versionados son inmutables, así que se pueden cachear en CloudFront.
+
+Al publicar una versión nueva, los objetos de la que reemplaza se etiquetan como
+superseded; la regla de ciclo de vida del bucket solo expira objetos con esa
+etiqueta, nunca los del snapshot vigente aunque el catálogo no cambie en semanas.
+
+El snapshot no incluye stock: pedidos, ventas y reservas lo mueven sin regenerar
+el snapshot, así que se consulta en vivo (get-product-detail, get-products).
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+from decimal import Decimal
+from urllib.parse import quote
+
+from pagination import iter_items
+
+SNAPSHOT_PREFIX = 'catalog'
+MANIFEST_KEY = f'{SNAPSHOT_PREFIX}/latest.json'
+MANIFEST_CACHE_KEY = ('snapshot-manifest',)
+
+# URL pública base (p. ej. dominio de CloudFront); por defecto la URL del bucket
+SNAPSHOT_BASE_URL = os.environ.get('CATALOG_SNAPSHOT_BASE_URL', '')
+
+# Etiqueta que habilita la expiración (regla ExpireOldCatalogSnapshots en storage-stack.ts)
+SUPERSEDED_TAG = {'Key': 'catalog-snapshot', 'Value': 'superseded'}
+
+# Campos internos que no se publican
+PRIVATE_FIELDS = ('createdBy', 'updatedBy')
+
+# Campos que cambian con cada pedido: fuera del snapshot y de los caches sin stock
+LIVE_FIELDS = ('stock', 'reserved')
+
+
+def _decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError
+
+
+def public_product(product):
+    """Copia del producto sin campos privados ni de stock (lo que se publica en el snapshot)"""
+    return {
+        key: value for key, value in product.items()
+        if key not in PRIVATE_FIELDS and key not in LIVE_FIELDS
+    }
+
+
+def shard_key(version, category=None, gender=None):
+    """
+    Ruta S3 del shard para una combinación de filtros
+    Sin filtros devuelve el catálogo completo
+    """
+    base = f'{SNAPSHOT_PREFIX}/v{version}'
+    if category and gender:
+        return f'{base}/category/{quote(category, safe="")}/gender/{quote(gender, safe="")}.json.gz'
+    if category:
+        return f'{base}/category/{quote(category, safe="")}.json.gz'
+    if gender:
+        return f'{base}/gender/{quote(gender, safe="")}.json.gz'
+    return f'{base}/products.json.gz'
+
+
+def snapshot_url(bucket, key):
+    """URL pública de un objeto del snapshot"""
+    base_url = SNAPSHOT_BASE_URL.rstrip('/') or f'https://{bucket}.s3.amazonaws.com'
+    return f'{base_url}/{key}'
+
+
+def _put_gzip_json(s3, bucket, key, payload):
+    body = gzip.compress(
+        json.dumps(payload, default=_decimal_default, separators=(',', ':')).encode('utf-8')
+    )
+    s3.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=body,
+        ContentType='application/json',
+        ContentEncoding='gzip',
+        CacheControl='public, max-age=31536000, immutable'
+    )
+    return len(body)
+
+
+def read_manifest(s3, bucket):
+    """
+    Lee el manifiesto del snapshot vigente
+    Returns: dict o None si todavía no se generó ningún snapshot
+    """
+    try:
+        response = s3.get_object(Bucket=bucket, Key=MANIFEST_KEY)
+    except s3.exceptions.NoSuchKey:
+        return None
+    return json.loads(response['Body'].read())
+
+
+def read_snapshot_products(s3, bucket, manifest):
+    """
+    Descarga y descomprime el catálogo completo del snapshot indicado en el manifiesto
+    Returns: lista de productos (un solo GET a S3 en lugar de un scan)
+    """
+    response = s3.get_object(Bucket=bucket, Key=manifest['keys']['all'])
+    return json.loads(gzip.decompress(response['Body'].read()))['products']
+
+
+def mark_superseded(s3, bucket, version):
+    """
+    Etiqueta todos los objetos de una versión reemplazada para que expiren
+    Los errores se registran: un objeto sin etiquetar solo ocupa espacio, no rompe lecturas
+    Returns: cantidad de objetos etiquetados
+    """
+    tagged = 0
+    try:
+        paginator = s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Prefix=f'{SNAPSHOT_PREFIX}/v{version}/'):
+            for obj in page.get('Contents', []):
+                s3.put_object_tagging(Bucket=bucket, Key=obj['Key'], Tagging={'TagSet': [SUPERSEDED_TAG]})
+                tagged += 1
+    except Exception as e:
+        print(f"Error tagging superseded snapshot v{version}: {str(e)}")
+    return tagged
+
+
+def publish_snapshot(products_table, s3, bucket, version):
+    """
+    Genera y sube el snapshot completo y sus shards para una versión del catálogo
+    El manifiesto solo se actualiza si no existe uno de una versión más nueva
+    Returns: dict del manifiesto publicado (o el vigente si era más nuevo)
+    """
+    products = []
+    shards = {}
+
+    for product in iter_items(products_table.scan):
+        published = public_product(product)
+        products.append(published)
+
+        category = product.get('category')
+        gender = product.get('gender')
+        if category:
+            shards.setdefault((category, None), []).append(published)
+        if gender:
+            shards.setdefault((None, gender), []).append(published)
+        if category and gender:
+            shards.setdefault((category, gender), []).append(published)
+
+    generated_at = datetime.utcnow().isoformat()
+    keys = {'all': shard_key(version)}
+    total_bytes = _put_gzip_json(s3, bucket, keys['all'], {
+        'version': version,
+        'generatedAt': generated_at,
+        'products': products,
+        'count': len(products)
+    })
+
+    shard_keys = {}
+    for (category, gender), shard_products in shards.items():
+        key = shard_key(version, category, gender)
+        total_bytes += _put_gzip_json(s3, bucket, key, {
+            'version': version,
+            'generatedAt': generated_at,
+            'filters': {'category': category, 'gender': gender},
+            'products': shard_products,
+            'count': len(shard_products)
+        })
+        shard_keys[f'{category or ""}|{gender or ""}'] = key
+
+    manifest = {
+        'version': version,
+        'generatedAt': generated_at,
+        'count': len(products),
+        'compressedBytes': total_bytes,
+        'keys': keys,
+        'shards': shard_keys
+    }
+
+    # No pisar un snapshot más nuevo si dos generaciones terminan fuera de orden
+    current = read_manifest(s3, bucket)
+    if current and int(current.get('version', 0)) > version:
+        print(f"Snapshot v{version} superseded by v{current.get('version')}, manifest unchanged")
+        mark_superseded(s3, bucket, version)
+        return current
+
+    s3.put_object(
+        Bucket=bucket,
+        Key=MANIFEST_KEY,
+        Body=json.dumps(manifest).encode('utf-8'),
+        ContentType='application/json',
+        CacheControl='public, max-age=30'
+    )
+
+    # Recién ahora la versión anterior deja de ser la vigente
+    if current and int(current.get('version', 0)) < version:
+        mark_superseded(s3, bucket, int(current['version']))
+    return manifest
+
+
+def current_manifest(s3, bucket, catalog_cache):
+    """
+    Manifiesto vigente para servir lecturas, cacheado en el contenedor
+    Si el snapshot está atrasado respecto a la versión del catálogo devuelve None
+    para que el handler lea de DynamoDB mientras se regenera.
+    """
+    manifest = catalog_cache.get_or_load(MANIFEST_CACHE_KEY, lambda: read_manifest(s3, bucket))
+    if not manifest:
+        catalog_cache.invalidate(MANIFEST_CACHE_KEY)
+        return None
+
+    if int(manifest.get('version', 0)) < (catalog_cache.current_version() or 0):
+        catalog_cache.invalidate(MANIFEST_CACHE_KEY)
+        return None
+
+    return manifest
+
+
+def manifest_shard_key(manifest, category=None, gender=None):
+    """
+    Clave S3 del shard para los filtros pedidos según el manifiesto
+    Returns: string o None si no hay productos para esa combinación
+    """
+    if not category and not gender:
+        return manifest.get('keys', {}).get('all')
+    return manifest.get('shards', {}).get(f'{category or ""}|{gender or ""}')
+
+
+def request_snapshot(lambda_client, function_name, version):
+    """
+    Dispara la generación del snapshot de forma asíncrona (no bloquea al admin)
+    Los errores se registran pero no hacen fallar la mutación que ya se guardó
+    """
+    if not function_name:
+        return
+    try:
+        lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType='Event',
+            Payload=json.dumps({'catalogVersion': version}).encode('utf-8')
+        )
+    except Exception as e:
+        print(f"Error requesting catalog snapshot v{version}: {str(e)}")
@@ -0,0 +1,202 @@
+"""
+Utilidades para respuestas HTTP de API Gateway (capa common)
+
+- Lectura de headers y body sin importar cómo los entregue API Gateway
+- Respuestas condicionales con ETag / If-None-Match (304 Not Modified)
+- Compresión gzip/brotli negociada con Accept-Encoding
+
+La API declara application/json en binaryMediaTypes (api-stack.ts) para poder
+devolver bodies comprimidos en base64 (isBase64Encoded). API Gateway solo los
+convierte a binario si el primer tipo del header Accept es uno de esos tipos, y
+los bodies JSON de los requests también llegan en base64: leerlos con parse_json_body.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin la librería se usa solo gzip
+    brotli = None
+
+# El navegador guarda la respuesta pero la revalida en cada visita con If-None-Match
+CONDITIONAL_CACHE_CONTROL = 'public, no-cache'
+
+# Tipos declarados en binaryMediaTypes de la API (api-stack.ts)
+BINARY_MEDIA_TYPES = ('application/json',)
+
+# Por debajo de este tamaño comprimir no compensa (overhead de headers y CPU)
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '5'))
+
+
+def get_header(event, name, default=None):
+    """
+    Obtiene un header del evento de API Gateway (los nombres no distinguen mayúsculas)
+    Returns: string o default si el header no viene
+    """
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return default
+
+
+def parse_json_body(event):
+    """
+    Decodifica el body JSON del request (en base64 si API Gateway lo marcó así)
+    Returns: dict ({} si no hay body)
+    Raises: ValueError si el body no es JSON válido
+    """
+    body = event.get('body')
+    if not body:
+        return {}
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body).decode('utf-8')
+    return json.loads(body)
+
+
+def compute_etag(body):
+    """
+    ETag débil calculado a partir del contenido de la respuesta
+    Es débil (W/) para seguir siendo válido si la respuesta se entrega comprimida
+    """
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Compara If-None-Match con el ETag actual (comparación débil, RFC 9110)
+    Acepta listas separadas por comas y el comodín *
+    """
+    if not if_none_match:
+        return False
+
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def conditional_response(event, response):
+    """
+    Agrega ETag y Cache-Control a una respuesta 200 y devuelve 304 si el cliente
+    ya tiene esa misma versión (header If-None-Match)
+    Args:
+        event - evento de API Gateway
+        response - dict de respuesta con 'body' ya serializado
+    Returns: la respuesta original con headers de cache, o una 304 sin body
+    """
+    if response.get('statusCode') != 200:
+        return response
+
+    etag = compute_etag(response.get('body') or '')
+    headers = dict(response.get('headers') or {})
+    headers['ETag'] = etag
+    headers['Cache-Control'] = CONDITIONAL_CACHE_CONTROL
+    headers['Access-Control-Expose-Headers'] = 'ETag'
+
+    if etag_matches(get_header(event, 'If-None-Match'), etag):
+        headers.pop('Content-Type', None)
+        return {
+            'statusCode': 304,
+            'headers': headers,
+            'body': ''
+        }
+
+    return dict(response, headers=headers)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Elige la codificación según Accept-Encoding (respeta q=0)
+    Returns: 'br', 'gzip' o None
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+
+    def allowed(encoding):
+        return accepted.get(encoding, accepted.get('*', 0.0)) > 0
+
+    if brotli is not None and allowed('br'):
+        return 'br'
+    if allowed('gzip'):
+        return 'gzip'
+    return None
+
+
+def accepts_binary(event):
+    """
+    Indica si API Gateway va a convertir un body base64 a binario para este request
+    (el primer tipo de Accept debe estar en binaryMediaTypes)
+    """
+    accept = get_header(event, 'Accept') or ''
+    first_type = accept.split(',')[0].split(';')[0].strip().lower()
+    return first_type in BINARY_MEDIA_TYPES
+
+
+def compress_body(data, encoding):
+    """Comprime bytes con la codificación indicada ('br' o 'gzip')"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(event, response, min_bytes=None):
+    """
+    Comprime el body de una respuesta 200 si el cliente lo acepta y supera el umbral
+    El body se devuelve en base64 con isBase64Encoded, como espera la integración
+    proxy de API Gateway, junto con Content-Encoding y Vary: Accept-Encoding.
+    Returns: la respuesta comprimida, o la original si no corresponde comprimir
+    """
+    min_bytes = COMPRESSION_MIN_BYTES if min_bytes is None else min_bytes
+    body = response.get('body')
+    if response.get('statusCode') != 200 or not isinstance(body, str) or response.get('isBase64Encoded'):
+        return response
+
+    data = body.encode('utf-8')
+    if len(data) < min_bytes:
+        return response
+
+    headers = dict(response.get('headers') or {})
+    headers['Vary'] = 'Accept-Encoding'
+
+    encoding = negotiate_encoding(get_header(event, 'Accept-Encoding'))
+    if not encoding or not accepts_binary(event):
+        return dict(response, headers=headers)
+
+    compressed = compress_body(data, encoding)
+    if len(compressed) >= len(data):
+        return dict(response, headers=headers)
+
+    headers['Content-Encoding'] = encoding
+    return dict(
+        response,
+        headers=headers,
+        body=base64.b64encode(compressed).decode('ascii'),
+        isBase64Encoded=True
+    )
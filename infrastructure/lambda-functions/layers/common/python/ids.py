@@ -0,0 +1,137 @@
+"""
+Identificadores de pedidos y ventas ordenables por tiempo (capa common)
+
+Orders tiene clave (orderId, createdAt) y Sales (saleId, completedAt). Los ids
+nuevos son prefijo + ULID (48 bits de milisegundos + 80 bits aleatorios en base32
+Crockford): la fecha de la sort key se deriva del id, así con solo el id se arma
+la clave completa y se usa GetItem/UpdateItem/DeleteItem directamente.
+
+Los ids anteriores (ORD-20240101-ABC123) no llevan la hora exacta: para esos se
+consulta la partición del id (query sobre la partition key, nunca scan).
+"""
+import os
+import time
+from datetime import datetime, timezone, timedelta
+
+from boto3.dynamodb.conditions import Key
+
+ORDER_ID_PREFIX = 'ORD-'
+SALE_ID_PREFIX = 'SALE-'
+
+# Estados con los que un pedido queda en Orders (cancel-order lo elimina):
+# create-order -> pending -> completed (complete-order) o expired (release-reservations)
+# get-all-orders recorre una partición del índice por estado: todo estado nuevo va aquí
+ORDER_STATUS_PENDING = 'pending'
+ORDER_STATUS_COMPLETED = 'completed'
+ORDER_STATUS_EXPIRED = 'expired'
+ORDER_STATUSES = (ORDER_STATUS_PENDING, ORDER_STATUS_COMPLETED, ORDER_STATUS_EXPIRED)
+
+# completedAt de las ventas se guarda en hora de Bolivia (UTC-4), igual que complete-order
+SALE_TIMEZONE = timezone(timedelta(hours=-4))
+
+_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_TIME_CHARS = 10
+_RANDOM_CHARS = 16
+
+
+def _encode(value, length):
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(_ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def new_ulid(now_ms=None):
+    """ULID de 26 caracteres para el milisegundo dado (por defecto, ahora)"""
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    randomness = int.from_bytes(os.urandom(10), 'big')
+    return _encode(now_ms, _TIME_CHARS) + _encode(randomness, _RANDOM_CHARS)
+
+
+def ulid_timestamp_ms(value):
+    """
+    Milisegundos embebidos en un ULID
+    Returns: int, o None si el valor no es un ULID válido
+    """
+    if not value or len(value) != _TIME_CHARS + _RANDOM_CHARS:
+        return None
+    result = 0
+    for char in value.upper():
+        index = _ALPHABET.find(char)
+        if index < 0:
+            return None
+        result = result * 32 + index
+    return result >> (5 * _RANDOM_CHARS)
+
+
+def _id_timestamp_ms(value, prefix):
+    if not value or not value.startswith(prefix):
+        return None
+    return ulid_timestamp_ms(value[len(prefix):])
+
+
+def _created_at(ms):
+    # Formato fijo (siempre con microsegundos) para poder reconstruir el string exacto
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).replace(tzinfo=None).isoformat(timespec='microseconds')
+
+
+def _completed_at(ms):
+    return datetime.fromtimestamp(ms / 1000, SALE_TIMEZONE).isoformat(timespec='microseconds')
+
+
+def new_order_id():
+    """Returns: (orderId, createdAt ISO UTC) con la fecha embebida en el id"""
+    now_ms = int(time.time() * 1000)
+    return ORDER_ID_PREFIX + new_ulid(now_ms), _created_at(now_ms)
+
+
+def new_sale_id():
+    """Returns: (saleId, completedAt ISO en hora de Bolivia) con la fecha embebida en el id"""
+    now_ms = int(time.time() * 1000)
+    return SALE_ID_PREFIX + new_ulid(now_ms), _completed_at(now_ms)
+
+
+def order_created_at(order_id):
+    """createdAt derivado del id, o None si es un id anterior al formato ULID"""
+    ms = _id_timestamp_ms(order_id, ORDER_ID_PREFIX)
+    return _created_at(ms) if ms is not None else None
+
+
+def sale_completed_at(sale_id):
+    """completedAt derivado del id, o None si es un id anterior al formato ULID"""
+    ms = _id_timestamp_ms(sale_id, SALE_ID_PREFIX)
+    return _completed_at(ms) if ms is not None else None
+
+
+def _get_by_id(table, id_attribute, sort_attribute, item_id, sort_value, consistent):
+    if sort_value is not None:
+        response = table.get_item(
+            Key={id_attribute: item_id, sort_attribute: sort_value},
+            ConsistentRead=consistent
+        )
+        return response.get('Item')
+
+    # Id anterior al formato ULID: la partición del id tiene un único item
+    items = table.query(
+        KeyConditionExpression=Key(id_attribute).eq(item_id),
+        ConsistentRead=consistent,
+        Limit=1
+    ).get('Items', [])
+    return items[0] if items else None
+
+
+def get_order(orders_table, order_id, consistent=False):
+    """
+    Pedido por id: GetItem con la clave derivada del id, query a la partición si es legacy
+    Returns: item o None
+    """
+    return _get_by_id(orders_table, 'orderId', 'createdAt', order_id, order_created_at(order_id), consistent)
+
+
+def get_sale(sales_table, sale_id, consistent=False):
+    """
+    Venta por id: GetItem con la clave derivada del id, query a la partición si es legacy
+    Returns: item o None
+    """
+    return _get_by_id(sales_table, 'saleId', 'completedAt', sale_id, sale_completed_at(sale_id), consistent)
@@ -0,0 +1,115 @@
+"""
+Movimientos de stock atómicos (capa common)
+
+Modo reserva (STOCK_RESERVATION=true): al crear el pedido las unidades pasan de
+stock a reserved en la misma transacción que guarda el pedido, con la condición
+stock >= cantidad, así dos pedidos simultáneos no pueden vender la misma unidad.
+- complete-order consume la reserva (reserved -= cantidad)
+Sin reserva, complete-order descuenta stock al entregar (sell_actions), también
+con la condición stock >= cantidad.
+- cancel-order y release-reservations la liberan (stock += cantidad, reserved -= cantidad)
+cancel-sale devuelve a stock las unidades de una venta anulada (restock_actions).
+
+DynamoDB no evalúa "stock - reserved" en una condición, por eso las unidades
+reservadas salen de stock: stock es siempre lo disponible para vender (una sola
+lectura, sin cálculo) y stock + reserved es lo que hay físicamente en la tienda.
+"""
+import os
+import re
+from datetime import datetime, timedelta
+
+from transactions import update
+
+RESERVATION_ENABLED = os.environ.get('STOCK_RESERVATION', 'false').lower() == 'true'
+RESERVATION_TTL_HOURS = int(os.environ.get('RESERVATION_TTL_HOURS', '48'))
+
+
+def available_stock(product):
+    """Unidades que se pueden agregar al carrito o pedir (ya descontadas las reservadas)"""
+    return max(int((product or {}).get('stock', 0)), 0)
+
+
+def reservation_expiry(now=None):
+    """Fecha ISO (UTC) en que una reserva hecha ahora se libera sola"""
+    return ((now or datetime.utcnow()) + timedelta(hours=RESERVATION_TTL_HOURS)).isoformat()
+
+
+def aggregate_quantities(items):
+    """
+    Suma las cantidades por producto (un pedido puede repetir un producto)
+    Una transacción no puede tocar el mismo item dos veces.
+    Returns: dict {(productId, category): cantidad} en orden de aparición
+    """
+    quantities = {}
+    for item in items:
+        quantity = int(item.get('quantity', 0))
+        if item.get('productId') and quantity > 0:
+            key = (item['productId'], item.get('productCategory') or item.get('category'))
+            quantities[key] = quantities.get(key, 0) + quantity
+    return quantities
+
+
+def _stock_actions(products_table, quantities, expression, condition, updated_at):
+    # DynamoDB rechaza valores que no aparecen en las expresiones
+    placeholders = set(re.findall(r':\w+', f'{expression} {condition}'))
+    actions = []
+    for (product_id, category), quantity in quantities.items():
+        values = {':q': quantity, ':negative_q': -quantity, ':updated_at': updated_at}
+        actions.append(update(
+            products_table,
+            {'id': product_id, 'category': category},
+            expression,
+            condition=condition,
+            values={name: value for name, value in values.items() if name in placeholders}
+        ))
+    return actions
+
+
+def reserve_actions(products_table, quantities, updated_at):
+    """Mueve unidades de stock a reserved (falla si no alcanza el stock)"""
+    return _stock_actions(
+        products_table, quantities,
+        'SET stock = stock - :q, updatedAt = :updated_at ADD reserved :q',
+        'attribute_exists(id) AND stock >= :q',
+        updated_at
+    )
+
+
+def release_actions(products_table, quantities, updated_at):
+    """Devuelve unidades reservadas a stock (pedido cancelado o reserva vencida)"""
+    return _stock_actions(
+        products_table, quantities,
+        'SET stock = stock + :q, updatedAt = :updated_at ADD reserved :negative_q',
+        'attribute_exists(id) AND reserved >= :q',
+        updated_at
+    )
+
+
+def consume_actions(products_table, quantities, updated_at):
+    """Descuenta la reserva de un pedido entregado (el stock ya se había descontado)"""
+    return _stock_actions(
+        products_table, quantities,
+        'SET updatedAt = :updated_at ADD reserved :negative_q',
+        'attribute_exists(id) AND reserved >= :q',
+        updated_at
+    )
+
+
+def sell_actions(products_table, quantities, updated_at):
+    """Descuenta unidades vendidas de stock (pedido sin reserva, falla si no alcanza)"""
+    return _stock_actions(
+        products_table, quantities,
+        'SET stock = stock - :q, updatedAt = :updated_at',
+        'attribute_exists(id) AND stock >= :q',
+        updated_at
+    )
+
+
+def restock_actions(products_table, quantities, updated_at):
+    """Devuelve a stock las unidades de una venta cancelada (ADD, sin leer el stock actual)"""
+    return _stock_actions(
+        products_table, quantities,
+        'SET updatedAt = :updated_at ADD stock :q',
+        'attribute_exists(id)',
+        updated_at
+    )
@@ -0,0 +1,175 @@
+"""
+Utilidades de paginación para DynamoDB compartidas entre Lambdas (capa common)
+
+- Lectura página por página con generadores (nunca se pierde nada después de 1 MB)
+- Cursores opacos y firmados (LastEvaluatedKey codificado + HMAC) para exponer al cliente
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+from decimal import Decimal
+
+import boto3
+
+# Clave para firmar cursores: CDK genera un secreto en Secrets Manager y pasa su ARN.
+# CURSOR_SECRET (valor directo) queda para pruebas y ejecución local.
+CURSOR_SECRET_ARN = os.environ.get('CURSOR_SECRET_ARN', '')
+_cursor_secret = os.environ.get('CURSOR_SECRET') or None
+
+# Límites por defecto para respuestas paginadas
+DEFAULT_PAGE_LIMIT = int(os.environ.get('DEFAULT_PAGE_LIMIT', '50'))
+MAX_PAGE_LIMIT = int(os.environ.get('MAX_PAGE_LIMIT', '200'))
+
+
+def iter_pages(operation, **kwargs):
+    """
+    Recorre todas las páginas de un scan/query de DynamoDB
+    Args:
+        operation - table.scan o table.query
+        kwargs - parámetros de la operación (FilterExpression, IndexName, etc.)
+    Returns: generador de respuestas crudas (una por página de DynamoDB)
+    """
+    while True:
+        response = operation(**kwargs)
+        yield response
+
+        last_key = response.get('LastEvaluatedKey')
+        if not last_key:
+            break
+        kwargs['ExclusiveStartKey'] = last_key
+
+
+def iter_items(operation, **kwargs):
+    """
+    Recorre todos los items de un scan/query sin acumularlos en memoria
+    Returns: generador de items
+    """
+    for response in iter_pages(operation, **kwargs):
+        for item in response.get('Items', []):
+            yield item
+
+
+def fetch_page(operation, limit, start_key=None, **kwargs):
+    """
+    Obtiene hasta `limit` items a partir de start_key
+    Como Limit en DynamoDB se aplica antes del FilterExpression, se sigue leyendo
+    hasta completar la página o llegar al final de la tabla/índice.
+    Returns: (items, last_evaluated_key o None)
+    """
+    items = []
+    last_key = start_key
+
+    while len(items) < limit:
+        params = dict(kwargs)
+        params['Limit'] = limit - len(items)
+        if last_key:
+            params['ExclusiveStartKey'] = last_key
+
+        response = operation(**params)
+        items.extend(response.get('Items', []))
+        last_key = response.get('LastEvaluatedKey')
+
+        if not last_key:
+            break
+
+    return items, last_key
+
+
+def parse_limit(query_params, default=None, maximum=None):
+    """
+    Lee y valida el parámetro `limit` del query string
+    Returns: int entre 1 y maximum
+    Raises: ValueError si el valor no es un entero positivo
+    """
+    default = default or DEFAULT_PAGE_LIMIT
+    maximum = maximum or MAX_PAGE_LIMIT
+    raw_limit = query_params.get('limit')
+
+    if raw_limit in (None, ''):
+        return default
+
+    try:
+        limit = int(raw_limit)
+    except (TypeError, ValueError):
+        raise ValueError(f"limit must be an integer, got '{raw_limit}'")
+
+    if limit <= 0:
+        raise ValueError('limit must be greater than 0')
+
+    return min(limit, maximum)
+
+
+def _secret_key():
+    """
+    Clave de firma, leída de Secrets Manager una vez por contenedor
+    Raises: RuntimeError si no hay secreto configurado (nunca se firma con una clave vacía)
+    """
+    global _cursor_secret
+    if _cursor_secret is None:
+        if not CURSOR_SECRET_ARN:
+            raise RuntimeError('Cursor secret is not configured (CURSOR_SECRET_ARN)')
+        response = boto3.client('secretsmanager').get_secret_value(SecretId=CURSOR_SECRET_ARN)
+        _cursor_secret = response['SecretString']
+    return _cursor_secret.encode('utf-8')
+
+
+def _sign(payload):
+    digest = hmac.new(_secret_key(), payload.encode('ascii'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode('ascii').rstrip('=')
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def encode_cursor(data):
+    """
+    Codifica un LastEvaluatedKey (o cualquier dict simple) como cursor opaco firmado
+    Los números se guardan como string para no perder precisión de Decimal
+    Returns: string seguro para URL, o None si no hay más páginas
+    """
+    if not data:
+        return None
+
+    typed = {}
+    for key, value in data.items():
+        if isinstance(value, (Decimal, int, float)) and not isinstance(value, bool):
+            typed[key] = ['N', str(value)]
+        else:
+            typed[key] = ['S', value]
+
+    payload = _b64encode(json.dumps(typed, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+    return f"{payload}.{_sign(payload)}"
+
+
+def decode_cursor(cursor):
+    """
+    Valida la firma y decodifica un cursor generado con encode_cursor
+    Returns: dict listo para usar como ExclusiveStartKey, o None si cursor está vacío
+    Raises: ValueError si el cursor fue alterado o no es válido
+    """
+    if not cursor:
+        return None
+
+    try:
+        payload, signature = cursor.split('.', 1)
+    except ValueError:
+        raise ValueError('Invalid cursor')
+
+    if not hmac.compare_digest(signature, _sign(payload)):
+        raise ValueError('Invalid cursor')
+
+    try:
+        typed = json.loads(_b64decode(payload))
+        return {
+            key: Decimal(value) if value_type == 'N' else value
+            for key, (value_type, value) in typed.items()
+        }
+    except Exception:
+        raise ValueError('Invalid cursor')
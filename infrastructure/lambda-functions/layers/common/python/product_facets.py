@@ -0,0 +1,219 @@
+"""
+Conteos por faceta del catálogo (categoría × género × rango de precio) (capa common)
+
+Los contadores viven en un solo item de la tabla Meta (pk = PRODUCT_FACETS_V2), un
+atributo por combinación: "f|{category}|{gender}|{priceRange}" = cantidad, con cada
+parte codificada (percent-encoding) para que un "|" en los valores no rompa el nombre.
+create/update/delete-product aplican deltas con ADD, así que leer las facetas es
+un GetItem cuyo costo depende de la cantidad de combinaciones, no del catálogo.
+
+Si el item todavía no existe se reconstruye recorriendo el catálogo. Cada delta
+incrementa "seq"; la reconstrucción solo guarda su resultado si "seq" no cambió
+desde antes del scan, y si cambió vuelve a contar. Así un delta concurrente nunca
+se pierde: o el scan ya vio la mutación, o el guardado falla y se reintenta.
+"""
+from datetime import datetime
+from decimal import Decimal
+from urllib.parse import quote, unquote
+
+from botocore.exceptions import ClientError
+
+from pagination import iter_items
+
+# V2: partes codificadas; el item anterior (sin codificar) se ignora y se reconstruye
+FACETS_KEY = 'PRODUCT_FACETS_V2'
+FACET_PREFIX = 'f|'
+
+# Reconstrucciones seguidas que se intentan si llegan deltas durante el scan
+FACET_REBUILD_ATTEMPTS = 3
+
+# Límites de los rangos de precio (Bs.): 0-100, 100-250, 250-500, 500+
+PRICE_BOUNDS = (100, 250, 500)
+
+
+def price_range(price):
+    """Etiqueta del rango de precio de un producto"""
+    price = Decimal(str(price or 0))
+    lower = 0
+    for bound in PRICE_BOUNDS:
+        if price < bound:
+            return f'{lower}-{bound}'
+        lower = bound
+    return f'{lower}+'
+
+
+def price_ranges():
+    """Todas las etiquetas de rango, en orden ascendente"""
+    labels = []
+    lower = 0
+    for bound in PRICE_BOUNDS:
+        labels.append(f'{lower}-{bound}')
+        lower = bound
+    labels.append(f'{lower}+')
+    return labels
+
+
+def facet_attribute(product):
+    """Nombre del contador al que pertenece un producto"""
+    parts = (product.get('category') or '', product.get('gender') or '', price_range(product.get('price')))
+    return FACET_PREFIX + '|'.join(quote(str(part), safe=' ') for part in parts)
+
+
+def parse_facet_attribute(attribute):
+    """(category, gender, priceRange) de un nombre de contador"""
+    return tuple(unquote(part) for part in attribute[len(FACET_PREFIX):].split('|'))
+
+
+def count_facets(products):
+    """Calcula los contadores desde una lista (o generador) de productos"""
+    counts = {}
+    for product in products:
+        attribute = facet_attribute(product)
+        counts[attribute] = counts.get(attribute, 0) + 1
+    return counts
+
+
+def apply_facet_delta(meta_table, old_product=None, new_product=None):
+    """
+    Actualiza los contadores después de crear (old=None), modificar o eliminar (new=None)
+    Solo se aplica si el item ya existe: si no, la mutación ya está guardada y la
+    reconstrucción (que crea el item antes de su scan) la va a contar. Incrementa
+    "seq" para invalidar una reconstrucción en curso. Los errores se registran pero
+    no hacen fallar la mutación.
+    """
+    deltas = {}
+    if old_product:
+        attribute = facet_attribute(old_product)
+        deltas[attribute] = deltas.get(attribute, 0) - 1
+    if new_product:
+        attribute = facet_attribute(new_product)
+        deltas[attribute] = deltas.get(attribute, 0) + 1
+
+    deltas = {attribute: delta for attribute, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    names = {'#pk': 'pk'}
+    values = {':updated_at': datetime.utcnow().isoformat(), ':one': 1}
+    additions = ['seq :one']
+    for i, (attribute, delta) in enumerate(deltas.items()):
+        names[f'#c{i}'] = attribute
+        values[f':d{i}'] = delta
+        additions.append(f'#c{i} :d{i}')
+
+    try:
+        meta_table.update_item(
+            Key={'pk': FACETS_KEY},
+            UpdateExpression=f"ADD {', '.join(additions)} SET updatedAt = :updated_at",
+            ConditionExpression='attribute_exists(#pk)',
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'ConditionalCheckFailedException':
+            print('Facet counters not initialized yet, skipping delta')
+            return
+        print(f"Error updating facet counters: {str(e)}")
+
+
+def _counters(item):
+    return {
+        attribute: int(value)
+        for attribute, value in item.items()
+        if attribute.startswith(FACET_PREFIX)
+    }
+
+
+def load_facet_counts(meta_table, products_table):
+    """
+    Lee los contadores; si no existen (o quedaron a medio reconstruir) los
+    reconstruye recorriendo el catálogo
+    Returns: dict {atributo: cantidad}
+    """
+    item = meta_table.get_item(Key={'pk': FACETS_KEY}).get('Item')
+    if item is not None and not item.get('building'):
+        return _counters(item)
+
+    print('Facet counters missing, rebuilding from catalog')
+    return rebuild_facet_counts(meta_table, products_table)
+
+
+def rebuild_facet_counts(meta_table, products_table):
+    """
+    Recuenta el catálogo y guarda los contadores si ningún delta llegó durante el scan
+    1. Crea el item marcado "building" para que los deltas desde ahora se apliquen (y sumen seq)
+    2. Lee seq con lectura consistente
+    3. Scan consistente del catálogo
+    4. Reemplaza el item condicionado a que seq siga igual; si no, reintenta
+    Si se agotan los intentos devuelve el último conteo sin guardarlo (el item
+    sigue "building" y la próxima lectura vuelve a reconstruir).
+    Returns: dict {atributo: cantidad}
+    """
+    try:
+        meta_table.put_item(
+            Item={'pk': FACETS_KEY, 'building': True, 'seq': 0, 'updatedAt': datetime.utcnow().isoformat()},
+            ConditionExpression='attribute_not_exists(pk)'
+        )
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+            raise
+
+    counts = {}
+    for attempt in range(FACET_REBUILD_ATTEMPTS):
+        item = meta_table.get_item(Key={'pk': FACETS_KEY}, ConsistentRead=True).get('Item') or {}
+        if item and not item.get('building'):
+            # Otra invocación terminó la reconstrucción: usar los guardados
+            return _counters(item)
+        seq = item.get('seq', 0)
+
+        counts = count_facets(iter_items(products_table.scan, ConsistentRead=True))
+        try:
+            meta_table.put_item(
+                Item={'pk': FACETS_KEY, 'seq': seq, 'updatedAt': datetime.utcnow().isoformat(), **counts},
+                ConditionExpression='#seq = :seq',
+                ExpressionAttributeNames={'#seq': 'seq'},
+                ExpressionAttributeValues={':seq': seq}
+            )
+            return counts
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            print(f'Facet delta arrived during rebuild (attempt {attempt + 1}), recounting')
+
+    return counts
+
+
+def summarize_facets(counts, category=None, gender=None, price=None):
+    """
+    Arma los conteos por faceta aplicando los filtros seleccionados
+    Cada faceta se cuenta con los filtros de las otras dimensiones (no con el suyo),
+    así los chips muestran cuántos productos quedarían al elegir cada opción.
+    Returns: dict con total y conteos por categoría, género y rango de precio
+    """
+    facets = {'category': {}, 'gender': {}, 'priceRange': {}}
+    total = 0
+
+    for attribute, count in counts.items():
+        if count <= 0:
+            continue
+        item_category, item_gender, item_price = parse_facet_attribute(attribute)
+        matches = {
+            'category': not category or item_category == category,
+            'gender': not gender or item_gender == gender,
+            'priceRange': not price or item_price == price
+        }
+
+        for dimension, value in (('category', item_category), ('gender', item_gender), ('priceRange', item_price)):
+            if value and all(matched for other, matched in matches.items() if other != dimension):
+                facets[dimension][value] = facets[dimension].get(value, 0) + count
+
+        if all(matches.values()):
+            total += count
+
+    facets['priceRange'] = {
+        label: facets['priceRange'][label] for label in price_ranges() if label in facets['priceRange']
+    }
+    facets['category'] = dict(sorted(facets['category'].items()))
+    facets['gender'] = dict(sorted(facets['gender'].items()))
+
+    return {'total': total, 'facets': facets}
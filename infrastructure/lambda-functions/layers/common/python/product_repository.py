@@ -0,0 +1,176 @@
+"""
+Acceso a productos por clave (capa common)
+
+La tabla Products tiene clave compuesta (id, category). Con la categoría se usa
+GetItem (o BatchGetItem para varios); sin ella, un query sobre la partition key
+`id` (nunca scan). Para varios ids sueltos primero se resuelven las categorías
+(queries keys-only en paralelo) y después se leen todos con un solo BatchGetItem.
+"""
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.conditions import Key
+
+# Marcador para memorizar también los productos que no existen
+_MISSING = object()
+
+# BatchGetItem acepta como máximo 100 claves por llamada
+BATCH_GET_CHUNK_SIZE = 100
+BATCH_GET_MAX_ATTEMPTS = 6
+BATCH_GET_BASE_DELAY_SECONDS = 0.05
+
+# Queries de categoría simultáneas para ids sueltos (los clientes de boto3 son thread-safe)
+CATEGORY_LOOKUP_WORKERS = 8
+
+# Categoría de cada id vista por este contenedor (sobrevive entre invocaciones warm).
+# Solo se usa para armar la clave: si quedó vieja, el producto no vuelve en el batch
+# y get() lo busca por partition key.
+_known_categories = {}
+MAX_KNOWN_CATEGORIES = 10000
+
+
+class ProductRepository:
+    """
+    Repositorio de productos con memoización por invocación
+    Crear una instancia nueva dentro de cada handler para no servir datos viejos
+    entre invocaciones del mismo contenedor.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._products = {}
+
+    def get(self, product_id, category=None):
+        """
+        Obtiene un producto por id
+        Args:
+            product_id - id del producto (partition key)
+            category - categoría (sort key) si se conoce, permite GetItem directo
+        Returns: dict del producto o None si no existe
+        """
+        cached = self._products.get(product_id)
+        if cached is not None:
+            return None if cached is _MISSING else cached
+
+        product = None
+        if category:
+            product = self.table.get_item(
+                Key={'id': product_id, 'category': category}
+            ).get('Item')
+
+        if product is None:
+            # Sin categoría (o categoría desactualizada): query por partition key
+            response = self.table.query(
+                KeyConditionExpression=Key('id').eq(product_id),
+                Limit=1
+            )
+            items = response.get('Items', [])
+            product = items[0] if items else None
+
+        self.remember(product_id, product)
+        return product
+
+    def get_many(self, references):
+        """
+        Obtiene varios productos en el orden pedido
+        Args:
+            references - lista de ids o de dicts {'id', 'category'}; los ids sin
+                         categoría conocida se resuelven juntos antes del BatchGetItem
+        Returns: lista de productos (None para los que no existen), mismo orden
+        """
+        keys = {}
+        unresolved = {}
+        for reference in references:
+            product_id, category = self._split_reference(reference)
+            if product_id in self._products or product_id in keys:
+                continue
+            category = category or _known_categories.get(product_id)
+            if category:
+                keys[product_id] = {'id': product_id, 'category': category}
+                unresolved.pop(product_id, None)
+            else:
+                unresolved[product_id] = True
+
+        categories = self._resolve_categories(list(unresolved))
+        for product_id in unresolved:
+            if product_id in categories:
+                keys[product_id] = {'id': product_id, 'category': categories[product_id]}
+            else:
+                self.remember(product_id, None)
+
+        keys = list(keys.values())
+        for start in range(0, len(keys), BATCH_GET_CHUNK_SIZE):
+            for product in self._batch_get(keys[start:start + BATCH_GET_CHUNK_SIZE]):
+                self.remember(product['id'], product)
+
+        # Lo que no resolvió el batch (ids sin categoría o categoría desactualizada)
+        # se busca con get(), que hace query por partition key
+        return [self.get(self._split_reference(reference)[0]) for reference in references]
+
+    def _resolve_categories(self, product_ids):
+        """
+        Busca la categoría (sort key) de varios ids con queries keys-only en paralelo
+        Returns: dict id -> category (los ids que no existen no aparecen)
+        """
+        if not product_ids:
+            return {}
+
+        client = self.table.meta.client
+
+        def lookup(product_id):
+            response = client.query(
+                TableName=self.table.name,
+                KeyConditionExpression=Key('id').eq(product_id),
+                ProjectionExpression='#id, #category',
+                ExpressionAttributeNames={'#id': 'id', '#category': 'category'},
+                Limit=1
+            )
+            items = response.get('Items', [])
+            return product_id, items[0]['category'] if items else None
+
+        workers = min(CATEGORY_LOOKUP_WORKERS, len(product_ids))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            found = dict(executor.map(lookup, product_ids))
+        return {product_id: category for product_id, category in found.items() if category}
+
+    def _batch_get(self, keys):
+        """
+        BatchGetItem de hasta 100 claves, reintentando UnprocessedKeys con
+        backoff exponencial (con jitter) como recomienda DynamoDB
+        """
+        client = self.table.meta.client
+        request = {self.table.name: {'Keys': keys}}
+        products = []
+
+        for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+            response = client.batch_get_item(RequestItems=request)
+            products.extend(response.get('Responses', {}).get(self.table.name, []))
+
+            request = response.get('UnprocessedKeys') or {}
+            if not request:
+                return products
+
+            delay = BATCH_GET_BASE_DELAY_SECONDS * (2 ** attempt)
+            time.sleep(random.uniform(0, delay))
+
+        pending = len(request.get(self.table.name, {}).get('Keys', []))
+        raise RuntimeError(f'BatchGetItem left {pending} unprocessed keys after {BATCH_GET_MAX_ATTEMPTS} attempts')
+
+    @staticmethod
+    def _split_reference(reference):
+        if isinstance(reference, dict):
+            return reference.get('id'), reference.get('category')
+        return reference, None
+
+    def remember(self, product_id, product):
+        """Guarda (o invalida) un producto en la memoización de esta invocación"""
+        self._products[product_id] = _MISSING if product is None else product
+        if product is not None and product.get('category'):
+            if len(_known_categories) >= MAX_KNOWN_CATEGORIES:
+                _known_categories.clear()
+            _known_categories[product_id] = product['category']
+
+    def forget(self, product_id):
+        """Elimina un producto de la memoización (p. ej. después de actualizarlo)"""
+        self._products.pop(product_id, None)
@@ -0,0 +1,73 @@
+"""
+Sparse fieldsets: ?fields=id,name,price -> ProjectionExpression (capa common)
+
+Solo se aceptan atributos conocidos de cada tabla; los atributos clave se agregan
+siempre para que sigan funcionando el orden, los cursores y las búsquedas por clave.
+"""
+
+# Atributos públicos por tabla (los que escriben create-product, create-order, etc.)
+# createdBy/updatedBy (ids de admin) no se exponen: ver PRIVATE_FIELDS en catalog_snapshot
+PRODUCT_FIELDS = (
+    'id', 'category', 'name', 'price', 'stock', 'gender', 'description',
+    'imageUrl', 'images', 'isActive', 'averageRating', 'reviewCount', 'reviews',
+    'createdAt', 'updatedAt'
+)
+PRODUCT_KEY_FIELDS = ('id', 'category')
+
+ORDER_FIELDS = (
+    'orderId', 'createdAt', 'userId', 'status', 'customerInfo', 'items', 'summary',
+    'paymentMethod', 'deliveryMethod', 'whatsappSent', 'updatedAt',
+    'completedAt', 'saleId'
+)
+ORDER_KEY_FIELDS = ('orderId', 'createdAt')
+
+SALE_FIELDS = (
+    'saleId', 'completedAt', 'originalOrderId', 'userId', 'customerName',
+    'customerEmail', 'totalAmount', 'completedBy', 'status', 'items',
+    'paymentMethod', 'deliveryMethod', 'adminNotes', 'customerInfo',
+    'lastModifiedAt', 'lastModifiedBy'
+)
+SALE_KEY_FIELDS = ('saleId', 'completedAt')
+
+
+def parse_fields(query_params, allowed, key_fields=()):
+    """
+    Lee y valida el parámetro `fields` (lista separada por comas)
+    Args:
+        query_params - queryStringParameters del evento
+        allowed - atributos permitidos para la tabla
+        key_fields - atributos que se incluyen siempre
+    Returns: tupla ordenada de atributos, o None si no se pidió `fields`
+    Raises: ValueError si hay campos desconocidos o la lista está vacía
+    """
+    raw_fields = query_params.get('fields')
+    if raw_fields is None:
+        return None
+
+    requested = [field.strip() for field in raw_fields.split(',') if field.strip()]
+    if not requested:
+        raise ValueError('fields must list at least one attribute')
+
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    # Orden estable para que la misma selección comparta entrada de cache
+    return tuple(sorted(set(requested) | set(key_fields)))
+
+
+def projection_params(fields):
+    """
+    Parámetros de DynamoDB para proyectar solo los atributos pedidos
+    Se usan placeholders (#f0, #f1...) porque name, status, etc. son palabras
+    reservadas; no chocan con los #n0 que genera boto3 para las condiciones.
+    Returns: dict para pasar a scan/query (vacío si fields es None)
+    """
+    if not fields:
+        return {}
+
+    names = {f'#f{i}': field for i, field in enumerate(fields)}
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names
+    }
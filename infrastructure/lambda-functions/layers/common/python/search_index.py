@@ -0,0 +1,153 @@
+"""
+Índice invertido en memoria para buscar productos (capa common)
+
+- Indexa name, category y description (con distinto peso)
+- Normaliza acentos y mayúsculas: "Fútbol" == "futbol", "Niño" == "nino"
+- Prefijos para autocompletar: "cami" encuentra "camiseta"
+- Tolerancia a un error de tipeo (borrado, inserción, sustitución o transposición)
+  con el método de borrados simétricos: no se compara contra todo el vocabulario
+
+El índice se construye una vez por contenedor y se reconstruye cuando cambia la
+versión del catálogo (ver CatalogCache).
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+
+# Peso de cada campo en el puntaje
+FIELD_WEIGHTS = (('name', 3.0), ('category', 2.0), ('description', 1.0))
+
+# Multiplicador según cómo coincidió el término
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.7
+TYPO_MATCH = 0.5
+
+# Límites para que una consulta corta no expanda a medio vocabulario
+MAX_PREFIX_EXPANSIONS = 50
+MIN_TYPO_LENGTH = 4
+
+STOPWORDS = frozenset((
+    'de', 'del', 'la', 'las', 'el', 'los', 'un', 'una', 'unos', 'unas',
+    'y', 'o', 'en', 'con', 'para', 'por', 'al', 'a'
+))
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def fold(text):
+    """Minúsculas sin acentos ni diacríticos"""
+    decomposed = unicodedata.normalize('NFKD', str(text or '').lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """Términos indexables de un texto (sin stopwords)"""
+    return [token for token in _TOKEN_RE.findall(fold(text)) if token not in STOPWORDS]
+
+
+def _deletes(term):
+    """Variantes del término con un carácter borrado"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class SearchIndex:
+    """
+    Índice invertido sobre una lista de productos
+    Los productos se guardan tal cual: los handlers no deben modificarlos.
+    """
+
+    def __init__(self, products):
+        self.products = list(products)
+        self.postings = {}
+        self.deletes = {}
+
+        for position, product in enumerate(self.products):
+            for field, weight in FIELD_WEIGHTS:
+                for token in tokenize(product.get(field)):
+                    postings = self.postings.setdefault(token, {})
+                    postings[position] = postings.get(position, 0.0) + weight
+
+        self.vocabulary = sorted(self.postings)
+        for token in self.vocabulary:
+            if len(token) >= MIN_TYPO_LENGTH:
+                for variant in _deletes(token):
+                    self.deletes.setdefault(variant, set()).add(token)
+
+    def _prefix_terms(self, prefix):
+        start = bisect_left(self.vocabulary, prefix)
+        terms = []
+        for token in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+            if not token.startswith(prefix):
+                break
+            if token != prefix:
+                terms.append(token)
+        return terms[:MAX_PREFIX_EXPANSIONS]
+
+    def _typo_terms(self, term):
+        if len(term) < MIN_TYPO_LENGTH:
+            return set()
+        candidates = set(self.deletes.get(term, ()))       # falta una letra en la consulta
+        for variant in _deletes(term):
+            if variant in self.postings:                    # sobra una letra en la consulta
+                candidates.add(variant)
+            candidates.update(self.deletes.get(variant, ()))  # sustitución / transposición
+        candidates.discard(term)
+        return candidates
+
+    def _match_term(self, term, allow_prefix):
+        """
+        Documentos que coinciden con un término de la consulta
+        Returns: dict {posición: puntaje}
+        """
+        scores = {}
+
+        def add(token, factor):
+            for position, weight in self.postings.get(token, {}).items():
+                score = weight * factor
+                if score > scores.get(position, 0.0):
+                    scores[position] = score
+
+        add(term, EXACT_MATCH)
+        if allow_prefix:
+            for token in self._prefix_terms(term):
+                add(token, PREFIX_MATCH)
+        if not scores:
+            for token in self._typo_terms(term):
+                add(token, TYPO_MATCH)
+        return scores
+
+    def search(self, query, limit=20, predicate=None):
+        """
+        Busca productos que contengan todos los términos de la consulta
+        El último término también se busca como prefijo (autocompletar)
+        Args:
+            predicate - filtro opcional sobre el producto (p. ej. categoría)
+        Returns: lista de (puntaje, producto) ordenada de mayor a menor puntaje
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        combined = None
+        for i, term in enumerate(terms):
+            matches = self._match_term(term, allow_prefix=(i == len(terms) - 1))
+            if combined is None:
+                combined = matches
+            else:
+                combined = {
+                    position: score + matches[position]
+                    for position, score in combined.items()
+                    if position in matches
+                }
+            if not combined:
+                return []
+
+        if predicate:
+            combined = {
+                position: score for position, score in combined.items()
+                if predicate(self.products[position])
+            }
+
+        best = heapq.nlargest(limit, combined.items(), key=lambda entry: (entry[1], -entry[0]))
+        return [(round(score, 3), self.products[position]) for position, score in best]
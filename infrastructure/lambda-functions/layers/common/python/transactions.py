@@ -0,0 +1,133 @@
+"""
+Escrituras transaccionales de DynamoDB (TransactWriteItems) (capa common)
+
+Las acciones se arman con put/update/delete/condition_check y se envían con
+transact_write: todas se aplican o ninguna. Se usa el cliente de la tabla
+(table.meta.client), que acepta los mismos tipos Python que el resource.
+
+Límite de DynamoDB: 100 acciones por transacción y un solo cambio por item.
+"""
+import hashlib
+import random
+import time
+
+from botocore.exceptions import ClientError
+
+TRANSACTION_MAX_ACTIONS = 100
+
+# ClientRequestToken admite hasta 36 caracteres
+REQUEST_TOKEN_LENGTH = 36
+
+# Reintentos ante conflictos con otra transacción sobre los mismos items
+MAX_ATTEMPTS = 4
+BACKOFF_BASE_SECONDS = 0.05
+RETRYABLE_REASONS = ('TransactionConflict', 'ThrottlingError', 'ProvisionedThroughputExceeded')
+
+
+class TransactionCancelled(Exception):
+    """
+    La transacción se canceló porque falló alguna condición
+    reasons tiene un código por acción, en el mismo orden ('None' si esa acción no falló)
+    """
+
+    def __init__(self, reasons):
+        super().__init__(f"Transaction cancelled: {', '.join(reasons)}")
+        self.reasons = reasons
+
+    def failed(self, code='ConditionalCheckFailed'):
+        """Índices de las acciones que fallaron con el código dado"""
+        return [i for i, reason in enumerate(self.reasons) if reason == code]
+
+
+def _table_name(table):
+    return getattr(table, 'name', table)
+
+
+def _with_expression(action, condition=None, names=None, values=None):
+    if condition:
+        action['ConditionExpression'] = condition
+    if names:
+        action['ExpressionAttributeNames'] = names
+    if values:
+        action['ExpressionAttributeValues'] = values
+    return action
+
+
+def put(table, item, condition=None, names=None, values=None):
+    """Acción Put (crear o reemplazar un item)"""
+    return {'Put': _with_expression({'TableName': _table_name(table), 'Item': item}, condition, names, values)}
+
+
+def update(table, key, expression, condition=None, names=None, values=None):
+    """Acción Update (UpdateExpression sobre un item)"""
+    action = {'TableName': _table_name(table), 'Key': key, 'UpdateExpression': expression}
+    return {'Update': _with_expression(action, condition, names, values)}
+
+
+def delete(table, key, condition=None, names=None, values=None):
+    """Acción Delete"""
+    return {'Delete': _with_expression({'TableName': _table_name(table), 'Key': key}, condition, names, values)}
+
+
+def condition_check(table, key, condition, names=None, values=None):
+    """Acción ConditionCheck (valida un item sin modificarlo)"""
+    action = {'TableName': _table_name(table), 'Key': key}
+    return {'ConditionCheck': _with_expression(action, condition, names, values)}
+
+
+def chunk_actions(actions, size=TRANSACTION_MAX_ACTIONS):
+    """Divide una lista de acciones en bloques que respetan el límite por transacción"""
+    return [actions[i:i + size] for i in range(0, len(actions), size)]
+
+
+def request_token(*parts):
+    """
+    ClientRequestToken estable para una operación (p. ej. 'release', orderId)
+    Se usa un hash en lugar de truncar: los ids ULID son largos y truncados
+    dos pedidos distintos compartirían el token.
+    """
+    digest = hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+    return digest[:REQUEST_TOKEN_LENGTH]
+
+
+def transact_write(client, actions, token=None):
+    """
+    Ejecuta una transacción (todas las acciones o ninguna)
+    Reintenta con backoff exponencial + jitter si se canceló solo por conflictos
+    con otra transacción o por throttling.
+    Args:
+        client - cliente DynamoDB (p. ej. table.meta.client)
+        token - ClientRequestToken opcional: reenviar el mismo token es idempotente
+    Raises:
+        TransactionCancelled si falló alguna condición
+        ValueError si hay más acciones que TRANSACTION_MAX_ACTIONS
+    """
+    if len(actions) > TRANSACTION_MAX_ACTIONS:
+        raise ValueError(f'A transaction supports at most {TRANSACTION_MAX_ACTIONS} actions')
+
+    kwargs = {'TransactItems': actions}
+    if token:
+        kwargs['ClientRequestToken'] = token
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return client.transact_write_items(**kwargs)
+        except ClientError as e:
+            code = e.response.get('Error', {}).get('Code')
+            if code == 'TransactionInProgressException':
+                reasons = list(RETRYABLE_REASONS[:1])
+            elif code == 'TransactionCanceledException':
+                reasons = [
+                    reason.get('Code', 'None')
+                    for reason in e.response.get('CancellationReasons', [])
+                ]
+            else:
+                raise
+
+            retryable = all(reason in RETRYABLE_REASONS + ('None',) for reason in reasons)
+            if not retryable:
+                raise TransactionCancelled(reasons)
+            if attempt == MAX_ATTEMPTS - 1:
+                raise TransactionCancelled(reasons)
+
+            time.sleep(BACKOFF_BASE_SECONDS * (2 ** attempt) * (0.5 + random.random()))
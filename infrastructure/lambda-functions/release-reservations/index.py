@@ -0,0 +1,83 @@
+import json
+import boto3
+import os
+from datetime import datetime, timedelta
+from boto3.dynamodb.conditions import Key, Attr
+
+# Utilidades compartidas (capa common)
+from pagination import iter_items
+from inventory import RESERVATION_TTL_HOURS, aggregate_quantities, release_actions
+from transactions import update, transact_write, request_token, TransactionCancelled
+from catalog_cache import bump_stock_version
+from ids import ORDER_STATUS_PENDING, ORDER_STATUS_EXPIRED
+
+# Inicializar clientes DynamoDB
+dynamodb = boto3.resource('dynamodb')
+orders_table = dynamodb.Table(os.environ['ORDERS_TABLE'])
+products_table = dynamodb.Table(os.environ['PRODUCTS_TABLE'])
+
+# Versión de stock en la tabla Meta: vacía los caches del catálogo tras mover stock
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+
+# Índice por estado y fecha (definido en data-stack.ts)
+STATUS_INDEX = os.environ.get('STATUS_INDEX', 'status-createdAt-index')
+
+def release_order(order, now):
+    """
+    Devuelve el stock reservado de un pedido vencido y lo marca como 'expired'
+    La condición status = pending evita liberar dos veces (o liberar uno ya completado)
+    Returns: True si se liberó
+    """
+    actions = release_actions(products_table, aggregate_quantities(order.get('items', [])), now)
+    actions.append(update(
+        orders_table,
+        {'orderId': order['orderId'], 'createdAt': order['createdAt']},
+        'SET #status = :expired, releasedAt = :now, updatedAt = :now',
+        condition='#status = :pending',
+        names={'#status': 'status'},
+        values={':expired': ORDER_STATUS_EXPIRED, ':pending': ORDER_STATUS_PENDING, ':now': now}
+    ))
+    try:
+        transact_write(orders_table.meta.client, actions, token=request_token('release', order['orderId']))
+        return True
+    except TransactionCancelled as e:
+        print(f"Could not release order {order['orderId']}: {e.reasons}")
+        return False
+
+def handler(event, context):
+    """
+    Barrido programado (EventBridge): libera las reservas de pedidos pendientes
+    cuyo reservationExpiresAt ya pasó (modo reserva de stock)
+    Solo lee del índice status + createdAt los pendientes creados antes de la
+    ventana de reserva, no todo el historial de pedidos.
+    """
+    try:
+        started_at = datetime.utcnow()
+        now = started_at.isoformat()
+        hold_window_start = (started_at - timedelta(hours=RESERVATION_TTL_HOURS)).isoformat()
+        report = {'expiredOrders': 0, 'releasedOrders': 0, 'failedOrders': 0}
+        
+        # reservationExpiresAt se guardó con el TTL vigente al crear el pedido:
+        # el filtro decide, la KeyCondition solo acota la lectura
+        expired_filter = Attr('stockReserved').eq(True) & Attr('reservationExpiresAt').lt(now)
+        for order in iter_items(
+            orders_table.query,
+            IndexName=STATUS_INDEX,
+            KeyConditionExpression=Key('status').eq(ORDER_STATUS_PENDING) & Key('createdAt').lt(hold_window_start),
+            FilterExpression=expired_filter
+        ):
+            report['expiredOrders'] += 1
+            if release_order(order, now):
+                report['releasedOrders'] += 1
+            else:
+                report['failedOrders'] += 1
+        
+        if report['releasedOrders']:
+            bump_stock_version(meta_table)
+        
+        print(f"Reservation release report: {json.dumps(report)}")
+        return report
+        
+    except Exception as e:
+        print(f"Error releasing reservations: {str(e)}")
+        raise
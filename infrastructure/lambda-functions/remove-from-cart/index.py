@@ -3,10 +3,15 @@ import boto3
 import os
 from decimal import Decimal
 
+# Utilidades compartidas (capa common)
+from cart_store import apply_header_delta, line_value
+
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 cart_table_name = os.environ['CART_TABLE']
 cart_table = dynamodb.Table(cart_table_name)
+# Cabecera de totales del carrito (tabla propia, fuera del índice productId-index)
+cart_headers_table = dynamodb.Table(os.environ['CART_HEADERS_TABLE'])
 
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
@@ -74,14 +79,25 @@ def handler(event, context):
             # Guardar información del item antes de eliminarlo
             removed_item = existing_item['Item']
             
-            # Eliminar item del carrito
-            cart_table.delete_item(
+            # Eliminar item del carrito y descontarlo de la cabecera de totales
+            response = cart_table.delete_item(
                 Key={
                     'userId': user_id,
                     'productId': product_id
-                }
+                },
+                ReturnValues='ALL_OLD'
             )
             
+            deleted_item = response.get('Attributes')
+            if deleted_item:
+                apply_header_delta(
+                    cart_headers_table,
+                    user_id,
+                    lines=-1,
+                    quantity=-int(deleted_item.get('quantity', 0)),
+                    price=-line_value(deleted_item)
+                )
+            
             return {
                 'statusCode': 200,
                 'headers': {
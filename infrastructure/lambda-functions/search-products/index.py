@@ -0,0 +1,140 @@
+import json
+import boto3
+import os
+import time
+from decimal import Decimal
+
+# Utilidades compartidas (capa common)
+from pagination import iter_items, parse_limit
+from catalog_cache import CatalogCache
+from catalog_snapshot import current_manifest, read_snapshot_products, public_product
+from http_responses import conditional_response
+from search_index import SearchIndex
+
+# Inicializar cliente DynamoDB
+dynamodb = boto3.resource('dynamodb')
+table_name = os.environ['PRODUCTS_TABLE']
+table = dynamodb.Table(table_name)
+
+# Cache del catálogo a nivel de módulo: el índice se reconstruye cuando cambia la versión
+# (no incluye stock, así que los pedidos no lo invalidan)
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+catalog_cache = CatalogCache(meta_table, track_stock=False)
+
+# Snapshot precalculado del catálogo (evita el scan al construir el índice)
+s3_client = boto3.client('s3')
+bucket_name = os.environ['IMAGES_BUCKET']
+
+# Límites de la búsqueda
+MAX_QUERY_LENGTH = 100
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 50
+
+# Función para convertir Decimal a float/int
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+def build_search_index():
+    """Construye el índice desde el snapshot vigente o, si está atrasado, desde DynamoDB"""
+    started = time.perf_counter()
+    manifest = current_manifest(s3_client, bucket_name, catalog_cache)
+    if manifest:
+        products = read_snapshot_products(s3_client, bucket_name, manifest)
+        source = f"snapshot v{manifest.get('version')}"
+    else:
+        # Mismos campos que el snapshot (sin privados ni stock)
+        products = (public_product(product) for product in iter_items(table.scan))
+        source = 'scan'
+    
+    index = SearchIndex(products)
+    print(f"Search index built from {source}: {len(index.products)} products, "
+          f"{len(index.vocabulary)} terms in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return index
+
+def handler(event, context):
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        query = (query_params.get('q') or '').strip()
+        category = query_params.get('category')
+        gender = query_params.get('gender')
+        
+        if not query or len(query) > MAX_QUERY_LENGTH:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': f'Query parameter q is required (max {MAX_QUERY_LENGTH} characters)',
+                    'examples': ['?q=camiseta', '?q=zapa&gender=mujer', '?q=futbol&category=camisetas']
+                })
+            }
+        
+        try:
+            limit = parse_limit(query_params, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Invalid limit parameter',
+                    'error': str(e)
+                })
+            }
+        
+        # Índice invertido en memoria (se construye una vez por contenedor y versión;
+        # al vencer el TTL solo se reconstruye si la versión del catálogo cambió)
+        index = catalog_cache.get_or_load(('search-index',), build_search_index, revalidate=True)
+        
+        predicate = None
+        if category or gender:
+            predicate = lambda product: (
+                (not category or product.get('category') == category) and
+                (not gender or product.get('gender') == gender)
+            )
+        
+        started = time.perf_counter()
+        results = index.search(query, limit, predicate)
+        took_ms = (time.perf_counter() - started) * 1000
+        
+        return conditional_response(event, {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, If-None-Match',
+                # Tiempo de búsqueda en el índice (fuera del body para no alterar el ETag)
+                'Server-Timing': f'search;dur={took_ms:.3f}'
+            },
+            'body': json.dumps({
+                'message': 'Products searched successfully',
+                'query': query,
+                'filters': {
+                    'category': category,
+                    'gender': gender
+                },
+                'products': [dict(product, score=score) for score, product in results],
+                'count': len(results)
+            }, default=decimal_default)
+        })
+        
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'message': 'Internal server error',
+                'error': str(e)
+            })
+        }
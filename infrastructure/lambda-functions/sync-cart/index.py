@@ -0,0 +1,353 @@
+import json
+import boto3
+import os
+import time
+from decimal import Decimal
+from datetime import datetime
+
+# Utilidades compartidas (capa common)
+from product_repository import ProductRepository
+from cart_store import (
+    load_cart_with_header, summarize_cart, new_cart_item, cart_expiry, line_value,
+    header_item, header_delta_update
+)
+from inventory import available_stock
+from http_responses import parse_json_body
+from transactions import put, update, delete, transact_write, TransactionCancelled, TRANSACTION_MAX_ACTIONS
+
+# Inicializar clientes DynamoDB
+dynamodb = boto3.resource('dynamodb')
+cart_table_name = os.environ['CART_TABLE']
+products_table_name = os.environ['PRODUCTS_TABLE']
+cart_table = dynamodb.Table(cart_table_name)
+# Cabecera de totales del carrito (tabla propia, fuera del índice productId-index)
+cart_headers_table = dynamodb.Table(os.environ['CART_HEADERS_TABLE'])
+products_table = dynamodb.Table(products_table_name)
+
+# Límites del carrito
+MAX_CART_LINES = int(os.environ.get('MAX_CART_LINES', '50'))
+CART_OPERATIONS = ('set', 'add', 'remove')
+
+# Lectura + escritura completas que se reintentan si otra request cambió el carrito en medio
+SYNC_ATTEMPTS = 3
+
+# Función para convertir Decimal a float/int
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+def parse_quantity(value, minimum):
+    """Valida una cantidad entera (>= minimum)"""
+    if isinstance(value, bool) or not isinstance(value, int) or value < minimum:
+        raise ValueError(f'quantity must be an integer >= {minimum}, got {value!r}')
+    return value
+
+def parse_product_id(entry):
+    product_id = entry.get('productId') if isinstance(entry, dict) else None
+    if not isinstance(product_id, str) or not product_id:
+        raise ValueError(f'Each entry needs a productId: {entry!r}')
+    return product_id
+
+def build_desired_cart(body, current):
+    """
+    Calcula el estado final del carrito a partir del body
+    - {"items": [{"productId", "quantity"}]}: estado completo (lo que no está se elimina)
+    - {"operations": [{"op": "set|add|remove", "productId", "quantity"}]}: cambios en orden
+    Returns: (desired {productId: quantity}, categories {productId: category})
+    Raises: ValueError si el body no es válido
+    """
+    categories = {}
+    
+    if 'items' in body:
+        items = body['items']
+        if not isinstance(items, list):
+            raise ValueError('items must be a list')
+        desired = {}
+        for entry in items:
+            product_id = parse_product_id(entry)
+            if product_id in desired:
+                raise ValueError(f'Duplicated productId in items: {product_id}')
+            desired[product_id] = parse_quantity(entry.get('quantity'), 0)
+            if entry.get('productCategory'):
+                categories[product_id] = entry['productCategory']
+    elif 'operations' in body:
+        operations = body['operations']
+        if not isinstance(operations, list) or not operations:
+            raise ValueError('operations must be a non-empty list')
+        desired = dict(current)
+        for entry in operations:
+            product_id = parse_product_id(entry)
+            op = entry.get('op')
+            if op not in CART_OPERATIONS:
+                raise ValueError(f"op must be one of: {', '.join(CART_OPERATIONS)}")
+            if op == 'remove':
+                desired[product_id] = 0
+            elif op == 'set':
+                desired[product_id] = parse_quantity(entry.get('quantity'), 0)
+            else:
+                desired[product_id] = desired.get(product_id, 0) + parse_quantity(entry.get('quantity', 1), 1)
+            if entry.get('productCategory'):
+                categories[product_id] = entry['productCategory']
+    else:
+        raise ValueError('Body must include items (full cart) or operations')
+    
+    desired = {product_id: quantity for product_id, quantity in desired.items() if quantity > 0}
+    if len(desired) > MAX_CART_LINES:
+        raise ValueError(f'Cart cannot have more than {MAX_CART_LINES} different products')
+    return desired, categories
+
+def line_condition(item):
+    """
+    Condición para escribir una línea leída: sigue con la misma cantidad y el mismo
+    updatedAt (todas las mutaciones del carrito lo renuevan)
+    Returns: (expresión, valores)
+    """
+    values = {':read_quantity': item.get('quantity', 0)}
+    condition = 'quantity = :read_quantity'
+    if item.get('updatedAt'):
+        values[':read_updated_at'] = item['updatedAt']
+        condition += ' AND updatedAt = :read_updated_at'
+    else:
+        condition += ' AND attribute_not_exists(updatedAt)'
+    return condition, values
+
+def header_action(user_id, header, old_items, new_items, cart_items):
+    """
+    Acción de la transacción para la cabecera de totales
+    - Con cabecera: ADD de la diferencia entre las líneas leídas y las nuevas
+      (condicionada a que exista, así un borrado concurrente cancela la transacción)
+    - Sin cabecera: se crea con los totales del carrito resultante (cart_items)
+    """
+    if header is None:
+        return put(cart_headers_table, header_item(user_id, cart_items), condition='attribute_not_exists(userId)')
+    
+    delta = header_delta_update(
+        len(new_items) - len(old_items),
+        sum(int(item['quantity']) for item in new_items) - sum(int(item['quantity']) for item in old_items),
+        sum((line_value(item) for item in new_items), Decimal(0))
+        - sum((line_value(item) for item in old_items), Decimal(0))
+    )
+    return update(
+        cart_headers_table,
+        {'userId': user_id},
+        delta['UpdateExpression'],
+        condition=delta['ConditionExpression'],
+        names=delta['ExpressionAttributeNames'],
+        values=delta['ExpressionAttributeValues']
+    )
+
+def handler(event, context):
+    try:
+        # Obtener userId desde Cognito (JWT token)
+        user_id = event.get('requestContext', {}).get('authorizer', {}).get('claims', {}).get('sub')
+        
+        if not user_id:
+            return {
+                'statusCode': 401,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Unauthorized - User authentication required',
+                    'error': 'Missing or invalid JWT token'
+                })
+            }
+        
+        # Leer, combinar y escribir en una transacción condicionada a lo leído;
+        # si otra request cambió el carrito en medio se vuelve a leer y combinar
+        synced = False
+        for attempt in range(SYNC_ATTEMPTS):
+            # Carrito actual (un query) y estado deseado
+            lines, header = load_cart_with_header(cart_table, cart_headers_table, user_id)
+            current_items = {item['productId']: item for item in lines}
+            current = {product_id: int(item.get('quantity', 0)) for product_id, item in current_items.items()}
+            
+            try:
+                desired, categories = build_desired_cart(parse_json_body(event), current)
+            except ValueError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'message': 'Invalid request body',
+                        'error': str(e),
+                        'examples': [
+                            {'items': [{'productId': 'PROD1234', 'quantity': 2}]},
+                            {'operations': [
+                                {'op': 'add', 'productId': 'PROD1234', 'quantity': 1},
+                                {'op': 'set', 'productId': 'PROD5678', 'quantity': 3},
+                                {'op': 'remove', 'productId': 'PROD9999'}
+                            ]}
+                        ]
+                    })
+                }
+            
+            # Diferencias contra lo guardado
+            to_remove = [product_id for product_id in current if product_id not in desired]
+            to_upsert = [
+                product_id for product_id, quantity in desired.items()
+                if current.get(product_id) != quantity
+            ]
+            
+            # Validar stock de todos los productos modificados con una lectura batch
+            references = [
+                {
+                    'id': product_id,
+                    'category': categories.get(product_id) or current_items.get(product_id, {}).get('productCategory')
+                }
+                for product_id in to_upsert
+            ]
+            products = ProductRepository(products_table).get_many(references)
+            
+            errors = []
+            for product_id, product in zip(to_upsert, products):
+                if not product:
+                    errors.append({'productId': product_id, 'error': 'Product not found'})
+                elif available_stock(product) < desired[product_id]:
+                    errors.append({
+                        'productId': product_id,
+                        'error': 'Insufficient stock',
+                        'requestedQuantity': desired[product_id],
+                        'availableStock': available_stock(product),
+                        'productName': product.get('name')
+                    })
+            
+            if errors:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'message': 'Cart could not be synchronized, no changes were applied',
+                        'errors': errors
+                    }, default=decimal_default)
+                }
+            
+            # Acciones de la transacción: cada línea condicionada a la cantidad leída
+            now = datetime.utcnow().isoformat()
+            expires_at = cart_expiry()
+            result_items = {
+                product_id: item for product_id, item in current_items.items()
+                if product_id in desired
+            }
+            changes = {'added': [], 'updated': [], 'removed': to_remove}
+            actions = []
+            
+            for product_id in to_remove:
+                condition, values = line_condition(current_items[product_id])
+                actions.append(delete(
+                    cart_table, {'userId': user_id, 'productId': product_id},
+                    condition=condition, values=values
+                ))
+            
+            for product_id, product in zip(to_upsert, products):
+                if product_id in current_items:
+                    item = dict(
+                        current_items[product_id],
+                        quantity=desired[product_id],
+                        updatedAt=now,
+                        expiresAt=expires_at
+                    )
+                    condition, values = line_condition(current_items[product_id])
+                    changes['updated'].append(product_id)
+                else:
+                    # Línea nueva: no existe o es una fila vencida que el TTL todavía no borró
+                    item = new_cart_item(user_id, product, desired[product_id], now)
+                    condition = 'attribute_not_exists(userId) OR expiresAt <= :now_epoch'
+                    values = {':now_epoch': int(time.time())}
+                    changes['added'].append(product_id)
+                actions.append(put(cart_table, item, condition=condition, values=values))
+                result_items[product_id] = item
+            
+            if not actions:
+                synced = True
+                break
+            
+            # La cabecera de totales en la misma transacción (delta sobre lo leído)
+            actions.append(header_action(
+                user_id,
+                header,
+                [current_items[product_id] for product_id in to_remove + to_upsert if product_id in current_items],
+                [result_items[product_id] for product_id in to_upsert],
+                list(result_items.values())
+            ))
+            
+            if len(actions) > TRANSACTION_MAX_ACTIONS:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': json.dumps({
+                        'message': 'Too many changes in one synchronization',
+                        'changedLines': len(actions) - 1,
+                        'maxChangedLines': TRANSACTION_MAX_ACTIONS - 1
+                    })
+                }
+            
+            try:
+                transact_write(cart_table.meta.client, actions)
+                synced = True
+                break
+            except TransactionCancelled as e:
+                if not e.failed():
+                    raise
+                print(f"Cart changed during sync (attempt {attempt + 1}): {e}")
+        
+        if not synced:
+            return {
+                'statusCode': 409,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Cart was modified concurrently, no changes were applied',
+                    'attempts': SYNC_ATTEMPTS
+                })
+            }
+        
+        cart_items = list(result_items.values())
+        summary, categories_breakdown = summarize_cart(cart_items)
+        
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'PUT, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+            },
+            'body': json.dumps({
+                'message': 'Cart synchronized successfully',
+                'userId': user_id,
+                'changes': changes,
+                'cart': {
+                    'items': cart_items,
+                    'summary': summary,
+                    'categoriesBreakdown': categories_breakdown
+                }
+            }, default=decimal_default)
+        }
+        
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({
+                'message': 'Internal server error',
+                'error': str(e)
+            })
+        }
@@ -4,12 +4,20 @@ import os
 from decimal import Decimal
 from datetime import datetime
 
+# Utilidades compartidas (capa common)
+from product_repository import ProductRepository
+from http_responses import parse_json_body
+from cart_store import cart_expiry, apply_header_delta, line_value
+from inventory import available_stock
+
 # Inicializar clientes DynamoDB
 dynamodb = boto3.resource('dynamodb')
 cart_table_name = os.environ['CART_TABLE']
 products_table_name = os.environ['PRODUCTS_TABLE']
 cart_table = dynamodb.Table(cart_table_name)
 products_table = dynamodb.Table(products_table_name)
+# Cabecera de totales del carrito (tabla propia, fuera del índice productId-index)
+cart_headers_table = dynamodb.Table(os.environ['CART_HEADERS_TABLE'])
 
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
@@ -52,7 +60,7 @@ def handler(event, context):
             }
         
         # Parsear body de la request
-        body = json.loads(event.get('body', '{}'))
+        body = parse_json_body(event)
         new_quantity = body.get('quantity')
         
         if new_quantity is None:
@@ -126,13 +134,9 @@ def handler(event, context):
         
         # Verificar stock disponible del producto
         try:
-            product_response = products_table.scan(
-                FilterExpression='id = :id',
-                ExpressionAttributeValues={':id': product_id}
-            )
-            
-            products = product_response.get('Items', [])
-            if not products:
+            # La fila del carrito guarda la categoría: GetItem directo
+            product = ProductRepository(products_table).get(product_id, cart_item.get('productCategory'))
+            if not product:
                 return {
                     'statusCode': 404,
                     'headers': {
@@ -145,10 +149,9 @@ def handler(event, context):
                     })
                 }
             
-            product = products[0]
-            available_stock = int(product.get('stock', 0))
+            stock = available_stock(product)
             
-            if available_stock < new_quantity:
+            if stock < new_quantity:
                 return {
                     'statusCode': 400,
                     'headers': {
@@ -158,7 +161,7 @@ def handler(event, context):
                     'body': json.dumps({
                         'message': 'Insufficient stock for requested quantity',
                         'requestedQuantity': new_quantity,
-                        'availableStock': available_stock,
+                        'availableStock': stock,
                         'currentInCart': old_quantity,
                         'productName': product.get('name')
                     })
@@ -180,16 +183,29 @@ def handler(event, context):
         
         # Actualizar cantidad en el carrito
         try:
-            cart_table.update_item(
+            response = cart_table.update_item(
                 Key={
                     'userId': user_id,
                     'productId': product_id
                 },
-                UpdateExpression='SET quantity = :qty, updatedAt = :updated',
+                UpdateExpression='SET quantity = :qty, updatedAt = :updated, expiresAt = :expires_at',
                 ExpressionAttributeValues={
                     ':qty': new_quantity,
-                    ':updated': datetime.utcnow().isoformat()
-                }
+                    ':updated': datetime.utcnow().isoformat(),
+                    ':expires_at': cart_expiry()
+                },
+                ReturnValues='ALL_OLD'
+            )
+            
+            # Ajustar la cabecera con la diferencia real (la fila pudo cambiar desde la lectura)
+            previous_item = response.get('Attributes') or {}
+            quantity_change = new_quantity - int(previous_item.get('quantity', 0))
+            apply_header_delta(
+                cart_headers_table,
+                user_id,
+                lines=0 if previous_item else 1,
+                quantity=quantity_change,
+                price=line_value(previous_item or cart_item, quantity_change)
             )
             
             return {
@@ -4,11 +4,24 @@ import os
 import uuid
 from decimal import Decimal
 from datetime import datetime
+from botocore.exceptions import ClientError
+
+# Utilidades compartidas (capa common)
+from product_repository import ProductRepository
+from catalog_cache import bump_catalog_version
+from product_facets import apply_facet_delta
+from catalog_snapshot import request_snapshot
+from http_responses import parse_json_body
 
 # Inicializar cliente DynamoDB
 dynamodb = boto3.resource('dynamodb')
 products_table_name = os.environ['PRODUCTS_TABLE']
 products_table = dynamodb.Table(products_table_name)
+meta_table = dynamodb.Table(os.environ['META_TABLE'])
+
+# Lambda que regenera el snapshot del catálogo en S3
+lambda_client = boto3.client('lambda')
+snapshot_function_name = os.environ.get('SNAPSHOT_FUNCTION_NAME')
 
 # Función para convertir Decimal a float/int
 def decimal_default(obj):
@@ -145,20 +158,13 @@ def handler(event, context):
             }
         
         # Parsear body de la request
-        body = json.loads(event.get('body', '{}'))
+        body = parse_json_body(event)
         print(f"Request body: {body}")
         
-        # Verificar que el producto existe
-        print("Scanning for existing product...")
-        existing_product_response = products_table.scan(
-            FilterExpression='id = :id',
-            ExpressionAttributeValues={':id': product_id}
-        )
+        # Verificar que el producto existe (query por partition key)
+        existing_product = ProductRepository(products_table).get(product_id)
         
-        existing_products = existing_product_response.get('Items', [])
-        print(f"Found products: {len(existing_products)}")
-        
-        if not existing_products:
+        if not existing_product:
             return {
                 'statusCode': 404,
                 'headers': {
@@ -171,7 +177,6 @@ def handler(event, context):
                 })
             }
         
-        existing_product = existing_products[0]
         print(f"Existing product category: {existing_product.get('category')}")
         
         # Campos que se pueden actualizar (category NO se puede cambiar porque es sort key)
@@ -291,7 +296,13 @@ def handler(event, context):
             field_name = f'#{field}'
             value_name = f':{field}'
             
-            update_expression += f'{field_name} = {value_name}'
+            if field == 'stock':
+                # El admin edita el stock físico; en la tabla stock es lo disponible y lo
+                # reservado por pedidos pendientes se guarda aparte (ver inventory.py)
+                update_expression += f'{field_name} = {value_name} - if_not_exists(reserved, :no_reserved)'
+                expression_values[':no_reserved'] = 0
+            else:
+                update_expression += f'{field_name} = {value_name}'
             expression_names[field_name] = field
             expression_values[value_name] = value
         
@@ -300,23 +311,56 @@ def handler(event, context):
         print(f"Expression values: {expression_values}")
         
         # Actualizar producto
-        products_table.update_item(
-            Key={
+        update_params = {
+            'Key': {
                 'id': product_id,
                 'category': existing_product.get('category')
             },
-            UpdateExpression=update_expression,
-            ExpressionAttributeNames=expression_names,
-            ExpressionAttributeValues=expression_values
-        )
+            'UpdateExpression': update_expression,
+            'ExpressionAttributeNames': expression_names,
+            'ExpressionAttributeValues': expression_values,
+            'ReturnValues': 'ALL_NEW'
+        }
+        if 'stock' in updates:
+            # El stock físico no puede quedar por debajo de las unidades ya reservadas
+            # (se evalúa contra el valor actual, aunque cambie después de leer el producto)
+            update_params['ConditionExpression'] = 'attribute_not_exists(reserved) OR reserved <= :stock'
+            update_params['ReturnValuesOnConditionCheckFailure'] = 'ALL_OLD'
+        
+        try:
+            update_response = products_table.update_item(**update_params)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            reserved = int(e.response.get('Item', {}).get('reserved', {}).get('N', 0))
+            return {
+                'statusCode': 409,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': json.dumps({
+                    'message': 'Stock cannot be lower than the units reserved by pending orders',
+                    'providedStock': updates['stock'],
+                    'reservedStock': reserved
+                })
+            }
         
         print("Update successful!")
         
+        # Actualizar contadores de facetas (género/precio pueden haber cambiado) y luego
+        # invalidar caches del catálogo y regenerar el snapshot público
+        apply_facet_delta(meta_table, existing_product, update_response.get('Attributes'))
+        catalog_version = bump_catalog_version(meta_table)
+        request_snapshot(lambda_client, snapshot_function_name, catalog_version)
+        
         # Preparar respuesta con cambios
         changes = {}
         for field, new_value in updates.items():
             if field not in ['updatedAt', 'updatedBy']:
                 old_value = existing_product.get(field)
+                if field == 'stock':
+                    old_value = int(old_value or 0) + int(existing_product.get('reserved', 0))
                 changes[field] = {
                     'from': float(old_value) if isinstance(old_value, Decimal) else old_value,
                     'to': float(new_value) if isinstance(new_value, Decimal) else new_value
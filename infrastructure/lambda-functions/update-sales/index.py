@@ -5,6 +5,10 @@ from decimal import Decimal
 from datetime import datetime
 from botocore.exceptions import ClientError
 
+# Utilidades compartidas (capa common)
+from http_responses import parse_json_body
+from ids import get_sale
+
 # Inicializar clientes DynamoDB
 dynamodb = boto3.resource('dynamodb')
 sales_table_name = os.environ['SALES_TABLE']
@@ -73,8 +77,8 @@ def handler(event, context):
         
         # Parsear body con los cambios
         try:
-            body = json.loads(event.get('body', '{}'))
-        except json.JSONDecodeError:
+            body = parse_json_body(event)
+        except ValueError:
             return {
                 'statusCode': 400,
                 'headers': {
@@ -111,14 +115,9 @@ def handler(event, context):
             }
         
         try:
-            # Buscar la venta primero
-            sale_response = sales_table.scan(
-                FilterExpression='saleId = :saleId',
-                ExpressionAttributeValues={':saleId': sale_id}
-            )
-            
-            sales = sale_response.get('Items', [])
-            if not sales:
+            # Buscar la venta por clave (GetItem con la fecha derivada del id)
+            sale = get_sale(sales_table, sale_id)
+            if not sale:
                 return {
                     'statusCode': 404,
                     'headers': {
@@ -131,8 +130,6 @@ def handler(event, context):
                     })
                 }
             
-            sale = sales[0]
-            
             # Verificar que la venta se pueda modificar
             if sale.get('status') == 'cancelled':
                 return {
@@ -174,24 +171,19 @@ def handler(event, context):
             expression_attribute_values[':lastModifiedAt'] = datetime.utcnow().isoformat()
             expression_attribute_values[':lastModifiedBy'] = admin_email
             
-            # Ejecutar actualización
-            sales_table.update_item(
+            # Ejecutar actualización (devuelve la venta actualizada, sin volver a leerla)
+            updated_response = sales_table.update_item(
                 Key={
                     'saleId': sale_id,
                     'completedAt': sale['completedAt']
                 },
                 UpdateExpression='SET ' + ', '.join(update_expression_parts),
                 ExpressionAttributeNames=expression_attribute_names,
-                ExpressionAttributeValues=expression_attribute_values
-            )
-            
-            # Obtener la venta actualizada
-            updated_response = sales_table.scan(
-                FilterExpression='saleId = :saleId',
-                ExpressionAttributeValues={':saleId': sale_id}
+                ExpressionAttributeValues=expression_attribute_values,
+                ReturnValues='ALL_NEW'
             )
             
-            updated_sale = updated_response.get('Items', [{}])[0]
+            updated_sale = updated_response.get('Attributes', {})
             
             return {
                 'statusCode': 200,
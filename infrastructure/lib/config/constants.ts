@@ -13,3 +13,24 @@ export const LAMBDA_CONFIG = {
 export const DYNAMODB_CONFIG = {
   billingMode: BillingMode.PAY_PER_REQUEST
 };
+
+// Nombres de índices secundarios (compartidos entre DataStack y variables de entorno de Lambdas)
+export const DYNAMODB_INDEXES = {
+  productsByCategory: 'category-index',
+  productsByGender: 'gender-index',
+  cartByProduct: 'productId-index',
+  ordersByStatus: 'status-createdAt-index',
+  ordersByUser: 'userId-createdAt-index'
+};
+
+// Cache del catálogo en memoria de las Lambdas de lectura
+export const CATALOG_CACHE_CONFIG = {
+  ttlSeconds: 300,
+  maxEntries: 256,
+  versionCheckSeconds: 5
+};
+
+export const PAGINATION_CONFIG = {
+  defaultLimit: 50,
+  maxLimit: 200
+};
@@ -4,6 +4,11 @@ export interface Environment {
   name: string;
   prefix: string;
   stage: string;
+  // Días sin actividad tras los que se eliminan las filas del carrito (TTL)
+  cartTtlDays: number;
+  // Reservar stock al crear el pedido (se libera al cancelar o al vencer la reserva)
+  stockReservation: boolean;
+  reservationTtlHours: number;
   tags: { [key: string]: string };
 }
 
@@ -12,6 +17,9 @@ export const ENVIRONMENTS: { [key: string]: Environment } = {
     name: 'development',
     prefix: 'sportshop-dev-v3',
     stage: 'dev',
+    cartTtlDays: 7,
+    stockReservation: true,
+    reservationTtlHours: 24,
     tags: {
       Environment: 'dev',
       Project: 'sportshop',
@@ -24,6 +32,9 @@ export const ENVIRONMENTS: { [key: string]: Environment } = {
     name: 'production',
     prefix: 'sportshop-prod-v3',
     stage: 'prod',
+    cartTtlDays: 30,
+    stockReservation: false,
+    reservationTtlHours: 48,
     tags: {
       Environment: 'prod',
       Project: 'sportshop',
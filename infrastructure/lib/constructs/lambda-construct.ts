@@ -1,6 +1,6 @@
 // Construct reutilizable para crear Lambdas con configuración estándar
 import { Construct } from 'constructs';
-import { Function, Runtime, Code } from 'aws-cdk-lib/aws-lambda';
+import { Function, Runtime, Code, ILayerVersion } from 'aws-cdk-lib/aws-lambda';
 import { Duration } from 'aws-cdk-lib';
 import { LAMBDA_CONFIG } from '../config/constants';
 
@@ -11,6 +11,7 @@ export interface SportShopLambdaProps {
   environment?: { [key: string]: string };
   timeout?: Duration;
   memorySize?: number;
+  layers?: ILayerVersion[];
 }
 
 export class SportShopLambda extends Construct {
@@ -27,7 +28,8 @@ export class SportShopLambda extends Construct {
       memorySize: props.memorySize || LAMBDA_CONFIG.memorySize,
       handler: props.handler || 'index.handler',
       code: props.code,
-      environment: props.environment || {}
+      environment: props.environment || {},
+      layers: props.layers
     });
   }
 }
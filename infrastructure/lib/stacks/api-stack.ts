@@ -24,10 +24,13 @@ export class ApiStack extends Stack {
     this.api = new RestApi(this, 'SportShopApi', {
       restApiName: `${env.prefix}-api`,
       description: 'SportShop E-commerce REST API',
+      // Permite devolver respuestas comprimidas (gzip/br) en base64 desde Lambda.
+      // Los bodies JSON de los requests llegan en base64 (ver http_responses.parse_json_body)
+      binaryMediaTypes: ['application/json'],
       defaultCorsPreflightOptions: {
         allowOrigins: Cors.ALL_ORIGINS,
         allowMethods: Cors.ALL_METHODS,
-        allowHeaders: ['Content-Type', 'Authorization']
+        allowHeaders: ['Content-Type', 'Authorization', 'If-None-Match']
       }
     });
 
@@ -49,6 +52,24 @@ export class ApiStack extends Stack {
       new LambdaIntegration(props.computeStack.getProductsFilteredFunction.function)
     );
 
+    // GET /products/facets - Conteos por categoría/género/rango de precio
+    const productsFacetsResource = productsResource.addResource('facets');
+    productsFacetsResource.addMethod('GET',
+      new LambdaIntegration(props.computeStack.getProductFacetsFunction.function)
+    );
+
+    // GET /products/search?q= - Búsqueda de texto con autocompletado
+    const productsSearchResource = productsResource.addResource('search');
+    productsSearchResource.addMethod('GET',
+      new LambdaIntegration(props.computeStack.searchProductsFunction.function)
+    );
+
+    // POST /products/batch - Obtener varios productos por id en una sola llamada
+    const productsBatchResource = productsResource.addResource('batch');
+    productsBatchResource.addMethod('POST',
+      new LambdaIntegration(props.computeStack.getProductsBatchFunction.function)
+    );
+
     // GET /products/{id} - Obtener producto específico
     const productDetailResource = productsResource.addResource('{id}');
     productDetailResource.addMethod('GET',
@@ -76,6 +97,25 @@ export class ApiStack extends Stack {
       }
     );
 
+    // PUT /cart - Sincronizar el carrito completo (operaciones o estado final)
+    cartResource.addMethod('PUT',
+      new LambdaIntegration(props.computeStack.syncCartFunction.function),
+      {
+        authorizationType: AuthorizationType.COGNITO,
+        authorizer: this.authorizer
+      }
+    );
+
+    // GET /cart/summary - Totales del carrito (badge) leyendo solo la fila cabecera
+    const cartSummaryResource = cartResource.addResource('summary');
+    cartSummaryResource.addMethod('GET',
+      new LambdaIntegration(props.computeStack.getCartSummaryFunction.function),
+      {
+        authorizationType: AuthorizationType.COGNITO,
+        authorizer: this.authorizer
+      }
+    );
+
     // DELETE /cart/{productId} - Eliminar producto del carrito
     const cartItemResource = cartResource.addResource('{productId}');
     cartItemResource.addMethod('DELETE',
@@ -107,6 +147,25 @@ export class ApiStack extends Stack {
       }
     );
 
+    // GET /orders - Historial de pedidos del usuario (paginado)
+    ordersResource.addMethod('GET',
+      new LambdaIntegration(props.computeStack.getMyOrdersFunction.function),
+      {
+        authorizationType: AuthorizationType.COGNITO,
+        authorizer: this.authorizer
+      }
+    );
+
+    // GET /orders/{orderId} - Detalle de un pedido del usuario
+    const orderDetailResource = ordersResource.addResource('{orderId}');
+    orderDetailResource.addMethod('GET',
+      new LambdaIntegration(props.computeStack.getMyOrderDetailFunction.function),
+      {
+        authorizationType: AuthorizationType.COGNITO,
+        authorizer: this.authorizer
+      }
+    );
+
     // ENDPOINTS DE ADMIN (requieren autenticación - IGUAL QUE CART)
     const adminResource = this.api.root.addResource('admin');
     
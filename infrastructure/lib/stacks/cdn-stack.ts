@@ -20,6 +20,7 @@ interface CdnStackProps extends StackProps {
   stage: string;
   websiteBucket: Bucket;
   adminBucket: Bucket;
+  imagesBucket: Bucket;
 }
 
 export class CdnStack extends Stack {
@@ -115,6 +116,15 @@ export class CdnStack extends Stack {
           cachedMethods: CachedMethods.CACHE_GET_HEAD,
           cachePolicy: CachePolicy.CACHING_OPTIMIZED,
           compress: true
+        },
+        // Snapshot precalculado del catálogo (JSON gzip versionado en el bucket de imágenes)
+        '/catalog/*': {
+          origin: new HttpOrigin(props.imagesBucket.bucketRegionalDomainName),
+          viewerProtocolPolicy: ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+          allowedMethods: AllowedMethods.ALLOW_GET_HEAD,
+          cachedMethods: CachedMethods.CACHE_GET_HEAD,
+          cachePolicy: CachePolicy.CACHING_OPTIMIZED,
+          compress: false // Los objetos ya se guardan comprimidos con gzip
         }
       }
     });
@@ -180,6 +190,12 @@ export class CdnStack extends Stack {
       exportName: `${env.prefix}-website-cloudfront-url`
     });
 
+    new CfnOutput(this, 'CatalogSnapshotBaseURL', {
+      value: `https://${this.websiteDistribution.distributionDomainName}`,
+      description: 'Base URL for catalog snapshots (pass as cdk context catalogSnapshotBaseUrl)',
+      exportName: `${env.prefix}-catalog-snapshot-base-url`
+    });
+
     new CfnOutput(this, 'AdminCloudFrontURL', {
       value: `https://${this.adminDistribution.distributionDomainName}`,
       description: 'CloudFront URL for the admin panel',
@@ -1,12 +1,16 @@
 // Imports básicos de CDK
-import { Stack, StackProps, Tags } from 'aws-cdk-lib';
-import { Code } from 'aws-cdk-lib/aws-lambda';
+import { Stack, StackProps, Tags, Duration } from 'aws-cdk-lib';
+import { Code, LayerVersion } from 'aws-cdk-lib/aws-lambda';
 import { Table } from 'aws-cdk-lib/aws-dynamodb';
 import { Bucket } from 'aws-cdk-lib/aws-s3';
+import { Rule, Schedule } from 'aws-cdk-lib/aws-events';
+import { LambdaFunction } from 'aws-cdk-lib/aws-events-targets';
+import { Secret } from 'aws-cdk-lib/aws-secretsmanager';
 import { Construct } from 'constructs';
 
 // Imports de nuestras configuraciones
 import { getEnvironment } from '../config/environments';
+import { LAMBDA_CONFIG, PAGINATION_CONFIG, DYNAMODB_INDEXES, CATALOG_CACHE_CONFIG } from '../config/constants';
 import { SportShopLambda } from '../constructs/lambda-construct';
 
 // Interface para las props del stack
@@ -14,8 +18,10 @@ interface ComputeStackProps extends StackProps {
   stage: string;
   productsTable: Table;
   cartTable: Table;
+  cartHeadersTable: Table;
   ordersTable: Table;
   salesTable: Table;
+  metaTable: Table;
   imagesBucket: Bucket;
 }
 
@@ -25,10 +31,16 @@ export class ComputeStack extends Stack {
   public readonly getProductsFunction: SportShopLambda;
   public readonly getProductDetailFunction: SportShopLambda;
   public readonly getProductsFilteredFunction: SportShopLambda;
+  public readonly getProductFacetsFunction: SportShopLambda;
+  public readonly searchProductsFunction: SportShopLambda;
+  public readonly getProductsBatchFunction: SportShopLambda;
   public readonly addToCartFunction: SportShopLambda;
   public readonly getCartFunction: SportShopLambda;
+  public readonly getCartSummaryFunction: SportShopLambda;
   public readonly removeFromCartFunction: SportShopLambda;
   public readonly updateCartQuantityFunction: SportShopLambda;
+  public readonly syncCartFunction: SportShopLambda;
+  public readonly compactCartsFunction: SportShopLambda;
   public readonly createOrderFunction: SportShopLambda;
   public readonly createProductFunction: SportShopLambda;
   public readonly updateProductFunction: SportShopLambda;
@@ -36,13 +48,18 @@ export class ComputeStack extends Stack {
   public readonly generateUploadUrlFunction: SportShopLambda;
   public readonly completeOrderFunction: SportShopLambda;
   public readonly cancelOrderFunction: SportShopLambda;
+  public readonly releaseReservationsFunction: SportShopLambda;
   public readonly getAllOrdersFunction: SportShopLambda;
   public readonly getOrderDetailFunction: SportShopLambda;
+  public readonly getMyOrdersFunction: SportShopLambda;
+  public readonly getMyOrderDetailFunction: SportShopLambda;
   public readonly getAllSalesFunction: SportShopLambda;
   public readonly getSalesDetailFunction: SportShopLambda;
   public readonly updateSalesFunction: SportShopLambda;
   public readonly cancelSaleFunction: SportShopLambda;
   public readonly getSalesStatisticsFunction: SportShopLambda;
+  public readonly generateCatalogSnapshotFunction: SportShopLambda;
+  public readonly commonLayer: LayerVersion;
 
   constructor(scope: Construct, id: string, props: ComputeStackProps) {
     super(scope, id, props);
@@ -50,93 +67,287 @@ export class ComputeStack extends Stack {
     // Obtener configuración del ambiente
     const env = getEnvironment(props.stage);
 
-    // Lambda function para obtener productos
+    // Capa con utilidades Python compartidas (paginación, etc.)
+    this.commonLayer = new LayerVersion(this, 'CommonLayer', {
+      layerVersionName: `${env.prefix}-common`,
+      code: Code.fromAsset('lambda-functions/layers/common'),
+      compatibleRuntimes: [LAMBDA_CONFIG.runtime],
+      description: 'SportShop shared Python utilities'
+    });
+
+    // Clave aleatoria para firmar los cursores de paginación (HMAC): generada por
+    // Secrets Manager, nunca derivada del nombre del ambiente ni escrita en el template
+    const cursorSecret = new Secret(this, 'CursorSecret', {
+      secretName: `${env.prefix}-cursor-secret`,
+      description: 'HMAC key for signed pagination cursors',
+      generateSecretString: {
+        passwordLength: 64,
+        excludePunctuation: true
+      }
+    });
+
+    // Variables para cursores de paginación firmados
+    const paginationEnvironment = {
+      'CURSOR_SECRET_ARN': cursorSecret.secretArn,
+      'DEFAULT_PAGE_LIMIT': String(PAGINATION_CONFIG.defaultLimit),
+      'MAX_PAGE_LIMIT': String(PAGINATION_CONFIG.maxLimit)
+    };
+
+    // Variables para el cache del catálogo (invalidado por versión en la tabla Meta)
+    const catalogCacheEnvironment = {
+      'META_TABLE': props.metaTable.tableName,
+      'CATALOG_CACHE_TTL_SECONDS': String(CATALOG_CACHE_CONFIG.ttlSeconds),
+      'CATALOG_CACHE_MAX_ENTRIES': String(CATALOG_CACHE_CONFIG.maxEntries),
+      'CATALOG_VERSION_CHECK_SECONDS': String(CATALOG_CACHE_CONFIG.versionCheckSeconds)
+    };
+
+    // Vencimiento (TTL) de las filas del carrito, configurable por ambiente
+    const cartTtlEnvironment = {
+      'CART_TTL_DAYS': String(env.cartTtlDays)
+    };
+
+    // Modo reserva de stock al crear pedidos
+    const reservationEnvironment = {
+      'STOCK_RESERVATION': String(env.stockReservation),
+      'RESERVATION_TTL_HOURS': String(env.reservationTtlHours)
+    };
+
+    // Variables para servir el snapshot precalculado del catálogo (?mode=snapshot)
+    const catalogSnapshotEnvironment = {
+      'IMAGES_BUCKET': props.imagesBucket.bucketName,
+      'CATALOG_SNAPSHOT_BASE_URL': this.node.tryGetContext('catalogSnapshotBaseUrl') || ''
+    };
+
+    // Lambda function para obtener productos (soporta paginación con limit/cursor)
     this.getProductsFunction = new SportShopLambda(this, 'GetProductsLambda', {
       functionName: `${env.prefix}-get-products`,
       code: Code.fromAsset('lambda-functions/get-products'),
+      layers: [this.commonLayer],
       environment: {
-        'PRODUCTS_TABLE': props.productsTable.tableName
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        ...paginationEnvironment,
+        ...catalogCacheEnvironment,
+        ...catalogSnapshotEnvironment
       }
     });
 
-    // Dar permisos a Lambda para leer DynamoDB
+    // Dar permisos a Lambda para leer DynamoDB y el snapshot del catálogo
     props.productsTable.grantReadData(this.getProductsFunction.function);
+    cursorSecret.grantRead(this.getProductsFunction.function);
+    props.metaTable.grantReadData(this.getProductsFunction.function);
+    props.imagesBucket.grantRead(this.getProductsFunction.function, 'catalog/*');
 
     // Lambda function para obtener detalle de producto específico
     this.getProductDetailFunction = new SportShopLambda(this, 'GetProductDetailLambda', {
       functionName: `${env.prefix}-get-product-detail`,
       code: Code.fromAsset('lambda-functions/get-product-detail'),
+      layers: [this.commonLayer],
       environment: {
-        'PRODUCTS_TABLE': props.productsTable.tableName
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        ...catalogCacheEnvironment
       }
     });
 
     // Dar permisos a Lambda para leer DynamoDB
     props.productsTable.grantReadData(this.getProductDetailFunction.function);
+    props.metaTable.grantReadData(this.getProductDetailFunction.function);
 
-    // Lambda function para filtrar productos por categoría y género
+    // Lambda function para filtrar productos por categoría y género (query sobre GSIs)
     this.getProductsFilteredFunction = new SportShopLambda(this, 'GetProductsFilteredLambda', {
       functionName: `${env.prefix}-get-products-filtered`,
       code: Code.fromAsset('lambda-functions/get-products-filtered'),
+      layers: [this.commonLayer],
       environment: {
-        'PRODUCTS_TABLE': props.productsTable.tableName
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        'CATEGORY_INDEX': DYNAMODB_INDEXES.productsByCategory,
+        'GENDER_INDEX': DYNAMODB_INDEXES.productsByGender,
+        ...paginationEnvironment,
+        ...catalogCacheEnvironment,
+        ...catalogSnapshotEnvironment
       }
     });
 
-    // Dar permisos a Lambda para leer DynamoDB
+    // Dar permisos a Lambda para leer DynamoDB y el snapshot del catálogo
     props.productsTable.grantReadData(this.getProductsFilteredFunction.function);
+    cursorSecret.grantRead(this.getProductsFilteredFunction.function);
+    props.metaTable.grantReadData(this.getProductsFilteredFunction.function);
+    props.imagesBucket.grantRead(this.getProductsFilteredFunction.function, 'catalog/*');
+
+    // Lambda function para conteos por faceta (categoría × género × rango de precio)
+    this.getProductFacetsFunction = new SportShopLambda(this, 'GetProductFacetsLambda', {
+      functionName: `${env.prefix}-get-product-facets`,
+      code: Code.fromAsset('lambda-functions/get-product-facets'),
+      layers: [this.commonLayer],
+      environment: {
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        ...catalogCacheEnvironment
+      }
+    });
+
+    // Leer productos solo para reconstruir los contadores si no existen
+    props.productsTable.grantReadData(this.getProductFacetsFunction.function);
+    props.metaTable.grantReadWriteData(this.getProductFacetsFunction.function);
+
+    // Lambda function para búsqueda de texto (índice invertido en memoria)
+    this.searchProductsFunction = new SportShopLambda(this, 'SearchProductsLambda', {
+      functionName: `${env.prefix}-search-products`,
+      code: Code.fromAsset('lambda-functions/search-products'),
+      layers: [this.commonLayer],
+      memorySize: 512, // El índice vive en memoria del contenedor
+      environment: {
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        ...catalogCacheEnvironment,
+        ...catalogSnapshotEnvironment
+      }
+    });
+
+    // Leer el catálogo (snapshot en S3 o DynamoDB) para construir el índice
+    props.productsTable.grantReadData(this.searchProductsFunction.function);
+    props.metaTable.grantReadData(this.searchProductsFunction.function);
+    props.imagesBucket.grantRead(this.searchProductsFunction.function, 'catalog/*');
+
+    // Lambda function para obtener varios productos en una llamada (BatchGetItem)
+    this.getProductsBatchFunction = new SportShopLambda(this, 'GetProductsBatchLambda', {
+      functionName: `${env.prefix}-get-products-batch`,
+      code: Code.fromAsset('lambda-functions/get-products-batch'),
+      layers: [this.commonLayer],
+      environment: {
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        'MAX_BATCH_PRODUCTS': '100'
+      }
+    });
+
+    // Dar permisos a Lambda para leer DynamoDB
+    props.productsTable.grantReadData(this.getProductsBatchFunction.function);
 
     // Lambda function para agregar productos al carrito (requiere autenticación)
     this.addToCartFunction = new SportShopLambda(this, 'AddToCartLambda', {
       functionName: `${env.prefix}-add-to-cart`,
       code: Code.fromAsset('lambda-functions/add-to-cart'),
+      layers: [this.commonLayer],
       environment: {
         'PRODUCTS_TABLE': props.productsTable.tableName,
-        'CART_TABLE': props.cartTable.tableName
+        'CART_TABLE': props.cartTable.tableName,
+        'CART_HEADERS_TABLE': props.cartHeadersTable.tableName,
+        ...cartTtlEnvironment
       }
     });
 
     // Dar permisos a Lambda para leer productos y escribir en carrito
     props.productsTable.grantReadData(this.addToCartFunction.function);
     props.cartTable.grantReadWriteData(this.addToCartFunction.function);
+    props.cartHeadersTable.grantReadWriteData(this.addToCartFunction.function);
 
     // Lambda function para obtener carrito del usuario
     this.getCartFunction = new SportShopLambda(this, 'GetCartLambda', {
       functionName: `${env.prefix}-get-cart`,
       code: Code.fromAsset('lambda-functions/get-cart'),
+      layers: [this.commonLayer],
+      environment: {
+        'CART_TABLE': props.cartTable.tableName,
+        'CART_HEADERS_TABLE': props.cartHeadersTable.tableName,
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        ...cartTtlEnvironment
+      }
+    });
+
+    // Dar permisos a Lambda para leer carrito y renovar su TTL (y productos para ?enrich=true)
+    props.cartTable.grantReadWriteData(this.getCartFunction.function);
+    props.cartHeadersTable.grantReadWriteData(this.getCartFunction.function);
+    props.productsTable.grantReadData(this.getCartFunction.function);
+
+    // Lambda function para el resumen del carrito (lee solo la cabecera de totales)
+    this.getCartSummaryFunction = new SportShopLambda(this, 'GetCartSummaryLambda', {
+      functionName: `${env.prefix}-get-cart-summary`,
+      code: Code.fromAsset('lambda-functions/get-cart-summary'),
+      layers: [this.commonLayer],
       environment: {
-        'CART_TABLE': props.cartTable.tableName
+        'CART_TABLE': props.cartTable.tableName,
+        'CART_HEADERS_TABLE': props.cartHeadersTable.tableName,
+        ...cartTtlEnvironment
       }
     });
 
-    // Dar permisos a Lambda para leer carrito
-    props.cartTable.grantReadData(this.getCartFunction.function);
+    // Dar permisos para leer la cabecera (y recalcularla desde el carrito si falta o venció)
+    props.cartTable.grantReadData(this.getCartSummaryFunction.function);
+    props.cartHeadersTable.grantReadWriteData(this.getCartSummaryFunction.function);
 
     // Lambda function para eliminar productos del carrito
     this.removeFromCartFunction = new SportShopLambda(this, 'RemoveFromCartLambda', {
       functionName: `${env.prefix}-remove-from-cart`,
       code: Code.fromAsset('lambda-functions/remove-from-cart'),
+      layers: [this.commonLayer],
       environment: {
-        'CART_TABLE': props.cartTable.tableName
+        'CART_TABLE': props.cartTable.tableName,
+        'CART_HEADERS_TABLE': props.cartHeadersTable.tableName,
+        ...cartTtlEnvironment
       }
     });
 
     // Dar permisos a Lambda para escribir en carrito
     props.cartTable.grantReadWriteData(this.removeFromCartFunction.function);
+    props.cartHeadersTable.grantReadWriteData(this.removeFromCartFunction.function);
 
     // Lambda function para actualizar cantidad en carrito
     this.updateCartQuantityFunction = new SportShopLambda(this, 'UpdateCartQuantityLambda', {
       functionName: `${env.prefix}-update-cart-quantity`,
       code: Code.fromAsset('lambda-functions/update-cart-quantity'),
+      layers: [this.commonLayer],
       environment: {
         'CART_TABLE': props.cartTable.tableName,
-        'PRODUCTS_TABLE': props.productsTable.tableName
+        'CART_HEADERS_TABLE': props.cartHeadersTable.tableName,
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        ...cartTtlEnvironment
       }
     });
 
     // Dar permisos a Lambda para leer productos y escribir en carrito
     props.productsTable.grantReadData(this.updateCartQuantityFunction.function);
     props.cartTable.grantReadWriteData(this.updateCartQuantityFunction.function);
+    props.cartHeadersTable.grantReadWriteData(this.updateCartQuantityFunction.function);
+
+    // Lambda function para sincronizar el carrito completo en una sola llamada
+    this.syncCartFunction = new SportShopLambda(this, 'SyncCartLambda', {
+      functionName: `${env.prefix}-sync-cart`,
+      code: Code.fromAsset('lambda-functions/sync-cart'),
+      layers: [this.commonLayer],
+      environment: {
+        'CART_TABLE': props.cartTable.tableName,
+        'CART_HEADERS_TABLE': props.cartHeadersTable.tableName,
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        'MAX_CART_LINES': '50',
+        ...cartTtlEnvironment
+      }
+    });
+
+    // Dar permisos a Lambda para leer productos y escribir en carrito
+    props.productsTable.grantReadData(this.syncCartFunction.function);
+    props.cartTable.grantReadWriteData(this.syncCartFunction.function);
+    props.cartHeadersTable.grantReadWriteData(this.syncCartFunction.function);
+
+    // Lambda programada que limpia carritos abandonados (vencidos por TTL o sin TTL)
+    this.compactCartsFunction = new SportShopLambda(this, 'CompactCartsLambda', {
+      functionName: `${env.prefix}-compact-carts`,
+      code: Code.fromAsset('lambda-functions/compact-carts'),
+      layers: [this.commonLayer],
+      timeout: Duration.seconds(300),
+      environment: {
+        'CART_TABLE': props.cartTable.tableName,
+        'CART_HEADERS_TABLE': props.cartHeadersTable.tableName,
+        ...cartTtlEnvironment
+      }
+    });
+
+    // Dar permisos para recorrer y limpiar el carrito
+    props.cartTable.grantReadWriteData(this.compactCartsFunction.function);
+    props.cartHeadersTable.grantReadWriteData(this.compactCartsFunction.function);
+
+    // Ejecutar el barrido una vez por día (03:00 hora de Bolivia)
+    new Rule(this, 'CompactCartsSchedule', {
+      ruleName: `${env.prefix}-compact-carts`,
+      schedule: Schedule.cron({ minute: '0', hour: '7' }),
+      targets: [new LambdaFunction(this.compactCartsFunction.function)]
+    });
 
     // === LAMBDAS DE PEDIDOS ===
     
@@ -144,58 +355,105 @@ export class ComputeStack extends Stack {
     this.createOrderFunction = new SportShopLambda(this, 'CreateOrderLambda', {
       functionName: `${env.prefix}-create-order`,
       code: Code.fromAsset('lambda-functions/create-order'),
+      layers: [this.commonLayer],
       environment: {
         'CART_TABLE': props.cartTable.tableName,
+        'CART_HEADERS_TABLE': props.cartHeadersTable.tableName,
         'ORDERS_TABLE': props.ordersTable.tableName,
-        'PRODUCTS_TABLE': props.productsTable.tableName
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        'META_TABLE': props.metaTable.tableName,
+        ...reservationEnvironment
       }
     });
 
-    // Dar permisos para leer carrito y productos, escribir pedidos
+    // Dar permisos para leer carrito, escribir pedidos y reservar stock
     props.cartTable.grantReadWriteData(this.createOrderFunction.function);
+    props.cartHeadersTable.grantReadWriteData(this.createOrderFunction.function);
     props.ordersTable.grantWriteData(this.createOrderFunction.function);
-    props.productsTable.grantReadData(this.createOrderFunction.function);
+    props.productsTable.grantReadWriteData(this.createOrderFunction.function);
+    // Versión de stock en Meta: vacía los caches del catálogo después de mover stock
+    props.metaTable.grantReadWriteData(this.createOrderFunction.function);
 
     // === LAMBDAS DE ADMIN ===
+
+    // Lambda function que genera el snapshot comprimido del catálogo en S3
+    // (invocada de forma asíncrona por create/update/delete-product)
+    this.generateCatalogSnapshotFunction = new SportShopLambda(this, 'GenerateCatalogSnapshotLambda', {
+      functionName: `${env.prefix}-generate-catalog-snapshot`,
+      code: Code.fromAsset('lambda-functions/generate-catalog-snapshot'),
+      layers: [this.commonLayer],
+      timeout: Duration.seconds(120),
+      memorySize: 512,
+      environment: {
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        'META_TABLE': props.metaTable.tableName,
+        'IMAGES_BUCKET': props.imagesBucket.bucketName
+      }
+    });
+
+    // Dar permisos para leer productos, escribir el snapshot y etiquetar versiones reemplazadas
+    // (grantReadWrite incluye s3:PutObjectTagging y s3:ListBucket)
+    props.productsTable.grantReadData(this.generateCatalogSnapshotFunction.function);
+    props.metaTable.grantReadData(this.generateCatalogSnapshotFunction.function);
+    props.imagesBucket.grantReadWrite(this.generateCatalogSnapshotFunction.function, 'catalog/*');
     
     // Lambda function para crear productos (admin)
     this.createProductFunction = new SportShopLambda(this, 'CreateProductLambda', {
       functionName: `${env.prefix}-create-product`,
       code: Code.fromAsset('lambda-functions/create-product'),
+      layers: [this.commonLayer],
       environment: {
         'PRODUCTS_TABLE': props.productsTable.tableName,
+        'META_TABLE': props.metaTable.tableName,
+        'SNAPSHOT_FUNCTION_NAME': this.generateCatalogSnapshotFunction.function.functionName,
         'FORCE_UPDATE': 'v3' // Force CDK to detect changes
       }
     });
 
-    // Dar permisos para leer y escribir productos
+    // Dar permisos para leer y escribir productos (y versión del catálogo)
     props.productsTable.grantReadWriteData(this.createProductFunction.function);
+    props.metaTable.grantReadWriteData(this.createProductFunction.function);
+    this.generateCatalogSnapshotFunction.function.grantInvoke(this.createProductFunction.function);
 
     // Lambda function para actualizar productos (admin)
     this.updateProductFunction = new SportShopLambda(this, 'UpdateProductLambda', {
       functionName: `${env.prefix}-update-product`,
       code: Code.fromAsset('lambda-functions/update-product'),
+      layers: [this.commonLayer],
       environment: {
-        'PRODUCTS_TABLE': props.productsTable.tableName
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        'META_TABLE': props.metaTable.tableName,
+        'SNAPSHOT_FUNCTION_NAME': this.generateCatalogSnapshotFunction.function.functionName
       }
     });
 
-    // Dar permisos para leer y escribir productos
+    // Dar permisos para leer y escribir productos (y versión del catálogo)
     props.productsTable.grantReadWriteData(this.updateProductFunction.function);
+    props.metaTable.grantReadWriteData(this.updateProductFunction.function);
+    this.generateCatalogSnapshotFunction.function.grantInvoke(this.updateProductFunction.function);
 
     // Lambda function para eliminar productos (admin)
     this.deleteProductFunction = new SportShopLambda(this, 'DeleteProductLambda', {
       functionName: `${env.prefix}-delete-product`,
       code: Code.fromAsset('lambda-functions/delete-product'),
+      layers: [this.commonLayer],
       environment: {
         'PRODUCTS_TABLE': props.productsTable.tableName,
-        'CART_TABLE': props.cartTable.tableName
+        'CART_TABLE': props.cartTable.tableName,
+        'CART_HEADERS_TABLE': props.cartHeadersTable.tableName,
+        'CART_PRODUCT_INDEX': DYNAMODB_INDEXES.cartByProduct,
+        'META_TABLE': props.metaTable.tableName,
+        'SNAPSHOT_FUNCTION_NAME': this.generateCatalogSnapshotFunction.function.functionName,
+        ...cartTtlEnvironment
       }
     });
 
-    // Dar permisos para leer y escribir productos y carrito
+    // Dar permisos para leer y escribir productos y carrito (y versión del catálogo)
     props.productsTable.grantReadWriteData(this.deleteProductFunction.function);
     props.cartTable.grantReadWriteData(this.deleteProductFunction.function);
+    props.cartHeadersTable.grantReadWriteData(this.deleteProductFunction.function);
+    props.metaTable.grantReadWriteData(this.deleteProductFunction.function);
+    this.generateCatalogSnapshotFunction.function.grantInvoke(this.deleteProductFunction.function);
 
     // === LAMBDA PARA UPLOAD DE IMÁGENES ===
     
@@ -203,6 +461,7 @@ export class ComputeStack extends Stack {
     this.generateUploadUrlFunction = new SportShopLambda(this, 'GenerateUploadUrlLambda', {
       functionName: `${env.prefix}-generate-upload-url`,
       code: Code.fromAsset('lambda-functions/generate-upload-url'),
+      layers: [this.commonLayer],
       environment: {
         'IMAGES_BUCKET': props.imagesBucket.bucketName,
         'PRODUCT_IMAGES_BUCKET': props.imagesBucket.bucketName
@@ -218,10 +477,13 @@ export class ComputeStack extends Stack {
     this.completeOrderFunction = new SportShopLambda(this, 'CompleteOrderLambda', {
       functionName: `${env.prefix}-complete-order`,
       code: Code.fromAsset('lambda-functions/complete-order'),
+      layers: [this.commonLayer],
       environment: {
         'ORDERS_TABLE': props.ordersTable.tableName,
         'SALES_TABLE': props.salesTable.tableName,
-        'PRODUCTS_TABLE': props.productsTable.tableName
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        'META_TABLE': props.metaTable.tableName,
+        ...reservationEnvironment
       }
     });
 
@@ -229,18 +491,54 @@ export class ComputeStack extends Stack {
     props.ordersTable.grantReadWriteData(this.completeOrderFunction.function);
     props.salesTable.grantWriteData(this.completeOrderFunction.function);
     props.productsTable.grantReadWriteData(this.completeOrderFunction.function);
+    props.metaTable.grantReadWriteData(this.completeOrderFunction.function);
 
-    // Lambda function para cancelar pedido (admin) - Elimina pedido sin afectar stock
+    // Lambda function para cancelar pedido (admin) - Elimina pedido y libera su reserva de stock
     this.cancelOrderFunction = new SportShopLambda(this, 'CancelOrderLambda', {
       functionName: `${env.prefix}-cancel-order`,
       code: Code.fromAsset('lambda-functions/cancel-order'),
+      layers: [this.commonLayer],
       environment: {
-        'ORDERS_TABLE': props.ordersTable.tableName
+        'ORDERS_TABLE': props.ordersTable.tableName,
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        'META_TABLE': props.metaTable.tableName,
+        ...reservationEnvironment
       }
     });
 
-    // Dar permisos para leer/escribir pedidos
+    // Dar permisos para leer/escribir pedidos y devolver stock reservado
     props.ordersTable.grantReadWriteData(this.cancelOrderFunction.function);
+    props.productsTable.grantReadWriteData(this.cancelOrderFunction.function);
+    props.metaTable.grantReadWriteData(this.cancelOrderFunction.function);
+
+    // Lambda programada que libera reservas de pedidos pendientes vencidos
+    this.releaseReservationsFunction = new SportShopLambda(this, 'ReleaseReservationsLambda', {
+      functionName: `${env.prefix}-release-reservations`,
+      code: Code.fromAsset('lambda-functions/release-reservations'),
+      layers: [this.commonLayer],
+      timeout: Duration.seconds(120),
+      environment: {
+        'ORDERS_TABLE': props.ordersTable.tableName,
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        'META_TABLE': props.metaTable.tableName,
+        'STATUS_INDEX': DYNAMODB_INDEXES.ordersByStatus,
+        ...reservationEnvironment
+      }
+    });
+
+    // Dar permisos para consultar pedidos pendientes (tabla e índices), actualizarlos y devolver stock
+    props.ordersTable.grantReadWriteData(this.releaseReservationsFunction.function);
+    props.productsTable.grantReadWriteData(this.releaseReservationsFunction.function);
+    props.metaTable.grantReadWriteData(this.releaseReservationsFunction.function);
+
+    // Revisar reservas vencidas cada hora (solo si el ambiente usa modo reserva)
+    if (env.stockReservation) {
+      new Rule(this, 'ReleaseReservationsSchedule', {
+        ruleName: `${env.prefix}-release-reservations`,
+        schedule: Schedule.rate(Duration.hours(1)),
+        targets: [new LambdaFunction(this.releaseReservationsFunction.function)]
+      });
+    }
 
     // === FUNCIONES ADICIONALES DE GESTIÓN DE PEDIDOS (ADMIN) ===
     
@@ -248,18 +546,23 @@ export class ComputeStack extends Stack {
     this.getAllOrdersFunction = new SportShopLambda(this, 'GetAllOrdersLambda', {
       functionName: `${env.prefix}-get-all-orders`,
       code: Code.fromAsset('lambda-functions/get-all-orders'),
+      layers: [this.commonLayer],
       environment: {
-        'ORDERS_TABLE': props.ordersTable.tableName
+        'ORDERS_TABLE': props.ordersTable.tableName,
+        'STATUS_INDEX': DYNAMODB_INDEXES.ordersByStatus,
+        ...paginationEnvironment
       }
     });
 
     // Dar permisos para leer pedidos
     props.ordersTable.grantReadData(this.getAllOrdersFunction.function);
+    cursorSecret.grantRead(this.getAllOrdersFunction.function);
 
     // Lambda function para obtener detalle de pedido específico (admin)
     this.getOrderDetailFunction = new SportShopLambda(this, 'GetOrderDetailLambda', {
       functionName: `${env.prefix}-get-order-detail`,
       code: Code.fromAsset('lambda-functions/get-order-detail'),
+      layers: [this.commonLayer],
       environment: {
         'ORDERS_TABLE': props.ordersTable.tableName
       }
@@ -268,12 +571,42 @@ export class ComputeStack extends Stack {
     // Dar permisos para leer pedidos
     props.ordersTable.grantReadData(this.getOrderDetailFunction.function);
 
+    // Lambda function para el historial de pedidos del cliente
+    this.getMyOrdersFunction = new SportShopLambda(this, 'GetMyOrdersLambda', {
+      functionName: `${env.prefix}-get-my-orders`,
+      code: Code.fromAsset('lambda-functions/get-my-orders'),
+      layers: [this.commonLayer],
+      environment: {
+        'ORDERS_TABLE': props.ordersTable.tableName,
+        'USER_INDEX': DYNAMODB_INDEXES.ordersByUser,
+        ...paginationEnvironment
+      }
+    });
+
+    // Dar permisos para leer pedidos (índice por usuario)
+    props.ordersTable.grantReadData(this.getMyOrdersFunction.function);
+    cursorSecret.grantRead(this.getMyOrdersFunction.function);
+
+    // Lambda function para el detalle de un pedido del cliente
+    this.getMyOrderDetailFunction = new SportShopLambda(this, 'GetMyOrderDetailLambda', {
+      functionName: `${env.prefix}-get-my-order-detail`,
+      code: Code.fromAsset('lambda-functions/get-my-order-detail'),
+      layers: [this.commonLayer],
+      environment: {
+        'ORDERS_TABLE': props.ordersTable.tableName
+      }
+    });
+
+    // Dar permisos para leer pedidos
+    props.ordersTable.grantReadData(this.getMyOrderDetailFunction.function);
+
     // === FUNCIONES DE SALES (ADMIN) ===
     
     // Lambda function para obtener todas las ventas (admin)
     this.getAllSalesFunction = new SportShopLambda(this, 'GetAllSalesLambda', {
       functionName: `${env.prefix}-get-all-sales`,
       code: Code.fromAsset('lambda-functions/get-all-sales'),
+      layers: [this.commonLayer],
       environment: {
         'SALES_TABLE': props.salesTable.tableName
       }
@@ -286,6 +619,7 @@ export class ComputeStack extends Stack {
     this.getSalesDetailFunction = new SportShopLambda(this, 'GetSalesDetailLambda', {
       functionName: `${env.prefix}-get-sales-detail`,
       code: Code.fromAsset('lambda-functions/get-sales-detail'),
+      layers: [this.commonLayer],
       environment: {
         'SALES_TABLE': props.salesTable.tableName
       }
@@ -298,6 +632,7 @@ export class ComputeStack extends Stack {
     this.updateSalesFunction = new SportShopLambda(this, 'UpdateSalesLambda', {
       functionName: `${env.prefix}-update-sales`,
       code: Code.fromAsset('lambda-functions/update-sales'),
+      layers: [this.commonLayer],
       environment: {
         'SALES_TABLE': props.salesTable.tableName,
         'PRODUCTS_TABLE': props.productsTable.tableName
@@ -312,20 +647,24 @@ export class ComputeStack extends Stack {
     this.cancelSaleFunction = new SportShopLambda(this, 'CancelSaleLambda', {
       functionName: `${env.prefix}-cancel-sale`,
       code: Code.fromAsset('lambda-functions/cancel-sale'),
+      layers: [this.commonLayer],
       environment: {
         'SALES_TABLE': props.salesTable.tableName,
-        'PRODUCTS_TABLE': props.productsTable.tableName
+        'PRODUCTS_TABLE': props.productsTable.tableName,
+        'META_TABLE': props.metaTable.tableName
       }
     });
 
     // Dar permisos para leer/escribir ventas y productos
     props.salesTable.grantReadWriteData(this.cancelSaleFunction.function);
     props.productsTable.grantReadWriteData(this.cancelSaleFunction.function);
+    props.metaTable.grantReadWriteData(this.cancelSaleFunction.function);
 
     // Lambda function para estadísticas de ventas (admin)
     this.getSalesStatisticsFunction = new SportShopLambda(this, 'GetSalesStatisticsLambda', {
       functionName: `${env.prefix}-get-sales-statistics`,
       code: Code.fromAsset('lambda-functions/get-sales-statistics'),
+      layers: [this.commonLayer],
       environment: {
         'SALES_TABLE': props.salesTable.tableName
       }
@@ -1,10 +1,10 @@
 // Imports básicos de CDK
 import { Stack, StackProps, Tags } from 'aws-cdk-lib';
-import { Table, AttributeType } from 'aws-cdk-lib/aws-dynamodb';
+import { Table, AttributeType, ProjectionType } from 'aws-cdk-lib/aws-dynamodb';
 import { Construct } from 'constructs';
 
 // Imports de nuestras configuraciones
-import { DYNAMODB_CONFIG } from '../config/constants';
+import { DYNAMODB_CONFIG, DYNAMODB_INDEXES } from '../config/constants';
 import { getEnvironment } from '../config/environments';
 
 // Interface para las props del stack (incluye el stage)
@@ -17,8 +17,10 @@ export class DataStack extends Stack {
   // Propiedades públicas para que otros stacks puedan usar las tablas
   public readonly productsTable: Table;
   public readonly cartTable: Table;
+  public readonly cartHeadersTable: Table;
   public readonly ordersTable: Table;
   public readonly salesTable: Table;
+  public readonly metaTable: Table;
 
   constructor(scope: Construct, id: string, props: DataStackProps) {
     super(scope, id, props);
@@ -34,12 +36,49 @@ export class DataStack extends Stack {
       billingMode: DYNAMODB_CONFIG.billingMode
     });
 
+    // Índices para filtrar productos con query en lugar de scan (ordenados por precio)
+    // Nota: CloudFormation crea un solo GSI por actualización de la tabla; category-index
+    // ya debe estar desplegado (ACTIVE) antes de desplegar gender-index
+    this.productsTable.addGlobalSecondaryIndex({
+      indexName: DYNAMODB_INDEXES.productsByCategory,
+      partitionKey: { name: 'category', type: AttributeType.STRING },
+      sortKey: { name: 'price', type: AttributeType.NUMBER }
+    });
+
+    this.productsTable.addGlobalSecondaryIndex({
+      indexName: DYNAMODB_INDEXES.productsByGender,
+      partitionKey: { name: 'gender', type: AttributeType.STRING },
+      sortKey: { name: 'price', type: AttributeType.NUMBER }
+    });
+
     // Tabla Cart con productId (sort key)
+    // expiresAt: TTL renovado en cada uso, los carritos abandonados se borran solos
     this.cartTable = new Table(this, 'CartTable', {
       tableName: `${env.prefix}-cart`,
       partitionKey: { name: 'userId', type: AttributeType.STRING },
       sortKey: { name: 'productId', type: AttributeType.STRING },
-      billingMode: DYNAMODB_CONFIG.billingMode
+      billingMode: DYNAMODB_CONFIG.billingMode,
+      timeToLiveAttribute: 'expiresAt'
+    });
+
+    // Índice inverso producto → carritos: eliminar o cambiar el precio de un producto
+    // consulta solo las filas afectadas en lugar de escanear todos los carritos
+    this.cartTable.addGlobalSecondaryIndex({
+      indexName: DYNAMODB_INDEXES.cartByProduct,
+      partitionKey: { name: 'productId', type: AttributeType.STRING },
+      sortKey: { name: 'userId', type: AttributeType.STRING },
+      projectionType: ProjectionType.INCLUDE,
+      nonKeyAttributes: ['quantity', 'productPrice']
+    });
+
+    // Tabla CartHeaders: totales de cada carrito (badge), una fila por usuario
+    // Va aparte de Cart para no quedar en cartByProduct: todas las cabeceras caerían
+    // en la misma partición del índice (productId = #HEADER)
+    this.cartHeadersTable = new Table(this, 'CartHeadersTable', {
+      tableName: `${env.prefix}-cart-headers`,
+      partitionKey: { name: 'userId', type: AttributeType.STRING },
+      billingMode: DYNAMODB_CONFIG.billingMode,
+      timeToLiveAttribute: 'expiresAt'
     });
 
     // Tabla Orders con timestamp (sort key)
@@ -50,6 +89,24 @@ export class DataStack extends Stack {
       billingMode: DYNAMODB_CONFIG.billingMode
     });
 
+    // Índice por estado y fecha: el panel admin lista pedidos (p. ej. pendientes, más
+    // recientes primero) con query paginada en lugar de escanear todo el historial
+    this.ordersTable.addGlobalSecondaryIndex({
+      indexName: DYNAMODB_INDEXES.ordersByStatus,
+      partitionKey: { name: 'status', type: AttributeType.STRING },
+      sortKey: { name: 'createdAt', type: AttributeType.STRING }
+    });
+
+    // Historial de pedidos de cada cliente: solo proyecta lo que muestra la lista
+    // (el detalle se lee por clave de la tabla al abrir un pedido)
+    this.ordersTable.addGlobalSecondaryIndex({
+      indexName: DYNAMODB_INDEXES.ordersByUser,
+      partitionKey: { name: 'userId', type: AttributeType.STRING },
+      sortKey: { name: 'createdAt', type: AttributeType.STRING },
+      projectionType: ProjectionType.INCLUDE,
+      nonKeyAttributes: ['status', 'summary']
+    });
+
     // Tabla Sales (pedidos completados/vendidos) con timestamp (sort key)
     this.salesTable = new Table(this, 'SalesTable', {
       tableName: `${env.prefix}-sales`,
@@ -58,6 +115,13 @@ export class DataStack extends Stack {
       billingMode: DYNAMODB_CONFIG.billingMode
     });
 
+    // Tabla Meta: contadores y versiones (p. ej. versión del catálogo para invalidar caches)
+    this.metaTable = new Table(this, 'MetaTable', {
+      tableName: `${env.prefix}-meta`,
+      partitionKey: { name: 'pk', type: AttributeType.STRING },
+      billingMode: DYNAMODB_CONFIG.billingMode
+    });
+
     // Aplicar tags para control de costos
     Object.entries(env.tags).forEach(([key, value]) => {
       Tags.of(this).add(key, value);
@@ -53,6 +53,16 @@ export class StorageStack extends Stack {
           id: 'DeleteIncompleteMultipartUploads',
           abortIncompleteMultipartUploadAfter: Duration.days(1),
           enabled: true
+        },
+        {
+          // Snapshots versionados del catálogo: solo expiran las versiones reemplazadas.
+          // publish_snapshot etiqueta la versión anterior al publicar una nueva; la
+          // vigente nunca lleva la etiqueta (latest.json siempre apunta a objetos existentes)
+          id: 'ExpireOldCatalogSnapshots',
+          prefix: 'catalog/v',
+          tagFilters: { 'catalog-snapshot': 'superseded' },
+          expiration: Duration.days(7),
+          enabled: true
         }
       ],
       
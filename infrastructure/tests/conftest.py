@@ -0,0 +1,181 @@
+"""
+Fixtures compartidas para las pruebas de las Lambdas (DynamoDB/S3 simulados con moto)
+
+Cada prueba recibe tablas nuevas con los mismos índices que define data-stack.ts y
+carga los handlers desde lambda-functions/<nombre>/index.py, igual que Lambda con
+la capa common en el path.
+
+Uso:
+    pip install -r tests/requirements.txt
+    python -m pytest tests
+"""
+import importlib.util
+import json
+import os
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+import boto3
+import pytest
+from moto import mock_aws
+
+LAMBDA_ROOT = Path(__file__).resolve().parent.parent / 'lambda-functions'
+
+# Variables que CDK configura en cada Lambda (antes de importar la capa common)
+os.environ.update({
+    'AWS_DEFAULT_REGION': 'us-east-1',
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+    'PRODUCTS_TABLE': 'products',
+    'CART_TABLE': 'cart',
+    'CART_HEADERS_TABLE': 'cart-headers',
+    'ORDERS_TABLE': 'orders',
+    'SALES_TABLE': 'sales',
+    'META_TABLE': 'meta',
+    'IMAGES_BUCKET': 'images',
+    'CURSOR_SECRET': 'test-cursor-secret',
+    'CATEGORY_INDEX': 'category-index',
+    'GENDER_INDEX': 'gender-index',
+    'CART_PRODUCT_INDEX': 'productId-index',
+    'STATUS_INDEX': 'status-createdAt-index',
+    'USER_INDEX': 'userId-createdAt-index'
+})
+sys.path.insert(0, str(LAMBDA_ROOT / 'layers' / 'common' / 'python'))
+
+CATEGORIES = ('camisetas', 'zapatillas', 'shorts')
+GENDERS = ('hombre', 'mujer', 'unisex')
+
+
+def _index(name, partition_key, sort_key=None, projection=None):
+    key_schema = [{'AttributeName': partition_key[0], 'KeyType': 'HASH'}]
+    if sort_key:
+        key_schema.append({'AttributeName': sort_key[0], 'KeyType': 'RANGE'})
+    return {
+        'IndexName': name,
+        'KeySchema': key_schema,
+        'Projection': projection or {'ProjectionType': 'ALL'}
+    }
+
+
+def _create_table(client, name, partition_key, sort_key=None, indexes=()):
+    attributes = {partition_key[0]: partition_key[1]}
+    key_schema = [{'AttributeName': partition_key[0], 'KeyType': 'HASH'}]
+    if sort_key:
+        attributes[sort_key[0]] = sort_key[1]
+        key_schema.append({'AttributeName': sort_key[0], 'KeyType': 'RANGE'})
+
+    params = {'TableName': name, 'KeySchema': key_schema, 'BillingMode': 'PAY_PER_REQUEST'}
+    if indexes:
+        params['GlobalSecondaryIndexes'] = []
+        for index_name, index_pk, index_sk, projection in indexes:
+            for attribute in filter(None, (index_pk, index_sk)):
+                attributes.setdefault(attribute[0], attribute[1])
+            params['GlobalSecondaryIndexes'].append(_index(index_name, index_pk, index_sk, projection))
+
+    params['AttributeDefinitions'] = [
+        {'AttributeName': attribute, 'AttributeType': attribute_type}
+        for attribute, attribute_type in attributes.items()
+    ]
+    client.create_table(**params)
+
+
+@pytest.fixture
+def aws():
+    """Tablas (con los GSIs de data-stack.ts) y bucket vacíos para cada prueba"""
+    with mock_aws():
+        client = boto3.client('dynamodb')
+        _create_table(client, 'products', ('id', 'S'), ('category', 'S'), [
+            ('category-index', ('category', 'S'), ('price', 'N'), None),
+            ('gender-index', ('gender', 'S'), ('price', 'N'), None)
+        ])
+        _create_table(client, 'cart', ('userId', 'S'), ('productId', 'S'), [
+            ('productId-index', ('productId', 'S'), ('userId', 'S'),
+             {'ProjectionType': 'INCLUDE', 'NonKeyAttributes': ['quantity', 'productPrice']})
+        ])
+        _create_table(client, 'cart-headers', ('userId', 'S'))
+        _create_table(client, 'orders', ('orderId', 'S'), ('createdAt', 'S'), [
+            ('status-createdAt-index', ('status', 'S'), ('createdAt', 'S'), None),
+            ('userId-createdAt-index', ('userId', 'S'), ('createdAt', 'S'),
+             {'ProjectionType': 'INCLUDE', 'NonKeyAttributes': ['status', 'summary']})
+        ])
+        _create_table(client, 'sales', ('saleId', 'S'), ('completedAt', 'S'))
+        _create_table(client, 'meta', ('pk', 'S'))
+        boto3.client('s3').create_bucket(Bucket='images')
+        yield boto3.resource('dynamodb')
+
+
+@pytest.fixture
+def tables(aws):
+    return {name: aws.Table(name) for name in ('products', 'cart', 'cart-headers', 'orders', 'sales', 'meta')}
+
+
+_loaded = 0
+
+
+def load_handler(name):
+    """Importa lambda-functions/<name>/index.py como módulo nuevo (dentro del mock)"""
+    global _loaded
+    _loaded += 1
+    spec = importlib.util.spec_from_file_location(f'handler_{_loaded}_{name.replace("-", "_")}',
+                                                  LAMBDA_ROOT / name / 'index.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def handler(aws):
+    """handler('add-to-cart') -> módulo del handler (cargado una vez por prueba)"""
+    cache = {}
+
+    def get(name):
+        if name not in cache:
+            cache[name] = load_handler(name)
+        return cache[name]
+    return get
+
+
+@pytest.fixture
+def invoke(handler):
+    """
+    Invoca un handler con un evento de API Gateway + Cognito
+    Returns: (statusCode, body JSON)
+    """
+    def call(name, body=None, path=None, query=None, user='user-1', admin=False):
+        claims = {'sub': user, 'email': f'{user}@example.com'}
+        if admin:
+            claims['cognito:groups'] = ['admin']
+        event = {
+            'queryStringParameters': query,
+            'pathParameters': path or {},
+            'headers': {},
+            'requestContext': {'authorizer': {'claims': claims}}
+        }
+        if body is not None:
+            event['body'] = json.dumps(body)
+        response = handler(name).handler(event, None)
+        return response['statusCode'], json.loads(response['body'])
+    return call
+
+
+@pytest.fixture
+def seed_products(tables):
+    """Crea productos P000..P0nn (precio 10 + 5·i, stock configurable)"""
+    def seed(count, stock=10):
+        products = []
+        for i in range(count):
+            product = {
+                'id': f'P{i:03d}',
+                'category': CATEGORIES[i % len(CATEGORIES)],
+                'gender': GENDERS[i % len(GENDERS)],
+                'name': f'Producto {i}',
+                'price': Decimal(10 + 5 * i),
+                'stock': stock,
+                'isActive': True,
+                'createdAt': f'2024-01-{i % 28 + 1:02d}T00:00:00'
+            }
+            tables['products'].put_item(Item=product)
+            products.append(product)
+        return products
+    return seed
@@ -0,0 +1,284 @@
+"""
+Cabecera de totales del carrito (tabla cart-headers): cada mutación aplica su delta
+y la cabecera siempre coincide con los totales recalculados desde las líneas
+"""
+from decimal import Decimal
+
+import pytest
+
+from cart_store import apply_header_delta, load_cart, summarize_cart
+
+
+def _header(tables, user='user-1'):
+    return tables['cart-headers'].get_item(Key={'userId': user}).get('Item')
+
+
+def _assert_header_matches_lines(tables, user='user-1'):
+    lines, header = load_cart(tables['cart'], user), _header(tables, user)
+    summary, _ = summarize_cart(lines)
+    assert header is not None
+    assert int(header['totalItems']) == summary['totalItems']
+    assert int(header['totalQuantity']) == summary['totalQuantity']
+    assert Decimal(str(header['totalPrice'])) == Decimal(str(summary['totalPrice']))
+    return summary
+
+
+@pytest.fixture
+def products(seed_products):
+    return seed_products(6, stock=10)
+
+
+def _add(invoke, product, quantity, user='user-1'):
+    return invoke('add-to-cart', body={'productId': product['id'], 'quantity': quantity}, user=user)
+
+
+def test_summary_rebuilds_missing_header(invoke, tables, products):
+    _add(invoke, products[0], 2)
+    assert _header(tables) is None
+
+    status, body = invoke('get-cart-summary')
+    assert status == 200
+    assert body['summary']['totalQuantity'] == 2
+    _assert_header_matches_lines(tables)
+
+
+def test_mutations_apply_header_deltas(invoke, tables, products):
+    status, body = _add(invoke, products[0], 2)
+    assert status == 201
+    invoke('get-cart-summary')
+
+    _add(invoke, products[0], 1)
+    _add(invoke, products[1], 3)
+    assert _assert_header_matches_lines(tables)['totalQuantity'] == 6
+
+    status, _ = invoke('update-cart-quantity', path={'productId': products[1]['id']}, body={'quantity': 1})
+    assert status == 200
+    assert _assert_header_matches_lines(tables)['totalQuantity'] == 4
+
+    status, _ = invoke('remove-from-cart', path={'productId': products[0]['id']})
+    assert status == 200
+    summary = _assert_header_matches_lines(tables)
+    assert (summary['totalItems'], summary['totalQuantity']) == (1, 1)
+
+
+def test_add_to_cart_keeps_integer_quantities(invoke, products):
+    status, body = _add(invoke, products[0], 2)
+    assert status == 201
+    assert body['cartItem']['quantity'] == 2
+    assert isinstance(body['cartItem']['quantity'], int)
+    assert isinstance(body['cartItem']['expiresAt'], int)
+
+
+def test_add_over_expired_row_starts_a_new_line(invoke, tables, products):
+    _add(invoke, products[0], 7)
+    invoke('get-cart-summary')
+    # Vencida pero todavía no borrada por el TTL de DynamoDB
+    tables['cart'].update_item(
+        Key={'userId': 'user-1', 'productId': products[0]['id']},
+        UpdateExpression='SET expiresAt = :past',
+        ExpressionAttributeValues={':past': 1}
+    )
+    invoke('get-cart')
+
+    status, body = _add(invoke, products[0], 5)
+    assert status == 201, body
+    assert body['cartItem']['quantity'] == 5
+    summary = _assert_header_matches_lines(tables)
+    assert (summary['totalItems'], summary['totalQuantity']) == (1, 5)
+
+
+def test_add_refreshes_the_stored_price(invoke, tables, products):
+    _add(invoke, products[0], 2)
+    invoke('get-cart-summary')
+    tables['products'].update_item(
+        Key={'id': products[0]['id'], 'category': products[0]['category']},
+        UpdateExpression='SET price = :price',
+        ExpressionAttributeValues={':price': Decimal('99.5')}
+    )
+
+    status, body = _add(invoke, products[0], 1)
+    assert status == 200, body
+    row = tables['cart'].get_item(Key={'userId': 'user-1', 'productId': products[0]['id']})['Item']
+    assert row['productPrice'] == Decimal('99.5')
+    summary = _assert_header_matches_lines(tables)
+    assert summary['totalPrice'] == 298.5
+
+
+def test_rejected_add_leaves_header_untouched(invoke, tables, products):
+    _add(invoke, products[0], 8)
+    invoke('get-cart-summary')
+
+    status, body = _add(invoke, products[0], 5)
+    assert status == 400
+    assert body['currentInCart'] == 8
+    assert _assert_header_matches_lines(tables)['totalQuantity'] == 8
+
+
+def test_sync_cart_rewrites_header(invoke, tables, products):
+    _add(invoke, products[0], 1)
+    invoke('get-cart-summary')
+
+    status, body = invoke('sync-cart', body={'items': [
+        {'productId': products[2]['id'], 'quantity': 3},
+        {'productId': products[3]['id'], 'quantity': 1}
+    ]})
+    assert status == 200, body
+    summary = _assert_header_matches_lines(tables)
+    assert (summary['totalItems'], summary['totalQuantity']) == (2, 4)
+
+    status, _ = invoke('sync-cart', body={'operations': [
+        {'op': 'add', 'productId': products[2]['id'], 'quantity': 2},
+        {'op': 'remove', 'productId': products[3]['id']}
+    ]})
+    assert status == 200
+    assert _assert_header_matches_lines(tables)['totalQuantity'] == 5
+
+
+def _racing_reads(module, tables, monkeypatch, product, races):
+    """Cada lectura del carrito (hasta `races`) es seguida por un agregado de otra request"""
+    original = module.load_cart_with_header
+    calls = []
+
+    def racing_load(cart_table, header_table, user_id):
+        result = original(cart_table, header_table, user_id)
+        calls.append(1)
+        if len(calls) <= races:
+            cart_table.update_item(
+                Key={'userId': user_id, 'productId': product['id']},
+                UpdateExpression='ADD quantity :one SET updatedAt = :now',
+                ExpressionAttributeValues={':one': 1, ':now': f'concurrent-{len(calls)}'}
+            )
+            apply_header_delta(header_table, user_id, quantity=1, price=product['price'])
+        return result
+    monkeypatch.setattr(module, 'load_cart_with_header', racing_load)
+    return calls
+
+
+def test_sync_cart_retries_when_the_cart_changes_midway(invoke, handler, tables, products, monkeypatch):
+    _add(invoke, products[0], 1)
+    invoke('get-cart-summary')
+    calls = _racing_reads(handler('sync-cart'), tables, monkeypatch, products[0], races=1)
+
+    status, body = invoke('sync-cart', body={'operations': [
+        {'op': 'add', 'productId': products[0]['id'], 'quantity': 2}
+    ]})
+    assert status == 200, body
+    assert len(calls) == 2
+    # El agregado concurrente no se pierde: 1 + 1 (concurrente) + 2
+    row = tables['cart'].get_item(Key={'userId': 'user-1', 'productId': products[0]['id']})['Item']
+    assert row['quantity'] == 4
+    assert _assert_header_matches_lines(tables)['totalQuantity'] == 4
+
+
+def test_sync_cart_conflicts_after_retries(invoke, handler, tables, products, monkeypatch):
+    _add(invoke, products[0], 1)
+    invoke('get-cart-summary')
+    module = handler('sync-cart')
+    _racing_reads(module, tables, monkeypatch, products[0], races=module.SYNC_ATTEMPTS)
+
+    status, body = invoke('sync-cart', body={'items': [{'productId': products[1]['id'], 'quantity': 1}]})
+    assert status == 409, body
+    lines = load_cart(tables['cart'], 'user-1')
+    assert [line['productId'] for line in lines] == [products[0]['id']]
+
+
+def test_force_delete_product_updates_every_cart(invoke, tables, products):
+    for user in ('user-1', 'user-2'):
+        _add(invoke, products[0], 2, user=user)
+        _add(invoke, products[1], 1, user=user)
+        invoke('get-cart-summary', user=user)
+
+    status, _ = invoke('delete-product', path={'id': products[0]['id']}, admin=True)
+    assert status == 409
+
+    status, body = invoke('delete-product', path={'id': products[0]['id']}, query={'force': 'true'}, admin=True)
+    assert status == 200, body
+    for user in ('user-1', 'user-2'):
+        summary = _assert_header_matches_lines(tables, user)
+        assert (summary['totalItems'], summary['totalQuantity']) == (1, 1)
+
+
+def test_get_cart_repairs_drifted_header(invoke, tables, products):
+    _add(invoke, products[0], 2)
+    invoke('get-cart-summary')
+    tables['cart-headers'].update_item(
+        Key={'userId': 'user-1'},
+        UpdateExpression='SET totalQuantity = :wrong',
+        ExpressionAttributeValues={':wrong': 99}
+    )
+
+    status, _ = invoke('get-cart')
+    assert status == 200
+    assert _assert_header_matches_lines(tables)['totalQuantity'] == 2
+
+
+def _expire(tables, product, user='user-1'):
+    tables['cart'].update_item(
+        Key={'userId': user, 'productId': product['id']},
+        UpdateExpression='SET expiresAt = :past',
+        ExpressionAttributeValues={':past': 1}
+    )
+
+
+def test_compaction_discounts_only_rows_it_deleted(handler, invoke, tables, products, monkeypatch):
+    _add(invoke, products[0], 2)
+    _add(invoke, products[1], 3)
+    _add(invoke, products[2], 4)
+    invoke('get-cart-summary')
+    _expire(tables, products[0])
+    _expire(tables, products[1])
+
+    module = handler('compact-carts')
+    original_fetch = module.fetch_page
+
+    def racing_fetch(*args, **kwargs):
+        rows, start_key = original_fetch(*args, **kwargs)
+        # products[1] se vuelve a agregar entre el scan y el borrado
+        tables['cart'].update_item(
+            Key={'userId': 'user-1', 'productId': products[1]['id']},
+            UpdateExpression='SET expiresAt = :future',
+            ExpressionAttributeValues={':future': 2 ** 40}
+        )
+        return rows, start_key
+    monkeypatch.setattr(module, 'fetch_page', racing_fetch)
+
+    report = module.handler({}, None)
+    assert (report['deletedRows'], report['skippedRows']) == (1, 1)
+    remaining = {line['productId'] for line in load_cart(tables['cart'], 'user-1')}
+    assert remaining == {products[1]['id'], products[2]['id']}
+    assert _assert_header_matches_lines(tables)['totalQuantity'] == 7
+
+
+def test_summary_of_an_empty_cart_writes_nothing(invoke, tables, products):
+    status, body = invoke('get-cart-summary')
+    assert status == 200
+    assert body['summary']['isEmpty'] is True
+    assert _header(tables) is None
+
+
+def test_summary_recounts_after_lines_expire(invoke, tables, products):
+    _add(invoke, products[0], 2)
+    _add(invoke, products[1], 3)
+    invoke('get-cart-summary')
+    # DynamoDB borra la línea por TTL: nadie descuenta de la cabecera
+    tables['cart'].delete_item(Key={'userId': 'user-1', 'productId': products[0]['id']})
+    tables['cart-headers'].update_item(
+        Key={'userId': 'user-1'},
+        UpdateExpression='SET linesExpireAt = :past',
+        ExpressionAttributeValues={':past': 1}
+    )
+
+    status, body = invoke('get-cart-summary')
+    assert status == 200
+    assert body['rebuilt'] is True
+    assert body['summary']['totalQuantity'] == 3
+    _assert_header_matches_lines(tables)
+
+
+def test_headers_stay_out_of_the_product_index(invoke, tables, products):
+    for user in ('user-1', 'user-2'):
+        _add(invoke, products[0], 1, user=user)
+        invoke('get-cart-summary', user=user)
+
+    rows = tables['cart'].scan(IndexName='productId-index')['Items']
+    assert {row['productId'] for row in rows} == {products[0]['id']}
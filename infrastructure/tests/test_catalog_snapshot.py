@@ -0,0 +1,102 @@
+"""
+Snapshots versionados del catálogo en S3: solo las versiones reemplazadas quedan
+etiquetadas para que las expire la regla de ciclo de vida del bucket
+"""
+import boto3
+import pytest
+
+import catalog_cache
+import catalog_snapshot
+
+
+@pytest.fixture
+def s3(aws):
+    return boto3.client('s3')
+
+
+def _tags_by_version(s3):
+    """{versión: set de etiquetas de sus objetos}"""
+    tags = {}
+    for obj in s3.list_objects_v2(Bucket='images', Prefix='catalog/v')['Contents']:
+        version = obj['Key'].split('/')[1]
+        tag_set = s3.get_object_tagging(Bucket='images', Key=obj['Key'])['TagSet']
+        tags.setdefault(version, set()).update((tag['Key'], tag['Value']) for tag in tag_set)
+    return tags
+
+
+SUPERSEDED = ('catalog-snapshot', 'superseded')
+
+
+def test_publishing_marks_only_the_replaced_version(tables, s3, seed_products):
+    seed_products(4)
+    catalog_snapshot.publish_snapshot(tables['products'], s3, 'images', 1)
+    assert _tags_by_version(s3) == {'v1': set()}
+
+    manifest = catalog_snapshot.publish_snapshot(tables['products'], s3, 'images', 2)
+    assert catalog_snapshot.read_manifest(s3, 'images')['version'] == 2
+    assert _tags_by_version(s3) == {'v1': {SUPERSEDED}, 'v2': set()}
+
+    # Todo lo que referencia el manifiesto vigente sigue sin etiqueta
+    live_keys = [manifest['keys']['all'], *manifest['shards'].values()]
+    for key in live_keys:
+        assert s3.get_object_tagging(Bucket='images', Key=key)['TagSet'] == []
+
+
+def test_out_of_order_publish_marks_itself(tables, s3, seed_products):
+    seed_products(2)
+    catalog_snapshot.publish_snapshot(tables['products'], s3, 'images', 5)
+
+    current = catalog_snapshot.publish_snapshot(tables['products'], s3, 'images', 4)
+    assert current['version'] == 5
+    assert _tags_by_version(s3) == {'v4': {SUPERSEDED}, 'v5': set()}
+
+
+def test_republishing_the_same_version_keeps_it_live(tables, s3, seed_products):
+    seed_products(2)
+    catalog_snapshot.publish_snapshot(tables['products'], s3, 'images', 3)
+    catalog_snapshot.publish_snapshot(tables['products'], s3, 'images', 3)
+    assert _tags_by_version(s3) == {'v3': set()}
+
+
+def test_snapshot_leaves_out_stock_and_private_fields(tables, s3, seed_products):
+    products = seed_products(3)
+    tables['products'].update_item(
+        Key={'id': products[0]['id'], 'category': products[0]['category']},
+        UpdateExpression='SET createdBy = :admin, reserved = :reserved',
+        ExpressionAttributeValues={':admin': 'admin-1', ':reserved': 2}
+    )
+    manifest = catalog_snapshot.publish_snapshot(tables['products'], s3, 'images', 1)
+
+    published = catalog_snapshot.read_snapshot_products(s3, 'images', manifest)
+    assert len(published) == 3
+    for product in published:
+        assert not {'stock', 'reserved', 'createdBy', 'updatedBy'} & set(product)
+
+
+def test_search_results_leave_out_stock(invoke, tables, seed_products):
+    seed_products(3)
+    status, body = invoke('search-products', query={'q': 'producto'})
+    assert status == 200
+    assert body['count'] == 3
+    assert all('stock' not in product for product in body['products'])
+
+
+def test_expired_search_index_is_reused_while_the_version_holds(invoke, handler, tables, seed_products):
+    seed_products(3)
+    module = handler('search-products')
+    builds = []
+    original_build = module.build_search_index
+
+    def counting_build():
+        builds.append(1)
+        return original_build()
+    module.build_search_index = counting_build
+    module.catalog_cache.ttl_seconds = 0
+
+    invoke('search-products', query={'q': 'producto'})
+    invoke('search-products', query={'q': 'producto'})
+    assert len(builds) == 1
+
+    catalog_cache.bump_catalog_version(tables['meta'])
+    invoke('search-products', query={'q': 'producto'})
+    assert len(builds) == 2
@@ -0,0 +1,103 @@
+"""
+Listado admin de pedidos (get-all-orders) sobre el índice status + createdAt
+"""
+import pytest
+
+
+def _put(tables, number, status, created_at=None):
+    tables['orders'].put_item(Item={
+        'orderId': f'ORD-{number}',
+        'createdAt': created_at or f'2024-03-{number // 24 + 1:02d}T{number % 24:02d}:00:00.000000',
+        'userId': 'user-1',
+        'status': status,
+        'items': [],
+        'summary': {}
+    })
+
+
+def _walk(invoke, query):
+    """Recorre todas las páginas siguiendo nextCursor"""
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = dict(query)
+        if cursor:
+            params['cursor'] = cursor
+        status, body = invoke('get-all-orders', query=params, admin=True)
+        assert status == 200, body
+        assert body['count'] <= int(query['limit'])
+        seen.extend(order['orderId'] for order in body['orders'])
+        pages += 1
+        cursor = body['nextCursor']
+        if not cursor:
+            return seen, pages
+
+
+@pytest.mark.parametrize('query', [{'limit': '2', 'status': 'pending'}, {'limit': '2'}])
+def test_single_status_pages_lose_nothing(invoke, tables, query):
+    for number in range(5):
+        _put(tables, number, 'pending')
+
+    seen, pages = _walk(invoke, query)
+    assert seen == ['ORD-4', 'ORD-3', 'ORD-2', 'ORD-1', 'ORD-0']
+    assert pages == 3
+
+
+def test_mixed_statuses_merge_newest_first(invoke, tables):
+    statuses = ('pending', 'completed', 'expired')
+    for number in range(17):
+        _put(tables, number, statuses[number % 7 % 3])
+
+    seen, _ = _walk(invoke, {'limit': '4'})
+    assert seen == [f'ORD-{number}' for number in range(16, -1, -1)]
+
+    seen, _ = _walk(invoke, {'limit': '3', 'status': 'completed'})
+    assert seen == [f'ORD-{n}' for n in range(16, -1, -1) if statuses[n % 7 % 3] == 'completed']
+
+
+def test_orders_in_the_same_instant_are_not_skipped(invoke, tables):
+    for number in range(4):
+        _put(tables, number, 'pending', created_at='2024-03-01T10:00:00.000000')
+    _put(tables, 9, 'pending', created_at='2024-03-01T09:00:00.000000')
+
+    seen, _ = _walk(invoke, {'limit': '1'})
+    assert sorted(seen) == ['ORD-0', 'ORD-1', 'ORD-2', 'ORD-3', 'ORD-9']
+    assert seen[-1] == 'ORD-9'
+
+
+@pytest.fixture
+def unordered_ties(handler, monkeypatch):
+    """El índice no ordena los pedidos de un mismo createdAt: cada página los devuelve al revés de orderId"""
+    module = handler('get-all-orders')
+    original = module.orders_table.query
+
+    def query(**kwargs):
+        response = original(**kwargs)
+        response['Items'].sort(key=lambda o: (o['createdAt'], [-ord(c) for c in o['orderId']]), reverse=True)
+        return response
+    monkeypatch.setattr(module.orders_table, 'query', query)
+
+
+@pytest.mark.parametrize('limit', ['1', '2', '3'])
+def test_ties_across_statuses_merge_in_cursor_order(invoke, tables, unordered_ties, limit):
+    statuses = ('pending', 'completed', 'expired')
+    for number in range(12):
+        _put(tables, number, statuses[number % 3], created_at='2024-03-01T10:00:00.000000')
+    _put(tables, 20, 'pending', created_at='2024-03-01T09:00:00.000000')
+
+    seen, _ = _walk(invoke, {'limit': limit})
+    assert seen == sorted((f'ORD-{n}' for n in range(12)), reverse=True) + ['ORD-20']
+
+
+def test_date_range_is_inclusive_by_day(invoke, tables):
+    for number in range(24 * 4):
+        _put(tables, number, 'pending')
+
+    seen, _ = _walk(invoke, {'limit': '10', 'from': '2024-03-02', 'to': '2024-03-03'})
+    assert len(seen) == 48
+    assert seen[0] == 'ORD-71' and seen[-1] == 'ORD-24'
+
+
+@pytest.mark.parametrize('query', [{'status': 'bogus'}, {'from': 'yesterday'}, {'cursor': 'abc.def'}])
+def test_invalid_parameters(invoke, tables, query):
+    status, _ = invoke('get-all-orders', query=query, admin=True)
+    assert status == 400
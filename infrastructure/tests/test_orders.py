@@ -0,0 +1,272 @@
+"""
+Ciclo de vida de pedidos y ventas: create-order, complete-order, cancel-order y
+cancel-sale (transacciones y descuentos de stock condicionados)
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import ids
+
+
+def _stock(tables, product):
+    item = tables['products'].get_item(Key={'id': product['id'], 'category': product['category']})['Item']
+    return int(item['stock']), int(item.get('reserved', 0))
+
+
+def _place_order(invoke, lines, user='user-1'):
+    for product, quantity in lines:
+        status, _ = invoke('add-to-cart', body={'productId': product['id'], 'quantity': quantity}, user=user)
+        assert status in (200, 201)
+    status, body = invoke('create-order', body={}, user=user)
+    assert status == 201, body
+    return body['order']
+
+
+def _order(tables, order_id):
+    return ids.get_order(tables['orders'], order_id)
+
+
+def test_create_order_clears_cart_and_keeps_stock(invoke, tables, seed_products):
+    products = seed_products(3, stock=5)
+    order = _place_order(invoke, [(products[0], 2), (products[1], 1)])
+
+    assert ids.order_created_at(order['orderId']) == order['createdAt']
+    assert _order(tables, order['orderId'])['status'] == 'pending'
+    assert tables['cart'].scan()['Items'] == []
+    # Sin modo reserva el stock se descuenta al completar
+    assert _stock(tables, products[0]) == (5, 0)
+
+
+def test_complete_order_sells_stock_and_records_sale(invoke, tables, seed_products):
+    products = seed_products(2, stock=5)
+    order = _place_order(invoke, [(products[0], 2), (products[1], 3)])
+
+    status, body = invoke('complete-order', path={'orderId': order['orderId']}, admin=True)
+    assert status == 200, body
+
+    assert _stock(tables, products[0]) == (3, 0)
+    assert _stock(tables, products[1]) == (2, 0)
+    sale = ids.get_sale(tables['sales'], body['saleId'])
+    assert sale['originalOrderId'] == order['orderId']
+    assert sale['completedAt'] == body['completedAt']
+    assert _order(tables, order['orderId'])['status'] == 'completed'
+
+    # Completar dos veces no vuelve a descontar
+    status, _ = invoke('complete-order', path={'orderId': order['orderId']}, admin=True)
+    assert status == 400
+    assert _stock(tables, products[0]) == (3, 0)
+
+
+def test_complete_order_without_stock_changes_nothing(invoke, tables, seed_products):
+    products = seed_products(2, stock=5)
+    order = _place_order(invoke, [(products[0], 1), (products[1], 4)])
+    tables['products'].update_item(
+        Key={'id': products[1]['id'], 'category': products[1]['category']},
+        UpdateExpression='SET stock = :stock',
+        ExpressionAttributeValues={':stock': 2}
+    )
+
+    status, body = invoke('complete-order', path={'orderId': order['orderId']}, admin=True)
+    assert status == 409
+    assert body['insufficientStock'] == [products[1]['id']]
+
+    # La transacción no aplicó nada: ni stock, ni venta, ni estado
+    assert _stock(tables, products[0]) == (5, 0)
+    assert tables['sales'].scan()['Items'] == []
+    assert _order(tables, order['orderId'])['status'] == 'pending'
+
+
+def test_cancel_pending_order(invoke, tables, seed_products):
+    products = seed_products(1, stock=5)
+    order = _place_order(invoke, [(products[0], 2)])
+
+    status, body = invoke('cancel-order', path={'orderId': order['orderId']}, admin=True)
+    assert status == 200, body
+    assert _order(tables, order['orderId']) is None
+    assert _stock(tables, products[0]) == (5, 0)
+
+
+@pytest.fixture
+def reservation_mode(handler):
+    """Activa STOCK_RESERVATION en los handlers que lo leen al importar"""
+    handler('create-order').RESERVATION_ENABLED = True
+
+
+def test_reserved_order_holds_and_releases_stock(invoke, tables, seed_products, reservation_mode):
+    products = seed_products(1, stock=5)
+    order = _place_order(invoke, [(products[0], 2)])
+    assert order['stockReserved'] is True
+    assert _stock(tables, products[0]) == (3, 2)
+
+    status, body = invoke('cancel-order', path={'orderId': order['orderId']}, admin=True)
+    assert status == 200, body
+    assert body['stockReleased'] is True
+    assert _stock(tables, products[0]) == (5, 0)
+
+
+def test_reserved_order_consumes_reservation_on_completion(invoke, tables, seed_products, reservation_mode):
+    products = seed_products(1, stock=5)
+    order = _place_order(invoke, [(products[0], 2)])
+
+    status, _ = invoke('complete-order', path={'orderId': order['orderId']}, admin=True)
+    assert status == 200
+    assert _stock(tables, products[0]) == (3, 0)
+
+
+def test_reservation_fails_when_stock_runs_out(invoke, tables, seed_products, reservation_mode):
+    products = seed_products(1, stock=3)
+    # El segundo cliente agrega al carrito antes de que el primero reserve el stock
+    status, _ = invoke('add-to-cart', body={'productId': products[0]['id'], 'quantity': 2}, user='user-2')
+    assert status == 201
+    _place_order(invoke, [(products[0], 2)], user='user-1')
+
+    status, body = invoke('create-order', body={}, user='user-2')
+    assert status in (400, 409), body
+    assert _stock(tables, products[0]) == (1, 2)
+    assert len(tables['orders'].scan()['Items']) == 1
+
+
+def test_reservation_uses_the_resolved_product_category(invoke, tables, seed_products, reservation_mode):
+    products = seed_products(1, stock=5)
+    # Fila de carrito sin productCategory (p. ej. guardada antes de copiarla)
+    tables['cart'].put_item(Item={'userId': 'user-1', 'productId': products[0]['id'], 'quantity': 2,
+                                  'productPrice': products[0]['price'], 'productName': 'x'})
+
+    status, body = invoke('create-order', body={})
+    assert status == 201, body
+    assert body['order']['items'][0]['productCategory'] == products[0]['category']
+    assert _stock(tables, products[0]) == (3, 2)
+
+    status, _ = invoke('cancel-order', path={'orderId': body['order']['orderId']}, admin=True)
+    assert status == 200
+    assert _stock(tables, products[0]) == (5, 0)
+
+
+def test_force_delete_refuses_products_with_reservations(invoke, tables, seed_products, reservation_mode):
+    products = seed_products(1, stock=5)
+    order = _place_order(invoke, [(products[0], 2)])
+
+    status, body = invoke('delete-product', path={'id': products[0]['id']}, query={'force': 'true'}, admin=True)
+    assert status == 409
+    assert body['reservedStock'] == 2
+
+    invoke('cancel-order', path={'orderId': order['orderId']}, admin=True)
+    status, _ = invoke('delete-product', path={'id': products[0]['id']}, query={'force': 'true'}, admin=True)
+    assert status == 200
+
+
+def test_cancel_sale_restocks_once(invoke, tables, seed_products):
+    products = seed_products(2, stock=5)
+    order = _place_order(invoke, [(products[0], 2), (products[1], 1)])
+    _, completed = invoke('complete-order', path={'orderId': order['orderId']}, admin=True)
+
+    status, body = invoke('cancel-sale', path={'saleId': completed['saleId']}, admin=True)
+    assert status == 200, body
+    assert _stock(tables, products[0]) == (5, 0)
+    assert _stock(tables, products[1]) == (5, 0)
+    assert ids.get_sale(tables['sales'], completed['saleId'])['status'] == 'cancelled'
+
+    status, _ = invoke('cancel-sale', path={'saleId': completed['saleId']}, admin=True)
+    assert status == 409
+    assert _stock(tables, products[0]) == (5, 0)
+
+
+def test_legacy_ids_are_found_by_partition(invoke, tables):
+    tables['orders'].put_item(Item={
+        'orderId': 'ORD-20240301-ABC123', 'createdAt': '2024-03-01T10:00:00',
+        'userId': 'user-1', 'status': 'pending', 'items': [], 'summary': {}
+    })
+
+    status, body = invoke('get-order-detail', path={'orderId': 'ORD-20240301-ABC123'}, admin=True)
+    assert status == 200
+    assert body['order']['createdAt'] == '2024-03-01T10:00:00'
+
+
+def _age_order(tables, order, hours):
+    """Mueve un pedido hacia atrás en el tiempo (createdAt es sort key: se reescribe)"""
+    item = _order(tables, order['orderId'])
+    tables['orders'].delete_item(Key={'orderId': item['orderId'], 'createdAt': item['createdAt']})
+    created_at = datetime.utcnow() - timedelta(hours=hours)
+    item['createdAt'] = created_at.isoformat()
+    item['reservationExpiresAt'] = (created_at + timedelta(hours=48)).isoformat()
+    tables['orders'].put_item(Item=item)
+
+
+def test_release_reservations_frees_only_expired_holds(invoke, handler, tables, seed_products, reservation_mode):
+    products = seed_products(2, stock=5)
+    expired = _place_order(invoke, [(products[0], 2)], user='user-1')
+    recent = _place_order(invoke, [(products[1], 1)], user='user-2')
+    _age_order(tables, expired, hours=49)
+    _age_order(tables, recent, hours=47)
+
+    report = handler('release-reservations').handler({}, None)
+    assert report == {'expiredOrders': 1, 'releasedOrders': 1, 'failedOrders': 0}
+    assert _stock(tables, products[0]) == (5, 0)
+    assert _stock(tables, products[1]) == (4, 1)
+
+    statuses = {order['orderId']: order['status'] for order in tables['orders'].scan()['Items']}
+    assert statuses == {expired['orderId']: 'expired', recent['orderId']: 'pending'}
+
+    # Segunda pasada: ya no queda nada vencido
+    assert handler('release-reservations').handler({}, None)['expiredOrders'] == 0
+
+
+def test_release_tokens_do_not_collide_for_ulid_ids():
+    from transactions import request_token
+    first, _ = ids.new_order_id()
+    second = first[:-2] + ('00' if first[-2:] != '00' else '11')
+    # Truncado a 36 caracteres, 'release-' + id perdía el final del ULID
+    assert f'release-{first}'[:36] == f'release-{second}'[:36]
+
+    assert request_token('release', first) != request_token('release', second)
+    assert request_token('release', first) == request_token('release', first)
+    assert len(request_token('release', first)) <= 36
+
+
+def test_update_product_edits_physical_stock(invoke, tables, seed_products, reservation_mode):
+    products = seed_products(1, stock=5)
+    _place_order(invoke, [(products[0], 2)])
+    assert _stock(tables, products[0]) == (3, 2)
+
+    # El admin ve y edita el stock físico: 8 unidades en la tienda, 2 reservadas
+    status, body = invoke('update-product', path={'id': products[0]['id']}, body={'stock': 8}, admin=True)
+    assert status == 200, body
+    assert body['changes']['stock'] == {'from': 5, 'to': 8}
+    assert _stock(tables, products[0]) == (6, 2)
+
+    status, body = invoke('update-product', path={'id': products[0]['id']}, body={'stock': 1}, admin=True)
+    assert status == 409
+    assert body['reservedStock'] == 2
+    assert _stock(tables, products[0]) == (6, 2)
+
+
+def _cached_stock(invoke, handler, product):
+    """Stock que sirve get-product-detail con su cache warm (versión revisada en cada request)"""
+    handler('get-product-detail').catalog_cache.version_check_seconds = 0
+    status, body = invoke('get-product-detail', path={'id': product['id']})
+    assert status == 200
+    return int(body['product']['stock'])
+
+
+def test_stock_movements_invalidate_warm_catalog_caches(invoke, handler, tables, seed_products):
+    products = seed_products(1, stock=5)
+    order = _place_order(invoke, [(products[0], 2)])
+    assert _cached_stock(invoke, handler, products[0]) == 5
+
+    _, completed = invoke('complete-order', path={'orderId': order['orderId']}, admin=True)
+    assert _cached_stock(invoke, handler, products[0]) == 3
+
+    invoke('cancel-sale', path={'saleId': completed['saleId']}, admin=True)
+    assert _cached_stock(invoke, handler, products[0]) == 5
+
+
+def test_reservations_invalidate_warm_catalog_caches(invoke, handler, tables, seed_products, reservation_mode):
+    products = seed_products(1, stock=5)
+    assert _cached_stock(invoke, handler, products[0]) == 5
+
+    order = _place_order(invoke, [(products[0], 2)])
+    assert _cached_stock(invoke, handler, products[0]) == 3
+
+    invoke('cancel-order', path={'orderId': order['orderId']}, admin=True)
+    assert _cached_stock(invoke, handler, products[0]) == 5
@@ -0,0 +1,113 @@
+"""
+Cursores firmados y paginación de listados (get-products, GET /orders)
+"""
+from decimal import Decimal
+
+import pytest
+
+import pagination
+
+
+def test_cursor_round_trip_keeps_types():
+    key = {'id': 'P001', 'category': 'shorts', 'price': Decimal('19.90')}
+    assert pagination.decode_cursor(pagination.encode_cursor(key)) == key
+
+
+def test_tampered_cursor_is_rejected():
+    cursor = pagination.encode_cursor({'id': 'P001', 'category': 'shorts'})
+    payload, signature = cursor.split('.', 1)
+    forged = pagination.encode_cursor({'id': 'P999', 'category': 'shorts'}).split('.', 1)[0]
+
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(f'{forged}.{signature}')
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(payload)
+
+
+@pytest.mark.parametrize('raw', ['0', '-3', 'abc'])
+def test_parse_limit_rejects_invalid_values(raw):
+    with pytest.raises(ValueError):
+        pagination.parse_limit({'limit': raw})
+
+
+def test_parse_limit_is_capped():
+    assert pagination.parse_limit({'limit': '100000'}, maximum=200) == 200
+    assert pagination.parse_limit({}, default=25) == 25
+
+
+def test_get_products_pages_cover_the_catalog_once(invoke, seed_products):
+    products = seed_products(23)
+    seen = []
+    cursor = None
+    pages = 0
+
+    while True:
+        query = {'limit': '5'}
+        if cursor:
+            query['cursor'] = cursor
+        status, body = invoke('get-products', query=query)
+        assert status == 200
+        assert body['count'] <= 5
+        seen.extend(product['id'] for product in body['products'])
+        pages += 1
+        cursor = body['nextCursor']
+        if not cursor:
+            break
+
+    assert pages >= 5
+    assert sorted(seen) == sorted(product['id'] for product in products)
+
+
+def test_get_products_rejects_forged_cursor(invoke, seed_products):
+    seed_products(3)
+    status, body = invoke('get-products', query={'limit': '2', 'cursor': 'abc.def'})
+    assert status == 400
+    assert body['message'] == 'Invalid pagination parameters'
+
+
+def _put_orders(tables, user_id, count, start=0):
+    for i in range(start, start + count):
+        tables['orders'].put_item(Item={
+            'orderId': f'ORD-{i:04d}',
+            'createdAt': f'2024-03-01T10:{i // 60:02d}:{i % 60:02d}.000000',
+            'userId': user_id,
+            'status': 'pending',
+            'items': [{'productId': 'P001', 'quantity': 1}],
+            'summary': {'totalItems': 1, 'totalQuantity': 1, 'totalAmount': Decimal('15')}
+        })
+
+
+def test_my_orders_pages_newest_first(invoke, tables):
+    _put_orders(tables, 'user-1', 7)
+    _put_orders(tables, 'user-2', 3, start=100)
+
+    status, first = invoke('get-my-orders', query={'limit': '3'})
+    assert status == 200
+    assert [order['orderId'] for order in first['orders']] == ['ORD-0006', 'ORD-0005', 'ORD-0004']
+    assert set(first['orders'][0]) == {'orderId', 'status', 'createdAt', 'totalAmount', 'totalItems'}
+
+    seen = [order['orderId'] for order in first['orders']]
+    cursor = first['nextCursor']
+    while cursor:
+        status, page = invoke('get-my-orders', query={'limit': '3', 'cursor': cursor})
+        assert status == 200
+        seen.extend(order['orderId'] for order in page['orders'])
+        cursor = page['nextCursor']
+
+    assert seen == [f'ORD-{i:04d}' for i in range(6, -1, -1)]
+
+
+def test_my_orders_rejects_cursor_from_another_user(invoke, tables):
+    _put_orders(tables, 'user-1', 4)
+    _, first = invoke('get-my-orders', query={'limit': '2'})
+
+    status, body = invoke('get-my-orders', query={'limit': '2', 'cursor': first['nextCursor']}, user='user-2')
+    assert status == 400
+
+
+@pytest.mark.parametrize('field', ['createdBy', 'updatedBy'])
+def test_admin_ids_are_not_selectable_fields(invoke, seed_products, field):
+    seed_products(2)
+    status, body = invoke('get-products', query={'fields': f'id,{field}'})
+    assert status == 400
+    assert field not in body['availableFields']
@@ -0,0 +1,54 @@
+"""
+Contadores de facetas: nombres codificados y reconstrucción que no pierde deltas concurrentes
+"""
+import product_facets
+
+
+def test_values_with_separator_round_trip(tables):
+    products = [
+        {'category': 'camisetas', 'gender': 'hombre|mujer', 'price': 120},
+        {'category': 'ropa 100%', 'gender': 'unisex', 'price': 20}
+    ]
+    summary = product_facets.summarize_facets(product_facets.count_facets(products))
+
+    assert summary['total'] == 2
+    assert summary['facets']['gender'] == {'hombre|mujer': 1, 'unisex': 1}
+    assert summary['facets']['category'] == {'camisetas': 1, 'ropa 100%': 1}
+
+    filtered = product_facets.summarize_facets(product_facets.count_facets(products), gender='hombre|mujer')
+    assert filtered['total'] == 1
+
+
+def test_delta_during_rebuild_is_not_lost(tables, seed_products, monkeypatch):
+    seed_products(3)
+    meta, products_table = tables['meta'], tables['products']
+    created = {'category': 'shorts', 'gender': 'mujer', 'price': 700, 'id': 'NEW', 'name': 'Nuevo'}
+    original_iter = product_facets.iter_items
+    scans = []
+
+    def racing_iter(operation, **kwargs):
+        # Mientras corre el primer scan se crea un producto y llega su delta
+        if not scans:
+            products_table.put_item(Item=created)
+            product_facets.apply_facet_delta(meta, new_product=created)
+        scans.append(kwargs)
+        return original_iter(operation, **kwargs)
+    monkeypatch.setattr(product_facets, 'iter_items', racing_iter)
+
+    counts = product_facets.load_facet_counts(meta, products_table)
+
+    assert len(scans) == 2
+    assert sum(counts.values()) == 4
+    stored = product_facets.load_facet_counts(meta, products_table)
+    assert stored == counts
+    assert len(scans) == 2
+
+
+def test_deltas_apply_once_counters_exist(tables, seed_products):
+    products = seed_products(3)
+    meta = tables['meta']
+    product_facets.load_facet_counts(meta, tables['products'])
+
+    product_facets.apply_facet_delta(meta, old_product=products[0])
+    counts = product_facets.load_facet_counts(meta, tables['products'])
+    assert sum(counts.values()) == 2
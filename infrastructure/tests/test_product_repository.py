@@ -0,0 +1,61 @@
+"""
+ProductRepository: lecturas por clave con un solo BatchGetItem aunque lleguen ids sin categoría
+"""
+import pytest
+
+import product_repository
+from product_repository import ProductRepository
+
+
+@pytest.fixture(autouse=True)
+def cold_container():
+    product_repository._known_categories.clear()
+
+
+@pytest.fixture
+def calls(tables, monkeypatch):
+    """Cuenta las llamadas a DynamoDB que hace el repositorio"""
+    client = tables['products'].meta.client
+    counted = {'query': 0, 'batch_get_item': 0, 'get_item': 0}
+    for name in counted:
+        original = getattr(client, name)
+
+        def wrapper(*args, _name=name, _original=original, **kwargs):
+            counted[_name] += 1
+            return _original(*args, **kwargs)
+        monkeypatch.setattr(client, name, wrapper)
+    return counted
+
+
+def test_bare_ids_resolve_categories_then_one_batch(tables, seed_products, calls):
+    products = seed_products(6)
+    ids = [products[4]['id'], 'NOPE', products[1]['id'], {'id': products[2]['id'], 'category': 'shorts'}]
+
+    found = ProductRepository(tables['products']).get_many(ids)
+
+    assert [p and p['id'] for p in found] == [products[4]['id'], None, products[1]['id'], products[2]['id']]
+    assert calls['batch_get_item'] == 1
+    # Un query keys-only por id suelto (en paralelo), ninguno para el que trae categoría
+    assert calls['query'] == 3
+    assert calls['get_item'] == 0
+
+
+def test_warm_container_reuses_known_categories(tables, seed_products, calls):
+    products = seed_products(3)
+    ids = [product['id'] for product in products]
+    ProductRepository(tables['products']).get_many(ids)
+    calls.update(query=0, batch_get_item=0)
+
+    found = ProductRepository(tables['products']).get_many(ids)
+    assert [p['id'] for p in found] == ids
+    assert calls == {'query': 0, 'batch_get_item': 1, 'get_item': 0}
+
+
+def test_stale_category_falls_back_to_partition_query(tables, seed_products):
+    products = seed_products(1)
+    product = dict(products[0], category='zapatillas')
+    tables['products'].delete_item(Key={'id': product['id'], 'category': products[0]['category']})
+    tables['products'].put_item(Item=product)
+
+    found = ProductRepository(tables['products']).get_many([{'id': product['id'], 'category': 'camisetas'}])
+    assert found[0]['category'] == 'zapatillas'
@@ -0,0 +1,110 @@
+"""
+Filtros de productos (get-products-filtered): query sobre los índices por categoría
+y género, con scan de respaldo solo mientras el índice no está disponible
+"""
+import pytest
+from botocore.exceptions import ClientError
+
+
+def _walk(invoke, query):
+    """Recorre todas las páginas siguiendo nextCursor"""
+    seen, cursor = [], None
+    while True:
+        params = dict(query)
+        if cursor:
+            params['cursor'] = cursor
+        status, body = invoke('get-products-filtered', query=params)
+        assert status == 200, body
+        seen.extend(product['id'] for product in body['products'])
+        cursor = body['nextCursor']
+        if not cursor:
+            return seen, body['queryMode']
+
+
+@pytest.fixture
+def products(seed_products):
+    return seed_products(12)
+
+
+def test_category_pages_come_from_the_index(invoke, products):
+    seen, query_mode = _walk(invoke, {'category': 'camisetas', 'limit': '2'})
+    assert query_mode == 'index'
+    assert seen == [p['id'] for p in products if p['category'] == 'camisetas']
+
+
+def test_missing_index_falls_back_to_scan(invoke, handler, products):
+    handler('get-products-filtered').GENDER_INDEX = 'not-created-yet'
+
+    status, body = invoke('get-products-filtered', query={'gender': 'mujer'})
+    assert status == 200, body
+    assert body['queryMode'] == 'scan'
+    assert sorted(p['id'] for p in body['products']) == [p['id'] for p in products if p['gender'] == 'mujer']
+
+
+def test_other_validation_errors_do_not_fall_back(invoke, handler, products, monkeypatch):
+    module = handler('get-products-filtered')
+
+    def broken_query(**kwargs):
+        raise ClientError({'Error': {'Code': 'ValidationException',
+                                     'Message': 'Invalid FilterExpression: Syntax error'}}, 'Query')
+    monkeypatch.setattr(module.table, 'query', broken_query)
+
+    status, _ = invoke('get-products-filtered', query={'category': 'shorts'})
+    assert status == 500
+
+
+def test_cursor_rejected_by_dynamodb_is_a_client_error(invoke, handler, products, monkeypatch):
+    module = handler('get-products-filtered')
+    _, first = invoke('get-products-filtered', query={'category': 'shorts', 'limit': '1'})
+
+    def rejecting_query(**kwargs):
+        raise ClientError({'Error': {'Code': 'ValidationException',
+                                     'Message': 'The provided starting key is invalid'}}, 'Query')
+    monkeypatch.setattr(module.table, 'query', rejecting_query)
+
+    status, body = invoke('get-products-filtered',
+                          query={'category': 'shorts', 'limit': '1', 'cursor': first['nextCursor']})
+    assert status == 400
+    assert body['message'] == 'Invalid pagination parameters'
+
+
+def test_forged_cursor_is_rejected(invoke, products):
+    status, _ = invoke('get-products-filtered', query={'category': 'shorts', 'cursor': 'abc.def'})
+    assert status == 400
+
+
+def test_sorted_walks_return_every_product_in_order(invoke, products):
+    seen, query_mode = _walk(invoke, {'gender': 'hombre', 'sort': '-price', 'limit': '3'})
+    assert query_mode == 'index'
+    expected = [p['id'] for p in sorted(products, key=lambda p: -p['price']) if p['gender'] == 'hombre']
+    assert seen == expected
+
+    seen, query_mode = _walk(invoke, {'category': 'zapatillas', 'sort': 'newest', 'limit': '1'})
+    assert query_mode == 'index+top-k'
+    expected = [p['id'] for p in sorted(products, key=lambda p: p['createdAt'], reverse=True)
+                if p['category'] == 'zapatillas']
+    assert seen == expected
+
+
+@pytest.mark.parametrize('first_sort, next_sort', [
+    ('price', 'name'),      # LastEvaluatedKey usado como offset
+    ('name', 'price'),      # offset usado como LastEvaluatedKey
+    ('name', 'newest'),     # offset de otro orden
+    ('price', '-price')
+])
+def test_cursor_is_bound_to_its_sort(invoke, products, first_sort, next_sort):
+    _, first = invoke('get-products-filtered', query={'category': 'shorts', 'sort': first_sort, 'limit': '1'})
+    assert first['nextCursor']
+
+    status, body = invoke('get-products-filtered', query={
+        'category': 'shorts', 'sort': next_sort, 'limit': '1', 'cursor': first['nextCursor']
+    })
+    assert status == 400
+    assert body['error'] == 'Cursor does not match this query'
+
+
+def test_sorted_pagination_depth_is_capped(invoke, handler, products):
+    handler('get-products-filtered').MAX_SORTED_RESULTS = 3
+
+    seen, _ = _walk(invoke, {'category': 'camisetas', 'sort': 'name', 'limit': '2'})
+    assert len(seen) == 3